@@ -0,0 +1,155 @@
+"""Memory and construction cost of the slotted entities.
+
+Compares the entities with a copy of their previous form, a plain
+``@dataclass`` with a per-instance ``__dict__``, on memory per instance,
+``__init__`` cost, and the row-to-entity step of a list query. Run from
+the repository root:
+    
+    python -m benchmarks.entities --rows 100000
+"""
+import argparse
+import sqlite3
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+from src.domain.entities.event import Event
+from src.domain.entities.registration import Registration
+from src.domain.entities.user_state import UserState
+from src.domain.entities.timestamps import from_epoch
+
+
+class _DictEpochDateTime:
+    """The previous lazy timestamp descriptor, storing into ``__dict__``"""
+    
+    def __init__(self, default: Any = None, required: bool = False):
+        self._default = default
+        self._required = required
+    
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+        self._attr = f"_{name}"
+    
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Any:
+        if obj is None:
+            if self._required:
+                raise AttributeError(self._name)
+            return self._default
+        value = obj.__dict__[self._attr]
+        if isinstance(value, int):
+            value = from_epoch(value)
+            obj.__dict__[self._attr] = value
+        return value
+    
+    def __set__(self, obj: Any, value: Any) -> None:
+        obj.__dict__[self._attr] = value
+
+
+@dataclass
+class DictEvent:
+    event_id: str
+    name: str
+    date: datetime = _DictEpochDateTime(required=True)
+    created_by: str
+    created_at: Optional[datetime] = _DictEpochDateTime()
+    capacity: Optional[int] = None
+
+
+@dataclass
+class DictRegistration:
+    user_id: str
+    event_id: str
+    created_at: Optional[datetime] = _DictEpochDateTime()
+
+
+@dataclass
+class DictUserState:
+    user_id: str
+    current_step: str
+    context: Optional[str] = None
+    updated_at: Optional[datetime] = _DictEpochDateTime()
+    
+    def __post_init__(self):
+        valid_steps = ['main_menu', 'enter_first_name', 'enter_last_name', 'enter_birth_year']
+        if self.current_step not in valid_steps:
+            raise ValueError(f"Invalid step: {self.current_step}")
+
+
+def bytes_per_instance(build: Callable[[int], Any], count: int) -> float:
+    """Traced allocation per instance of ``count`` instances kept alive"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [build(i) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del instances
+    return used / count
+
+
+def seconds_per_million(build: Callable[[int], Any], count: int) -> float:
+    """Time to build ``count`` instances, scaled to one million"""
+    started = time.perf_counter()
+    for i in range(count):
+        build(i)
+    return (time.perf_counter() - started) * 1000000 / count
+
+
+def list_query_rows(count: int) -> List[sqlite3.Row]:
+    """Rows shaped like ``SELECT * FROM events``"""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE events (event_id TEXT, name TEXT, date INTEGER, created_by TEXT, created_at INTEGER, capacity INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO events VALUES (?, ?, ?, ?, ?, NULL)",
+        ((f"event-{i}", f"Event {i}", 1900000000 + i, "12345", 1700000000) for i in range(count))
+    )
+    return conn.execute("SELECT * FROM events").fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.rows
+    
+    # The previous row mapping used keyword __init__; the new one uses from_row
+    cases = [
+        ("Event", lambda i: DictEvent(event_id=str(i), name="Event", date=1900000000, created_by="1", created_at=1700000000),
+         lambda i: Event.from_row(str(i), "Event", 1900000000, "1", 1700000000, None)),
+        ("Registration", lambda i: DictRegistration(user_id=str(i), event_id="e", created_at=1700000000),
+         lambda i: Registration.from_row(str(i), "e", 1700000000)),
+        ("UserState", lambda i: DictUserState(user_id=str(i), current_step="main_menu", context=None, updated_at=1700000000),
+         lambda i: UserState.from_row(str(i), "main_menu", None, 1700000000)),
+    ]
+    print(f"{'entity':<14}{'dict B':>10}{'slots B':>10}{'dict s/M':>12}{'slots s/M':>12}")
+    for label, old, new in cases:
+        # Share the ID strings so only the entity itself is measured
+        print(
+            f"{label:<14}"
+            f"{bytes_per_instance(old, n) - bytes_per_instance(str, n):>10.0f}"
+            f"{bytes_per_instance(new, n) - bytes_per_instance(str, n):>10.0f}"
+            f"{seconds_per_million(old, n):>12.2f}"
+            f"{seconds_per_million(new, n):>12.2f}"
+        )
+    
+    rows = list_query_rows(n)
+    timings = {}
+    for label, build in (
+        ("dict __init__", lambda row: DictEvent(
+            event_id=row['event_id'], name=row['name'], date=row['date'],
+            created_by=row['created_by'], created_at=row['created_at'], capacity=row['capacity'])),
+        ("slots from_row", lambda row: Event.from_row(
+            row['event_id'], row['name'], row['date'], row['created_by'], row['created_at'], row['capacity'])),
+    ):
+        started = time.perf_counter()
+        events = [build(row) for row in rows]
+        timings[label] = time.perf_counter() - started
+        del events
+    print(f"\nrow -> Event for {n} rows: " + ", ".join(f"{label} {seconds * 1000:.0f} ms" for label, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
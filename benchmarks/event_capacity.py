@@ -0,0 +1,89 @@
+"""Admission of thousands of concurrent registrations to one capped event.
+
+Every user taps Register at the same moment, some of them twice. The run
+checks that exactly ``--capacity`` seats were handed out, both in the
+replies and in the database, and reports the tap throughput. Run from the
+repository root:
+    
+    python -m benchmarks.event_capacity --users 20000 --capacity 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from src.domain.entities.event import Event
+from src.domain.entities.registration import RegistrationOutcome
+from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.sharding import ShardedDatabase
+from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+
+
+async def run_scenario(db_path: str, shards: int, args: argparse.Namespace) -> dict:
+    """Fire all taps at once and return outcome counts and timings"""
+    catalog = DatabaseConnection(db_path, synchronous=args.synchronous)
+    user_db = ShardedDatabase.open(db_path, shards, catalog=catalog, synchronous=args.synchronous) if shards > 1 else catalog
+    event_repo = SqliteEventRepository(catalog)
+    registration_repo = SqliteRegistrationRepository(user_db)
+    
+    now = datetime.now()
+    event = await event_repo.create_event(
+        Event.create("Hot event", now + timedelta(days=1), "admin", capacity=args.capacity)
+    )
+    users = [str(100000000 + i) for i in range(args.users)]
+    taps = users + random.sample(users, int(args.users * args.duplicates))
+    random.shuffle(taps)
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(registration_repo.try_register(user_id, event.event_id, now) for user_id in taps)
+    )
+    elapsed = time.perf_counter() - started
+    
+    outcomes = Counter(result.outcome for result in results)
+    stored = await registration_repo.count_event_registrations(event.event_id)
+    if user_db is not catalog:
+        user_db.close()
+    catalog.close()
+    return {"taps": len(taps), "seconds": elapsed, "outcomes": outcomes, "stored": stored}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="share of users who tap twice")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous for the writers")
+    args = parser.parse_args()
+    
+    expected = min(args.capacity, args.users)
+    columns = ("taps", "registered", "full", "duplicate", "stored", "taps/s")
+    print(f"{'scenario':<16}" + "".join(f"{column:>12}" for column in columns))
+    exact = True
+    for label, shards in (("single file", 1), (f"{args.shards} shards", args.shards)):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(run_scenario(os.path.join(tmp, "bench.db"), shards, args))
+        outcomes = result["outcomes"]
+        registered = outcomes[RegistrationOutcome.REGISTERED]
+        exact = exact and registered == result["stored"] == expected
+        row = (
+            result["taps"], registered, outcomes[RegistrationOutcome.EVENT_FULL],
+            outcomes[RegistrationOutcome.ALREADY_REGISTERED], result["stored"],
+            round(result["taps"] / result["seconds"])
+        )
+        print(f"{label:<16}" + "".join(f"{value:>12}" for value in row))
+    
+    if not exact:
+        print(f"Seat accounting mismatch: expected exactly {expected} registrations", file=sys.stderr)
+        sys.exit(1)
+    print(f"Seat accounting exact: {expected} of {args.capacity} seats taken")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Read throughput while a write-heavy workload runs at the same time.
+
+Compares the single shared connection (``--read-pool-size 0``) with the
+reader pool + dedicated writer connection. Run from the repository root:
+
+    python -m benchmarks.read_under_write --duration 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from src.domain.entities.event import Event
+from src.domain.entities.registration import Registration
+from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+
+
+async def run_workload(db_path: str, read_pool_size: int, args: argparse.Namespace) -> dict:
+    """Run readers and writers concurrently and return operation counts"""
+    db = DatabaseConnection(db_path, read_pool_size=read_pool_size, synchronous=args.synchronous)
+    event_repo = SqliteEventRepository(db)
+    registration_repo = SqliteRegistrationRepository(db)
+
+    event_ids = []
+    for i in range(args.events):
+        event = Event.create(f"Event {i}", datetime.now() + timedelta(days=1, minutes=i), "admin")
+        await event_repo.create_event(event)
+        event_ids.append(event.event_id)
+
+    counts = {"reads": 0, "writes": 0}
+    deadline = time.perf_counter() + args.duration
+
+    async def reader() -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            await event_repo.get_event_by_id(event_ids[i % len(event_ids)])
+            await event_repo.get_future_events()
+            counts["reads"] += 2
+            i += 1
+
+    async def writer(worker: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            registration = Registration.create(f"{worker}-{i}", event_ids[i % len(event_ids)])
+            await registration_repo.register_user(registration)
+            counts["writes"] += 1
+            i += 1
+
+    await asyncio.gather(
+        *(reader() for _ in range(args.readers)),
+        *(writer(w) for w in range(args.writers))
+    )
+    db.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per scenario")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--read-pool-size", type=int, default=4)
+    parser.add_argument("--synchronous", default="FULL", help="PRAGMA synchronous for the writer")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<28}{'reads/s':>12}{'writes/s':>12}")
+    for label, pool_size in (("shared connection", 0), (f"reader pool ({args.read_pool_size})", args.read_pool_size)):
+        with tempfile.TemporaryDirectory() as tmp:
+            counts = asyncio.run(run_workload(os.path.join(tmp, "bench.db"), pool_size, args))
+        print(f"{label:<28}{counts['reads'] / args.duration:>12.0f}{counts['writes'] / args.duration:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""User state backends at scale: SQLite versus the append-only state log.
+
+Saves one state per user, rewrites a sample of them, reads a sample back and
+finally measures how long a fresh process needs before it can serve reads.
+Run from the repository root:
+    
+    python -m benchmarks.user_state_backends --users 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict
+from src.domain.entities.user_state import UserState
+from src.domain.repositories.user_state_repository import UserStateRepository
+from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.repositories.log_structured_user_state_repository import LogStructuredUserStateRepository
+from src.infrastructure.repositories.sqlite_user_state_repository import SqliteUserStateRepository
+
+
+STEPS = ("main_menu", "enter_first_name", "enter_last_name", "enter_birth_year")
+
+
+def directory_size(path: str) -> int:
+    """Total size of the files below ``path``"""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+async def run_backend(open_repo: Callable[[], UserStateRepository], tmp: str, args: argparse.Namespace) -> Dict[str, float]:
+    """Run the workload against one backend and return its timings"""
+    repo = open_repo()
+    if hasattr(repo, "start"):
+        await repo.start()
+    rng = random.Random(42)
+    results: Dict[str, float] = {}
+    
+    start = time.perf_counter()
+    for i in range(args.users):
+        await repo.save_user_state(UserState(user_id=str(i), current_step="enter_first_name"))
+    results["load/s"] = args.users / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(args.operations):
+        user_id = str(rng.randrange(args.users))
+        await repo.save_user_state(UserState(
+            user_id=user_id,
+            current_step=rng.choice(STEPS),
+            # Enough answers for every step in STEPS
+            context='{"first_name": "Иван", "last_name": "Иванов"}'
+        ))
+    results["saves/s"] = args.operations / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(args.operations):
+        await repo.get_user_state(str(rng.randrange(args.users)))
+    results["gets/s"] = args.operations / (time.perf_counter() - start)
+    
+    if hasattr(repo, "stop"):
+        await repo.stop()
+    if hasattr(repo, "db_connection"):
+        repo.db_connection.close()
+    
+    # Time until a new process answers its first read
+    start = time.perf_counter()
+    repo = open_repo()
+    await repo.get_user_state("0")
+    results["startup s"] = time.perf_counter() - start
+    if hasattr(repo, "stop"):
+        await repo.stop()
+    if hasattr(repo, "db_connection"):
+        repo.db_connection.close()
+    
+    results["disk MB"] = directory_size(tmp) / 1e6
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--operations", type=int, default=100000, help="saves and gets after the initial load")
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous for SQLite")
+    parser.add_argument("--fsync", action="store_true", help="fsync the state log on every save")
+    args = parser.parse_args()
+    
+    columns = ("load/s", "saves/s", "gets/s", "startup s", "disk MB")
+    print(f"{'backend':<16}" + "".join(f"{column:>14}" for column in columns))
+    for label in ("sqlite", "log"):
+        with tempfile.TemporaryDirectory() as tmp:
+            if label == "sqlite":
+                path = os.path.join(tmp, "bench.db")
+                open_repo = lambda: SqliteUserStateRepository(DatabaseConnection(path, synchronous=args.synchronous))
+            else:
+                open_repo = lambda: LogStructuredUserStateRepository(tmp, fsync=args.fsync)
+            results = asyncio.run(run_backend(open_repo, tmp, args))
+        print(f"{label:<16}" + "".join(f"{results[column]:>14.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
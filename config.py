@@ -11,6 +11,46 @@ class Config:
     
     # Database settings
     DATABASE_PATH: str = os.getenv('DATABASE_PATH', 'bot_database.db')
+    DATABASE_READ_POOL_SIZE: int = int(os.getenv('DATABASE_READ_POOL_SIZE', '4'))
+    DATABASE_JOURNAL_MODE: str = os.getenv('DATABASE_JOURNAL_MODE', 'WAL')
+    DATABASE_SYNCHRONOUS: str = os.getenv('DATABASE_SYNCHRONOUS', 'NORMAL')
+    DATABASE_CACHE_SIZE: int = int(os.getenv('DATABASE_CACHE_SIZE', '-16000'))  # negative = KiB
+    DATABASE_MMAP_SIZE: int = int(os.getenv('DATABASE_MMAP_SIZE', '268435456'))
+    DATABASE_BUSY_TIMEOUT: int = int(os.getenv('DATABASE_BUSY_TIMEOUT', '5000'))  # milliseconds
+    DATABASE_GROUP_COMMIT_WINDOW_MS: float = float(os.getenv('DATABASE_GROUP_COMMIT_WINDOW_MS', '3'))  # 0 disables; enabling forces synchronous=FULL
+    DATABASE_GROUP_COMMIT_MAX_BATCH: int = int(os.getenv('DATABASE_GROUP_COMMIT_MAX_BATCH', '64'))
+    DATABASE_SHARDS: int = int(os.getenv('DATABASE_SHARDS', '1'))  # >1 splits user data across files; fixed once data exists
+    
+    # Cache settings
+    USER_CACHE_SIZE: int = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_TTL: float = float(os.getenv('USER_CACHE_TTL', '300'))  # seconds
+    USER_STATE_CACHE_SIZE: int = int(os.getenv('USER_STATE_CACHE_SIZE', '100000'))
+    USER_STATE_FLUSH_INTERVAL: float = float(os.getenv('USER_STATE_FLUSH_INTERVAL', '1'))  # seconds of state a crash may lose
+    REGISTRATION_INDEX_MAX_MEMBERS: int = int(os.getenv('REGISTRATION_INDEX_MAX_MEMBERS', '5000000'))  # 0 disables the index
+    REGISTRATION_EXTERNAL_WRITE_CHECK_INTERVAL: float = float(os.getenv('REGISTRATION_EXTERNAL_WRITE_CHECK_INTERVAL', '5'))  # seconds the index may lag manage.py writes; 0 disables
+    # User state storage: "sqlite" (write-behind over the database) or "log"
+    USER_STATE_BACKEND: str = os.getenv('USER_STATE_BACKEND', 'sqlite')
+    USER_STATE_LOG_DIR: str = os.getenv('USER_STATE_LOG_DIR', 'user_state_log')
+    USER_STATE_LOG_FSYNC: bool = bool(os.getenv('USER_STATE_LOG_FSYNC', 'False').lower() in ('true', '1', 'yes'))
+    USER_STATE_LOG_COMPACT_BYTES: int = int(os.getenv('USER_STATE_LOG_COMPACT_BYTES', str(64 * 1024 * 1024)))
+    
+    # Archive settings
+    ARCHIVE_HORIZON_DAYS: float = float(os.getenv('ARCHIVE_HORIZON_DAYS', '30'))  # 0 disables archiving
+    ARCHIVE_INTERVAL: float = float(os.getenv('ARCHIVE_INTERVAL', '3600'))  # seconds
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))  # events per transaction
+    
+    # Backup settings
+    BACKUP_DIR: str = os.getenv('BACKUP_DIR', '')  # empty disables backups
+    BACKUP_INTERVAL: float = float(os.getenv('BACKUP_INTERVAL', '3600'))  # seconds
+    BACKUP_KEEP: int = int(os.getenv('BACKUP_KEEP', '7'))
+    BACKUP_STANDBY_DIR: str = os.getenv('BACKUP_STANDBY_DIR', '')  # empty disables the warm standby
+    BACKUP_STANDBY_INTERVAL: float = float(os.getenv('BACKUP_STANDBY_INTERVAL', '60'))  # seconds
+    BACKUP_PAGES_PER_STEP: int = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))
+    BACKUP_STEP_PAUSE_MS: float = float(os.getenv('BACKUP_STEP_PAUSE_MS', '5'))
+    
+    # Browsing settings
+    EVENTS_PAGE_SIZE: int = int(os.getenv('EVENTS_PAGE_SIZE', '10'))
+    SEARCH_RESULTS_LIMIT: int = int(os.getenv('SEARCH_RESULTS_LIMIT', '10'))
     
     # Server settings
     HOST: str = os.getenv('HOST', '0.0.0.0')
@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import functools
+import sys
+import time
+from typing import Optional
+from config import Config
+from src.infrastructure.database.factory import open_databases
+from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+from src.presentation.cli import bulk_transfer
+
+
+COMMANDS = {
+    "import-events": (bulk_transfer.import_events, "events", "r"),
+    "import-registrations": (bulk_transfer.import_registrations, "registrations", "r"),
+    "export-events": (bulk_transfer.export_events, "events", "w"),
+    "export-registrations": (bulk_transfer.export_registrations, "registrations", "w"),
+}
+
+
+async def run_command(
+    command: str, path: str, fmt: str, event_id: Optional[str] = None, include_archive: bool = False
+) -> int:
+    """Run a bulk command against the configured database"""
+    transfer, kind, mode = COMMANDS[command]
+    if event_id is not None:
+        transfer = functools.partial(transfer, event_id=event_id)
+    if include_archive:
+        transfer = functools.partial(transfer, include_archive=True)
+    db_connection, user_db = open_databases(Config)
+    repository = SqliteEventRepository(db_connection) if kind == "events" else SqliteRegistrationRepository(user_db)
+    try:
+        if path == "-":
+            return await transfer(repository, sys.stdin if mode == "r" else sys.stdout, fmt)
+        with open(path, mode, encoding="utf-8", newline="") as file:
+            return await transfer(repository, file, fmt)
+    finally:
+        if user_db is not db_connection:
+            user_db.close()
+        db_connection.close()
+
+
+def main():
+    """Command line entry point for bulk import and export"""
+    parser = argparse.ArgumentParser(description="Bulk import and export of events and registrations")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("path", nargs="?", default="-", help="file to read or write, - for stdin/stdout")
+    parser.add_argument("--format", choices=bulk_transfer.FORMATS, help="defaults to the file extension, else ndjson")
+    parser.add_argument("--event-id", help="export-registrations: only this event's attendees")
+    parser.add_argument("--include-archive", action="store_true", help="exports: include archived past events")
+    args = parser.parse_args()
+    if args.event_id is not None and args.command != "export-registrations":
+        parser.error("--event-id only applies to export-registrations")
+    if args.include_archive and not args.command.startswith("export-"):
+        parser.error("--include-archive only applies to exports")
+    
+    started = time.perf_counter()
+    fmt = bulk_transfer.detect_format(args.path, args.format)
+    count = asyncio.run(run_command(args.command, args.path, fmt, args.event_id, args.include_archive))
+    # Report on stderr so exports to stdout stay clean
+    print(f"{args.command}: {count} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
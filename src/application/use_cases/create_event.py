@@ -12,10 +12,12 @@ class CreateEventUseCase:
         self.event_repository = event_repository
         self.user_repository = user_repository
     
-    def execute(self, user_id: str, event_name: str, event_date_str: str) -> Dict[str, Any]:
+    async def execute(
+        self, user_id: str, event_name: str, event_date_str: str, capacity: Optional[int] = None
+    ) -> Dict[str, Any]:
         """Execute the use case to create an event"""
         # Check if user is admin
-        user = self.user_repository.get_user_by_id(user_id)
+        user = await self.user_repository.get_user(user_id)
         if not user or not user.is_admin:
             return {
                 "success": False,
@@ -42,14 +44,23 @@ class CreateEventUseCase:
                 "keyboard": []
             }
         
+        if capacity is not None and capacity < 1:
+            return {
+                "success": False,
+                "message": "Capacity must be at least 1",
+                "next_step": "admin_menu",
+                "keyboard": []
+            }
+        
         # Create event
         event = Event.create(
             name=event_name,
             date=event_date,
-            created_by=user_id
+            created_by=user_id,
+            capacity=capacity
         )
         
-        created_event = self.event_repository.create_event(event)
+        created_event = await self.event_repository.create_event(event)
         
         return {
             "success": True,
@@ -1,16 +1,45 @@
-from typing import Dict, Any
-from src.domain.repositories.event_repository import EventRepository
+from typing import Dict, Any, Optional, Tuple
+from src.domain.entities.event import Event
+from src.domain.entities.timestamps import from_epoch, to_epoch
+from src.domain.repositories.event_repository import EventCursor, EventRepository
 
 
 class GetEventsUseCase:
     """Use case for getting events"""
     
-    def __init__(self, event_repository: EventRepository):
+    # Page buttons carry the cursor: browse_events:<n|p>:<epoch>:<event_id>
+    PAGE_CALLBACK_PREFIX = "browse_events"
+    
+    def __init__(self, event_repository: EventRepository, page_size: int = 10):
         self.event_repository = event_repository
+        self.page_size = page_size
     
-    def execute(self, user_id: str) -> Dict[str, Any]:
-        """Execute the use case to get events"""
-        events = self.event_repository.get_future_events()
+    async def execute(
+        self,
+        user_id: str,
+        after: Optional[EventCursor] = None,
+        before: Optional[EventCursor] = None
+    ) -> Dict[str, Any]:
+        """Execute the use case to get one page of events"""
+        # Fetch one extra event to learn whether another page exists
+        if before is not None:
+            events = await self.event_repository.get_future_events_page(
+                self.page_size + 1, before=before
+            )
+            has_prev = len(events) > self.page_size
+            events = events[-self.page_size:]
+            has_next = True
+        else:
+            events = await self.event_repository.get_future_events_page(
+                self.page_size + 1, after=after
+            )
+            has_next = len(events) > self.page_size
+            events = events[:self.page_size]
+            has_prev = after is not None
+        
+        if not events and (after is not None or before is not None):
+            # The page we came from has gone stale; start over
+            return await self.execute(user_id)
         
         if not events:
             return {
@@ -32,10 +61,20 @@ class GetEventsUseCase:
             formatted_date = event.date.strftime('%Y-%m-%d %H:%M')
             message += f"• <b>{event.name}</b>\n  Date: {formatted_date}\n  ID: {event.event_id}\n\n"
             keyboard.append([{
-                "text": f"Register: {event.name[:20]}...", 
+                "text": f"Register: {event.name[:20]}...",
                 "callback_data": f"register_{event.event_id}"
             }])
         
+        keyboard.append([{"text": "🔎 Search Events", "callback_data": "search_events"}])
+        
+        navigation = []
+        if has_prev:
+            navigation.append({"text": "⬅️ Prev", "callback_data": self.page_callback_data("p", events[0])})
+        if has_next:
+            navigation.append({"text": "Next ➡️", "callback_data": self.page_callback_data("n", events[-1])})
+        if navigation:
+            keyboard.append(navigation)
+        
         keyboard.append([{"text": "Back to Main Menu", "callback_data": "main_menu"}])
         
         return {
@@ -43,4 +82,27 @@ class GetEventsUseCase:
             "events": events,
             "next_step": "browse_events",
             "keyboard": keyboard
-        }
\ No newline at end of file
+        }
+    
+    @classmethod
+    def page_callback_data(cls, direction: str, event: Event) -> str:
+        """Build callback data for the page before ("p") or after ("n") an event"""
+        return f"{cls.PAGE_CALLBACK_PREFIX}:{direction}:{to_epoch(event.date)}:{event.event_id}"
+    
+    @classmethod
+    def parse_page_callback(
+        cls, callback_data: str
+    ) -> Tuple[Optional[EventCursor], Optional[EventCursor]]:
+        """Parse page callback data into (after, before) cursors
+        
+        Plain ``browse_events`` and malformed data both mean the first page.
+        """
+        parts = callback_data.split(":", 3)
+        if len(parts) != 4 or parts[0] != cls.PAGE_CALLBACK_PREFIX or not parts[2].isdigit():
+            return None, None
+        cursor = EventCursor(from_epoch(int(parts[2])), parts[3])
+        if parts[1] == "n":
+            return cursor, None
+        if parts[1] == "p":
+            return None, cursor
+        return None, None
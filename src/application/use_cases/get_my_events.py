@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Dict, Any
 from src.domain.repositories.event_repository import EventRepository
 from src.domain.repositories.registration_repository import RegistrationRepository
@@ -11,11 +12,16 @@ class GetMyEventsUseCase:
         self.event_repository = event_repository
         self.registration_repository = registration_repository
     
-    def execute(self, user_id: str) -> Dict[str, Any]:
+    async def execute(self, user_id: str) -> Dict[str, Any]:
         """Execute the use case to get user's events"""
-        registrations = self.registration_repository.get_user_registrations(user_id)
+        events = await self.registration_repository.get_user_upcoming_events(
+            user_id, datetime.now()
+        )
         
-        if not registrations:
+        # Only tell apart "never registered" and "all in the past" when there is nothing to show
+        if not events and not await self.registration_repository.get_user_registrations(
+            user_id, include_archive=True
+        ):
             return {
                 "message": "You haven't registered for any events yet.",
                 "events": [],
@@ -27,14 +33,6 @@ class GetMyEventsUseCase:
                 ]
             }
         
-        event_ids = [reg.event_id for reg in registrations]
-        events = []
-        
-        for event_id in event_ids:
-            event = self.event_repository.get_event_by_id(event_id)
-            if event and event.is_in_future():  # Only show future events
-                events.append(event)
-        
         if not events:
             return {
                 "message": "You have no upcoming events. Your registered events may have already passed.",
@@ -1,5 +1,6 @@
+from datetime import datetime
 from typing import Dict, Any
-from src.domain.entities.registration import Registration
+from src.domain.entities.registration import RegistrationOutcome
 from src.domain.repositories.event_repository import EventRepository
 from src.domain.repositories.registration_repository import RegistrationRepository
 
@@ -12,11 +13,12 @@ class RegisterForEventUseCase:
         self.event_repository = event_repository
         self.registration_repository = registration_repository
     
-    def execute(self, user_id: str, event_id: str) -> Dict[str, Any]:
+    async def execute(self, user_id: str, event_id: str) -> Dict[str, Any]:
         """Execute the use case to register for an event"""
-        # Check if event exists
-        event = self.event_repository.get_event_by_id(event_id)
-        if not event:
+        # Existence, date and duplicate checks happen atomically with the insert
+        result = await self.registration_repository.try_register(user_id, event_id, datetime.now())
+        
+        if result.outcome == RegistrationOutcome.EVENT_NOT_FOUND:
             return {
                 "success": False,
                 "message": "Event not found",
@@ -24,8 +26,7 @@ class RegisterForEventUseCase:
                 "keyboard": []
             }
         
-        # Check if event is in the future
-        if not event.is_in_future():
+        if result.outcome == RegistrationOutcome.EVENT_IN_PAST:
             return {
                 "success": False,
                 "message": "Cannot register for past events",
@@ -33,26 +34,29 @@ class RegisterForEventUseCase:
                 "keyboard": []
             }
         
-        # Check if user is already registered
-        if self.registration_repository.is_registered(user_id, event_id):
+        if result.outcome == RegistrationOutcome.EVENT_FULL:
             return {
                 "success": False,
-                "message": "You are already registered for this event",
+                "message": "Sorry, this event is fully booked",
                 "next_step": "browse_events",
                 "keyboard": []
             }
         
-        # Create registration
-        registration = Registration.create(user_id=user_id, event_id=event_id)
-        self.registration_repository.register_user(registration)
+        if result.outcome == RegistrationOutcome.ALREADY_REGISTERED:
+            return {
+                "success": False,
+                "message": "You are already registered for this event",
+                "next_step": "browse_events",
+                "keyboard": []
+            }
         
         return {
             "success": True,
-            "message": f"Successfully registered for event: {event.name}",
+            "message": f"Successfully registered for event: {result.event_name}",
             "next_step": "main_menu",
             "keyboard": [
                 [{"text": "🎯 Browse Events", "callback_data": "browse_events"}],
                 [{"text": "📋 My Events", "callback_data": "my_events"}],
                 [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
             ]
-        }
\ No newline at end of file
+        }
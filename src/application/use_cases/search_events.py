@@ -0,0 +1,56 @@
+import html
+from typing import Dict, Any
+from src.domain.repositories.event_repository import EventRepository
+
+
+class SearchEventsUseCase:
+    """Use case for finding upcoming events by name"""
+    
+    def __init__(self, event_repository: EventRepository, limit: int = 10):
+        self.event_repository = event_repository
+        self.limit = limit
+    
+    async def execute(self, user_id: str, query: str) -> Dict[str, Any]:
+        """Execute the use case to search events"""
+        query = query.strip()
+        if not query:
+            return {
+                "message": "Please enter a word from the event name:",
+                "events": [],
+                "next_step": "searching_events",
+                "keyboard": [[{"text": "Back to Main Menu", "callback_data": "main_menu"}]]
+            }
+        
+        events = await self.event_repository.search_events(query, self.limit)
+        
+        if not events:
+            return {
+                "message": f"No upcoming events match <b>{html.escape(query)}</b>. Try another word:",
+                "events": [],
+                "next_step": "searching_events",
+                "keyboard": [
+                    [{"text": "🎯 Browse Events", "callback_data": "browse_events"}],
+                    [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
+                ]
+            }
+        
+        message = f"🔎 Events matching <b>{html.escape(query)}</b>:\n\n"
+        keyboard = []
+        
+        for event in events:
+            formatted_date = event.date.strftime('%Y-%m-%d %H:%M')
+            message += f"• <b>{event.name}</b>\n  Date: {formatted_date}\n  ID: {event.event_id}\n\n"
+            keyboard.append([{
+                "text": f"Register: {event.name[:20]}...",
+                "callback_data": f"register_{event.event_id}"
+            }])
+        
+        keyboard.append([{"text": "🔎 New Search", "callback_data": "search_events"}])
+        keyboard.append([{"text": "Back to Main Menu", "callback_data": "main_menu"}])
+        
+        return {
+            "message": message.strip(),
+            "events": events,
+            "next_step": "searching_events",
+            "keyboard": keyboard
+        }
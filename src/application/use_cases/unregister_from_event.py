@@ -1,4 +1,5 @@
 from typing import Dict, Any
+from src.domain.entities.registration import RegistrationOutcome
 from src.domain.repositories.event_repository import EventRepository
 from src.domain.repositories.registration_repository import RegistrationRepository
 
@@ -11,11 +12,12 @@ class UnregisterFromEventUseCase:
         self.event_repository = event_repository
         self.registration_repository = registration_repository
     
-    def execute(self, user_id: str, event_id: str) -> Dict[str, Any]:
+    async def execute(self, user_id: str, event_id: str) -> Dict[str, Any]:
         """Execute the use case to unregister from an event"""
-        # Check if event exists
-        event = self.event_repository.get_event_by_id(event_id)
-        if not event:
+        # Existence and membership checks happen atomically with the delete
+        result = await self.registration_repository.try_unregister(user_id, event_id)
+        
+        if result.outcome == RegistrationOutcome.EVENT_NOT_FOUND:
             return {
                 "success": False,
                 "message": "Event not found",
@@ -23,8 +25,7 @@ class UnregisterFromEventUseCase:
                 "keyboard": []
             }
         
-        # Check if user is registered for the event
-        if not self.registration_repository.is_registered(user_id, event_id):
+        if result.outcome == RegistrationOutcome.NOT_REGISTERED:
             return {
                 "success": False,
                 "message": "You are not registered for this event",
@@ -32,23 +33,12 @@ class UnregisterFromEventUseCase:
                 "keyboard": []
             }
         
-        # Unregister user
-        success = self.registration_repository.unregister_user(user_id, event_id)
-        
-        if success:
-            return {
-                "success": True,
-                "message": f"Successfully unregistered from event: {event.name}",
-                "next_step": "my_events",
-                "keyboard": [
-                    [{"text": "📋 My Events", "callback_data": "my_events"}],
-                    [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-                ]
-            }
-        else:
-            return {
-                "success": False,
-                "message": "Failed to unregister from event",
-                "next_step": "my_events",
-                "keyboard": []
-            }
\ No newline at end of file
+        return {
+            "success": True,
+            "message": f"Successfully unregistered from event: {result.event_name}",
+            "next_step": "my_events",
+            "keyboard": [
+                [{"text": "📋 My Events", "callback_data": "my_events"}],
+                [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
+            ]
+        }
@@ -0,0 +1,147 @@
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from src.domain.entities.conversation_context import ConversationContext, CONTEXT_FIELDS
+
+
+# Returns the message to show for invalid input, or None if it is valid
+Validator = Callable[[str], Optional[str]]
+
+
+class ConversationError(ValueError):
+    """A state or a move the declared conversation does not allow"""
+
+
+class Step(NamedTuple):
+    """One conversation step, as declared in ``STEPS``
+    
+    ``leads_to`` lists the steps the input of this step moves the user to.
+    ``entry`` steps are reachable from every step, since their buttons stay
+    pressable in older messages. ``validate`` checks text typed in this
+    step and ``requires`` names the context fields a state in this step
+    must carry.
+    """
+    name: str
+    leads_to: Tuple[str, ...] = ()
+    entry: bool = False
+    validate: Optional[Validator] = None
+    requires: Tuple[str, ...] = ()
+
+
+def _person_name(too_short: str, too_long: str) -> Validator:
+    """Validator for a first or last name"""
+    def validate(text: str) -> Optional[str]:
+        if not text.replace(" ", "").isalpha():
+            return too_short
+        if len(text) > 50:
+            return too_long
+        return None
+    return validate
+
+
+def _birth_year(text: str) -> Optional[str]:
+    """Validator for a birth year"""
+    try:
+        year = int(text)
+    except ValueError:
+        return "Пожалуйста, введите год рождения числом."
+    if year < 1900 or year > 2024:
+        return "Год рождения должен быть между 1900 и 2024."
+    return None
+
+
+def _event_name(text: str) -> Optional[str]:
+    """Validator for the name of a new event"""
+    if len(text) > 100:
+        return "The event name is too long (100 characters max)."
+    return None
+
+
+STEPS = (
+    Step('main_menu', entry=True, leads_to=('enter_first_name',)),
+    Step('browse_events', entry=True),
+    Step('my_events', entry=True),
+    Step('searching_events', entry=True),
+    Step('admin_menu', entry=True),
+    Step(
+        'enter_first_name',
+        entry=True,
+        leads_to=('enter_last_name',),
+        validate=_person_name("Имя должно содержать только буквы.", "Имя слишком длинное (максимум 50 символов).")
+    ),
+    Step(
+        'enter_last_name',
+        leads_to=('enter_birth_year',),
+        validate=_person_name("Фамилия должна содержать только буквы.", "Фамилия слишком длинная (максимум 50 символов)."),
+        requires=('first_name',)
+    ),
+    Step(
+        'enter_birth_year',
+        leads_to=('main_menu',),
+        validate=_birth_year,
+        requires=('first_name', 'last_name')
+    ),
+    Step('creating_event_name', entry=True, leads_to=('creating_event_date',), validate=_event_name),
+    Step('creating_event_date', leads_to=('admin_menu',), requires=('event_name',)),
+)
+
+
+def _compile(steps: Tuple[Step, ...]) -> Tuple[
+    FrozenSet[str], Dict[str, FrozenSet[str]], Dict[str, Validator], Dict[str, Tuple[str, ...]]
+]:
+    """Turn the declarations into lookup tables, rejecting inconsistent ones"""
+    names = {step.name for step in steps}
+    if len(names) != len(steps):
+        raise ValueError("Conversation steps must have unique names")
+    entry = frozenset(step.name for step in steps if step.entry)
+    allowed = {}
+    for step in steps:
+        unknown = set(step.leads_to) - names
+        if unknown:
+            raise ValueError(f"Step {step.name} leads to unknown steps: {sorted(unknown)}")
+        missing = set(step.requires) - set(CONTEXT_FIELDS)
+        if missing:
+            raise ValueError(f"Step {step.name} requires unknown context fields: {sorted(missing)}")
+        # Staying put is always allowed, e.g. after invalid input
+        allowed[step.name] = entry | {step.name} | frozenset(step.leads_to)
+    validators = {step.name: step.validate for step in steps if step.validate is not None}
+    requirements = {step.name: step.requires for step in steps if step.requires}
+    return entry, allowed, validators, requirements
+
+
+_ENTRY, _ALLOWED, _VALIDATORS, _REQUIREMENTS = _compile(STEPS)
+
+
+def check_state(step: str, context: Optional[ConversationContext]) -> None:
+    """Raise ConversationError for an unknown step or a context the step cannot work with
+    
+    No context counts as an empty one, so it only fits steps that require nothing.
+    """
+    if step not in _ALLOWED:
+        raise ConversationError(f"Invalid step: {step}. Must be one of {sorted(_ALLOWED)}")
+    missing = missing_context(step, context)
+    if missing:
+        raise ConversationError(f"Step {step} requires context: {', '.join(missing)}")
+
+
+def missing_context(step: str, context: Optional[ConversationContext]) -> List[str]:
+    """Context fields ``step`` requires that ``context`` lacks; no context counts as an empty one"""
+    if context is None:
+        context = ConversationContext()
+    return [name for name in _REQUIREMENTS.get(step, ()) if getattr(context, name) is None]
+
+
+def check_transition(from_step: str, to_step: str) -> None:
+    """Raise ConversationError unless the conversation may move from ``from_step`` to ``to_step``
+    
+    A stored step that is no longer declared can still move to entry steps.
+    """
+    if to_step not in _ALLOWED.get(from_step, _ENTRY):
+        raise ConversationError(f"Cannot move from step {from_step} to {to_step}")
+
+
+def validate_input(step: str, text: str) -> Optional[str]:
+    """Message explaining why ``text`` is not valid input for ``step``, or None"""
+    text = text.strip()
+    if not text:
+        return "Пожалуйста, введите значение."
+    validate = _VALIDATORS.get(step)
+    return validate(text) if validate is not None else None
@@ -0,0 +1,91 @@
+import ast
+import json
+from dataclasses import fields, replace
+from typing import Any, Dict, Optional
+from src.domain.entities.slotted import LazyField, entity
+
+
+# Bump when fields are renamed, reordered or removed; new fields are only
+# ever appended, and older encodings leave them None
+CONTEXT_VERSION = 1
+
+
+@entity(frozen=True)
+class ConversationContext:
+    """Answers collected over a multi-step conversation"""
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    event_name: Optional[str] = None
+    
+    def update(self, **changes: Any) -> 'ConversationContext':
+        """Return a new context with ``changes`` applied"""
+        return replace(self, **changes)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """The fields that are set, by name"""
+        return {name: getattr(self, name) for name in CONTEXT_FIELDS if getattr(self, name) is not None}
+    
+    def encode(self) -> str:
+        """Compact stored form: the version, then the field values in order"""
+        values = [getattr(self, name) for name in CONTEXT_FIELDS]
+        while values and values[-1] is None:
+            values.pop()
+        return json.dumps([CONTEXT_VERSION, *values], ensure_ascii=False, separators=(",", ":"))
+    
+    @classmethod
+    def decode(cls, text: str) -> 'ConversationContext':
+        """Parse a stored context, including the dict forms written before versioning
+        
+        A context that cannot be read, e.g. a corrupted one or one written by
+        a newer version, is reported and replaced by an empty one. A step
+        that needs the lost answers then starts its flow over, see
+        ``missing_context``.
+        """
+        try:
+            return cls._parse(text)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError) as e:
+            print(f"Error decoding conversation context, starting over: {e}")
+            return cls()
+    
+    @classmethod
+    def _parse(cls, text: str) -> 'ConversationContext':
+        """``decode`` without the fallback; raises on anything unreadable"""
+        if text.startswith("["):
+            version, *values = json.loads(text)
+            if version != CONTEXT_VERSION:
+                raise ValueError(f"Unsupported context version: {version}")
+            values += [None] * (len(CONTEXT_FIELDS) - len(values))
+            return cls.from_row(*values)
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # Event creation used to store str(dict)
+            data = ast.literal_eval(text)
+        if not isinstance(data, dict):
+            raise ValueError(f"Unexpected context: {text!r}")
+        return cls(**{name: data[name] for name in CONTEXT_FIELDS if name in data})
+
+
+CONTEXT_FIELDS = tuple(f.name for f in fields(ConversationContext))
+
+
+class ContextField(LazyField):
+    """Entity field that stores the encoded context and decodes it on first read
+    
+    Accepts a ``ConversationContext``, its stored string, or None; a state
+    read from storage and saved again without touching its context is never
+    decoded or re-encoded.
+    """
+    
+    def decode(self, value: Any) -> Any:
+        """The stored string becomes a ``ConversationContext``"""
+        if isinstance(value, str):
+            return ConversationContext.decode(value) if value else None
+        return value
+
+
+def encode_context(value: Any) -> Optional[str]:
+    """Stored form of a ``ContextField`` value, encoding only if it was decoded"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.encode()
@@ -1,27 +1,30 @@
-from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 import uuid
+from src.domain.entities.slotted import entity
+from src.domain.entities.timestamps import EpochDateTime
 
 
-@dataclass
+@entity(frozen=True)
 class Event:
     """Event entity"""
     event_id: str
     name: str
-    date: datetime
+    date: datetime = EpochDateTime()
     created_by: str
-    created_at: Optional[datetime] = None
+    created_at: Optional[datetime] = EpochDateTime(default=None)
+    capacity: Optional[int] = None  # None means unlimited seats
     
     @classmethod
-    def create(cls, name: str, date: datetime, created_by: str) -> 'Event':
+    def create(cls, name: str, date: datetime, created_by: str, capacity: Optional[int] = None) -> 'Event':
         """Create a new event with a unique ID"""
         return cls(
             event_id=str(uuid.uuid4()),
             name=name,
             date=date,
             created_by=created_by,
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            capacity=capacity
         )
     
     def is_in_future(self) -> bool:
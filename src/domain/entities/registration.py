@@ -1,14 +1,17 @@
 from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
 from typing import Optional
+from src.domain.entities.slotted import entity
+from src.domain.entities.timestamps import EpochDateTime
 
 
-@dataclass
+@entity(frozen=True)
 class Registration:
     """Registration entity"""
     user_id: str
     event_id: str
-    created_at: Optional[datetime] = None
+    created_at: Optional[datetime] = EpochDateTime(default=None)
     
     @classmethod
     def create(cls, user_id: str, event_id: str) -> 'Registration':
@@ -17,4 +20,22 @@ class Registration:
             user_id=user_id,
             event_id=event_id,
             created_at=datetime.now()
-        )
\ No newline at end of file
+        )
+
+
+class RegistrationOutcome(Enum):
+    """Result of an atomic register/unregister attempt"""
+    REGISTERED = "registered"
+    ALREADY_REGISTERED = "already_registered"
+    UNREGISTERED = "unregistered"
+    NOT_REGISTERED = "not_registered"
+    EVENT_NOT_FOUND = "event_not_found"
+    EVENT_IN_PAST = "event_in_past"
+    EVENT_FULL = "event_full"
+
+
+@dataclass
+class RegistrationResult:
+    """Outcome of a register/unregister attempt plus the event name, if known"""
+    outcome: RegistrationOutcome
+    event_name: Optional[str] = None
\ No newline at end of file
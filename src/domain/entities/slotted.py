@@ -0,0 +1,105 @@
+from dataclasses import MISSING, dataclass, fields
+from typing import Any, Callable, Optional, Type, TypeVar
+
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class LazyField:
+    """Dataclass field descriptor that keeps the raw stored value until first read
+    
+    Repositories pass column values straight through; ``decode`` runs the
+    first time the attribute is read and the result replaces the raw value.
+    Only works on classes built with ``entity``, which backs the field with a
+    slot.
+    """
+    
+    def __init__(self, default: Any = _MISSING):
+        self._default = default
+        self._slot: Any = None
+    
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+    
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Any:
+        if obj is None:
+            if self._default is _MISSING:
+                # Tells @dataclass that the field has no default
+                raise AttributeError(self._name)
+            return self._default
+        value = self._slot.__get__(obj)
+        decoded = self.decode(value)
+        if decoded is not value:
+            self._slot.__set__(obj, decoded)
+        return decoded
+    
+    def __set__(self, obj: Any, value: Any) -> None:
+        self._slot.__set__(obj, value)
+    
+    def raw(self, obj: Any) -> Any:
+        """The stored value, without decoding it"""
+        return self._slot.__get__(obj)
+    
+    def decode(self, value: Any) -> Any:
+        """Turn a raw stored value into the attribute value"""
+        return value
+
+
+def entity(cls: Optional[Type[T]] = None, *, frozen: bool = False) -> Any:
+    """``@dataclass(slots=True)`` that keeps ``LazyField`` descriptors working
+    
+    Slots drop the per-instance ``__dict__``, and the generated
+    ``from_row`` classmethod builds an instance from trusted stored values
+    positionally, in field order, without running ``__init__`` or
+    ``__post_init__`` validation.
+    """
+    def wrap(cls: Type[T]) -> Type[T]:
+        lazy = {name: value for name, value in vars(cls).items() if isinstance(value, LazyField)}
+        cls = dataclass(cls, slots=True, frozen=frozen)
+        # The slotted class stores every field in a slot, replacing the
+        # descriptors; put them back on top of the slot storage
+        for name, descriptor in lazy.items():
+            descriptor._slot = cls.__dict__[name]
+            setattr(cls, name, descriptor)
+        cls.from_row = classmethod(_trusted_constructor(cls))
+        return cls
+    
+    return wrap(cls) if cls is not None else wrap
+
+
+def raw_value(obj: Any, name: str) -> Any:
+    """The stored value of a ``LazyField``, without decoding it"""
+    return vars(type(obj))[name].raw(obj)
+
+
+def _slot_of(cls: type, name: str) -> Any:
+    """The slot member descriptor behind a field, even under a ``LazyField``"""
+    attribute = cls.__dict__[name]
+    return attribute._slot if isinstance(attribute, LazyField) else attribute
+
+
+def _trusted_constructor(cls: type) -> Callable[..., Any]:
+    """Generate ``from_row(cls, *values)`` that fills the slots directly
+    
+    Generated source like the dataclass ``__init__``: one direct slot store
+    per field is much cheaper than ``__init__``, which goes through
+    ``object.__setattr__`` on frozen classes and validates in
+    ``__post_init__``.
+    """
+    init_fields = [f for f in fields(cls) if f.init]
+    other_fields = [f for f in fields(cls) if not f.init]
+    namespace = {"_new": object.__new__}
+    lines = []
+    for f in init_fields:
+        namespace[f"_set_{f.name}"] = _slot_of(cls, f.name).__set__
+        lines.append(f"    _set_{f.name}(obj, {f.name})")
+    for f in other_fields:
+        namespace[f"_set_{f.name}"] = _slot_of(cls, f.name).__set__
+        namespace[f"_default_{f.name}"] = f.default if f.default is not MISSING else None
+        lines.append(f"    _set_{f.name}(obj, _default_{f.name})")
+    params = "".join(f", {f.name}" for f in init_fields)
+    source = f"def from_row(cls{params}):\n    obj = _new(cls)\n" + "\n".join(lines) + "\n    return obj\n"
+    exec(source, namespace)
+    return namespace["from_row"]
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Any, Optional
+from src.domain.entities.slotted import LazyField, raw_value
+
+
+def to_epoch(value: datetime) -> int:
+    """Convert a datetime to integer UTC epoch seconds
+
+    Naive datetimes are interpreted as local time, matching ``datetime.now()``.
+    """
+    return int(value.timestamp())
+
+
+def from_epoch(value: int) -> datetime:
+    """Convert integer UTC epoch seconds to a naive local datetime"""
+    return datetime.fromtimestamp(value)
+
+
+def epoch_of(obj: Any, name: str) -> Optional[int]:
+    """Epoch seconds of an ``EpochDateTime`` field, without decoding it first"""
+    value = raw_value(obj, name)
+    if value is None or isinstance(value, int):
+        return value
+    return to_epoch(value)
+
+
+class EpochDateTime(LazyField):
+    """Entity field that stores epoch seconds and decodes lazily
+
+    Repositories pass the integer column value straight through; it is only
+    turned into a ``datetime`` the first time the attribute is read, so list
+    queries no longer pay a parse per row. Assigning a ``datetime`` works as
+    before.
+    """
+
+    def decode(self, value: Any) -> Any:
+        """Epoch seconds become a naive local datetime"""
+        return from_epoch(value) if isinstance(value, int) else value
@@ -1,8 +1,8 @@
-from dataclasses import dataclass
 from typing import Optional
+from src.domain.entities.slotted import entity
 
 
-@dataclass
+@entity(frozen=True)
 class User:
     user_id: str
     first_name: str
@@ -1,41 +1,49 @@
-from dataclasses import dataclass
 from typing import Optional
-import json
 from datetime import datetime
+from src.domain.entities.conversation import check_state, check_transition
+from src.domain.entities.conversation_context import ContextField, ConversationContext, encode_context
+from src.domain.entities.slotted import entity, raw_value
+from src.domain.entities.timestamps import EpochDateTime
 
 
-@dataclass
+@entity(frozen=True)
 class UserState:
     user_id: str
     current_step: str
-    context: Optional[str] = None
-    updated_at: Optional[datetime] = None
+    context: Optional[ConversationContext] = ContextField(default=None)
+    updated_at: Optional[datetime] = EpochDateTime(default=None)
     
     def __post_init__(self):
-        # Validate current_step
-        valid_steps = [
-            'main_menu', 
-            'enter_first_name', 
-            'enter_last_name', 
-            'enter_birth_year'
-        ]
-        if self.current_step not in valid_steps:
-            raise ValueError(f"Invalid step: {self.current_step}. Must be one of {valid_steps}")
+        # Validate current_step and the context it needs
+        check_state(self.current_step, self.context)
     
     @property
     def context_data(self) -> dict:
-        """Get context as a dictionary, return empty dict if context is None"""
-        if self.context:
-            return json.loads(self.context)
-        return {}
+        """Get the set context fields as a dictionary, empty if there is no context"""
+        return self.context.as_dict() if self.context else {}
+    
+    @classmethod
+    def transition(
+        cls, from_step: str, user_id: str, step: str, context: Optional[ConversationContext] = None
+    ) -> 'UserState':
+        """New state moving the user from ``from_step`` to ``step``
+        
+        Raises ConversationError if the conversation does not allow the move or the
+        context does not fit the step, before anything is saved.
+        """
+        check_transition(from_step, step)
+        return cls(user_id=user_id, current_step=step, context=context)
     
     def update_context(self, data: dict) -> 'UserState':
         """Return a new UserState with updated context"""
-        updated_context = self.context_data.copy()
-        updated_context.update(data)
         return UserState(
             user_id=self.user_id,
             current_step=self.current_step,
-            context=json.dumps(updated_context),
+            context=(self.context or ConversationContext()).update(**data),
             updated_at=self.updated_at
-        )
\ No newline at end of file
+        )
+
+
+def stored_context(state: UserState) -> Optional[str]:
+    """The context column value of ``state``, encoded only if it was decoded"""
+    return encode_context(raw_value(state, "context"))
\ No newline at end of file
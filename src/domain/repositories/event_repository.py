@@ -1,32 +1,79 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional
 from src.domain.entities.event import Event
 
 
+class EventCursor(NamedTuple):
+    """Keyset position of an event in (date, event_id) order"""
+    date: datetime
+    event_id: str
+    
+    @classmethod
+    def of(cls, event: Event) -> 'EventCursor':
+        """Cursor pointing at the given event"""
+        return cls(event.date, event.event_id)
+
+
 class EventRepository(ABC):
     """Interface for event repository"""
     
     @abstractmethod
-    def create_event(self, event: Event) -> Event:
+    async def create_event(self, event: Event) -> Event:
         """Create a new event"""
         pass
     
     @abstractmethod
-    def get_event_by_id(self, event_id: str) -> Optional[Event]:
-        """Get event by ID"""
+    async def get_event_by_id(self, event_id: str, include_archive: bool = False) -> Optional[Event]:
+        """Get event by ID, falling back to archived events if asked to"""
+        pass
+    
+    @abstractmethod
+    async def get_events_by_ids(self, event_ids: List[str]) -> List[Event]:
+        """Get the existing events among the given IDs in one query"""
         pass
     
     @abstractmethod
-    def get_all_events(self) -> List[Event]:
-        """Get all events"""
+    async def get_all_events(self, include_archive: bool = False) -> List[Event]:
+        """Get all events, optionally including archived ones"""
         pass
     
     @abstractmethod
-    def get_future_events(self) -> List[Event]:
+    async def get_future_events(self) -> List[Event]:
         """Get all future events"""
         pass
     
     @abstractmethod
-    def delete_event(self, event_id: str) -> bool:
+    async def get_future_events_page(
+        self,
+        limit: int,
+        after: Optional[EventCursor] = None,
+        before: Optional[EventCursor] = None
+    ) -> List[Event]:
+        """Get up to ``limit`` future events after or before a cursor, in date order"""
+        pass
+    
+    @abstractmethod
+    async def search_events(self, query: str, limit: int = 10) -> List[Event]:
+        """Find future events whose name matches ``query``, best matches first"""
+        pass
+    
+    @abstractmethod
+    async def delete_event(self, event_id: str) -> bool:
         """Delete an event"""
-        pass
\ No newline at end of file
+        pass
+    
+    @abstractmethod
+    async def import_events(self, events: Iterable[Event]) -> int:
+        """Insert many events in large batches, skipping existing IDs; return how many were added"""
+        pass
+    
+    @abstractmethod
+    def iter_all_events(self, batch_size: int = 1000, include_archive: bool = False) -> AsyncIterator[Event]:
+        """Iterate over all events in date order without loading them all at once"""
+        pass
+    
+    @abstractmethod
+    def iter_future_events(self, batch_size: int = 1000) -> AsyncIterator[Event]:
+        """Iterate over future events in date order without loading them all at once"""
+        pass
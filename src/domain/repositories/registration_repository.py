@@ -1,32 +1,77 @@
 from abc import ABC, abstractmethod
-from typing import List
-from src.domain.entities.registration import Registration
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional
+from src.domain.entities.event import Event
+from src.domain.entities.registration import Registration, RegistrationResult
 
 
 class RegistrationRepository(ABC):
     """Interface for registration repository"""
     
     @abstractmethod
-    def register_user(self, registration: Registration) -> Registration:
+    async def register_user(self, registration: Registration) -> Registration:
         """Register user for an event"""
         pass
     
     @abstractmethod
-    def unregister_user(self, user_id: str, event_id: str) -> bool:
+    async def try_register(self, user_id: str, event_id: str, now: datetime) -> RegistrationResult:
+        """Atomically register the user if the event exists, is after ``now``
+        and the user is not registered yet"""
+        pass
+    
+    @abstractmethod
+    async def try_unregister(self, user_id: str, event_id: str) -> RegistrationResult:
+        """Atomically unregister the user if the event exists and they are registered"""
+        pass
+    
+    @abstractmethod
+    async def unregister_user(self, user_id: str, event_id: str) -> bool:
         """Unregister user from an event"""
         pass
     
     @abstractmethod
-    def is_registered(self, user_id: str, event_id: str) -> bool:
+    async def is_registered(self, user_id: str, event_id: str) -> bool:
         """Check if user is registered for an event"""
         pass
     
     @abstractmethod
-    def get_user_registrations(self, user_id: str) -> List[Registration]:
-        """Get all registrations for a user"""
+    async def get_user_registrations(self, user_id: str, include_archive: bool = False) -> List[Registration]:
+        """Get all registrations for a user, optionally including archived ones"""
         pass
     
     @abstractmethod
-    def get_event_registrations(self, event_id: str) -> List[Registration]:
-        """Get all registrations for an event"""
-        pass
\ No newline at end of file
+    async def count_event_registrations(self, event_id: str) -> int:
+        """Count the users registered for an event"""
+        pass
+    
+    @abstractmethod
+    async def get_event_registrations(self, event_id: str, include_archive: bool = False) -> List[Registration]:
+        """Get all registrations for an event, optionally including archived ones"""
+        pass
+    
+    @abstractmethod
+    async def get_user_upcoming_events(
+        self, user_id: str, now: datetime, limit: Optional[int] = None
+    ) -> List[Event]:
+        """Get events after ``now`` the user is registered for, in registration order"""
+        pass
+    
+    @abstractmethod
+    async def import_registrations(self, registrations: Iterable[Registration]) -> int:
+        """Insert many registrations in large batches, skipping duplicates; return how many were added"""
+        pass
+    
+    @abstractmethod
+    def iter_all_registrations(self, batch_size: int = 1000, include_archive: bool = False) -> AsyncIterator[Registration]:
+        """Iterate over all registrations without loading them all at once"""
+        pass
+    
+    @abstractmethod
+    def iter_user_registrations(self, user_id: str, batch_size: int = 1000) -> AsyncIterator[Registration]:
+        """Iterate over a user's registrations in registration order"""
+        pass
+    
+    @abstractmethod
+    def iter_event_registrations(self, event_id: str, batch_size: int = 1000) -> AsyncIterator[Registration]:
+        """Iterate over an event's registrations in registration order"""
+        pass
@@ -0,0 +1,151 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from src.domain.entities.timestamps import to_epoch
+from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.sharding import UserDatabase
+from src.infrastructure.repositories.sqlite_event_repository import unindex_events
+
+
+class EventArchiver:
+    """Moves past events and their registrations into the archive tables
+    
+    Every ``interval`` seconds, events that ended more than ``horizon_days``
+    ago are moved from ``events`` to ``events_archive`` and their
+    registrations from ``registrations`` to ``registrations_archive``, in
+    batches of ``batch_size`` events with a ``batch_pause`` sleep in between
+    so the writer stays available to the bot. The hot tables then only grow
+    with upcoming and recent events.
+    
+    Registrations are moved first, shard by shard, and the events last; each
+    step is its own transaction and copies with INSERT OR IGNORE, so a run
+    that is interrupted is simply finished by the next one.
+    """
+    
+    def __init__(
+        self,
+        db_connection: DatabaseConnection,
+        user_db: UserDatabase,
+        horizon_days: float = 30.0,
+        batch_size: int = 500,
+        interval: float = 3600.0,
+        batch_pause: float = 0.05,
+        on_archive: Optional[Callable[[List[str]], None]] = None
+    ):
+        self.db = db_connection
+        self.user_db = user_db
+        self.horizon_days = horizon_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.batch_pause = batch_pause
+        self.on_archive = on_archive
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.archived_events = 0
+        self.archived_registrations = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Archiver counters for monitoring"""
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "archived_events": self.archived_events,
+            "archived_registrations": self.archived_registrations
+        }
+    
+    async def start(self) -> None:
+        """Start the periodic archiving loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+    
+    async def stop(self) -> None:
+        """Stop the loop, letting a batch in progress finish"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        # Waiting for the lock lets a running batch complete
+        async with self._lock:
+            pass
+        await asyncio.gather(task, return_exceptions=True)
+    
+    async def archive(self, now: Optional[datetime] = None) -> int:
+        """Archive every event older than the horizon; returns how many were moved"""
+        cutoff = to_epoch((now or datetime.now()) - timedelta(days=self.horizon_days))
+        moved = 0
+        while True:
+            async with self._lock:
+                event_ids = await self._archive_batch(cutoff)
+            if not event_ids:
+                break
+            moved += len(event_ids)
+            if self.on_archive is not None:
+                self.on_archive(event_ids)
+            await asyncio.sleep(self.batch_pause)
+        self.runs += 1
+        return moved
+    
+    async def _archive_batch(self, cutoff: int) -> List[str]:
+        """Move the oldest batch of events before ``cutoff``; returns their IDs"""
+        rows = await self.db.fetch_all(
+            "SELECT event_id FROM events WHERE date < ? ORDER BY date ASC LIMIT ?",
+            (cutoff, self.batch_size)
+        )
+        event_ids = [row['event_id'] for row in rows]
+        if not event_ids:
+            return []
+        for shard in self.user_db.shards:
+            if shard is not self.db:
+                self.archived_registrations += await shard.run_in_transaction(
+                    lambda conn: self._move_registrations(conn, event_ids)
+                )
+        self.archived_registrations += await self.db.run_in_transaction(
+            lambda conn: self._move_events(conn, event_ids)
+        )
+        self.archived_events += len(event_ids)
+        return event_ids
+    
+    @staticmethod
+    def _move_registrations(conn: sqlite3.Connection, event_ids: List[str]) -> int:
+        """Move the registrations of ``event_ids``; returns how many were moved"""
+        placeholders = ", ".join("?" * len(event_ids))
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO registrations_archive
+            SELECT * FROM registrations WHERE event_id IN ({placeholders})
+            """,
+            event_ids
+        )
+        return conn.execute(
+            f"DELETE FROM registrations WHERE event_id IN ({placeholders})", event_ids
+        ).rowcount
+    
+    @staticmethod
+    def _move_events(conn: sqlite3.Connection, event_ids: List[str]) -> int:
+        """Move ``event_ids`` with any registrations stored alongside them
+        
+        Returns how many registrations were moved.
+        """
+        moved = EventArchiver._move_registrations(conn, event_ids)
+        placeholders = ", ".join("?" * len(event_ids))
+        conn.execute(
+            f"INSERT OR IGNORE INTO events_archive SELECT * FROM events WHERE event_id IN ({placeholders})",
+            event_ids
+        )
+        unindex_events(conn, event_ids)
+        conn.execute(f"DELETE FROM events WHERE event_id IN ({placeholders})", event_ids)
+        return moved
+    
+    async def _run_periodically(self) -> None:
+        """Archive every ``interval`` seconds until cancelled"""
+        while True:
+            try:
+                await self.archive()
+            except Exception as e:
+                self.failures += 1
+                print(f"Error archiving events: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+from src.infrastructure.database.connection import DatabaseConnection
+
+
+@dataclass
+class BackupStats:
+    """Outcome of copying one database"""
+    source: str
+    path: str
+    pages: int
+    duration: float
+    finished_at: datetime
+    
+    @property
+    def pages_per_second(self) -> float:
+        """Copy throughput"""
+        return self.pages / self.duration if self.duration > 0 else float(self.pages)
+
+
+class BackupManager:
+    """Online backups with the SQLite backup API
+    
+    Every ``interval`` seconds each database is copied into a new
+    timestamped snapshot in ``backup_dir``; only the newest ``keep``
+    snapshots per database are kept. With ``standby_dir`` set, a warm
+    standby copy of each database is also refreshed every
+    ``standby_interval`` seconds.
+    
+    Copies run on their own thread and connection, ``pages_per_step`` pages
+    at a time with a ``step_pause`` sleep in between, so the copy leaves
+    disk bandwidth to the bot. In-memory databases can only be copied on
+    their writer thread and are copied without pauses. The source connection
+    holds one read snapshot for the whole copy, so in WAL mode the bot keeps
+    reading and writing throughout and the copy is consistent instead of
+    restarting on every write. Files are written under a temporary name and
+    renamed when complete, so a snapshot or standby on disk is never partial.
+    """
+    
+    def __init__(
+        self,
+        databases: Sequence[DatabaseConnection],
+        backup_dir: str,
+        keep: int = 7,
+        interval: float = 3600.0,
+        standby_dir: Optional[str] = None,
+        standby_interval: float = 60.0,
+        pages_per_step: int = 256,
+        step_pause: float = 0.005
+    ):
+        if keep < 1:
+            raise ValueError("At least one snapshot must be kept")
+        self.databases = list(databases)
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.interval = interval
+        self.standby_dir = standby_dir
+        self.standby_interval = standby_interval
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self._tasks: List[asyncio.Task] = []
+        self._lock = asyncio.Lock()
+        self.last_snapshot: List[BackupStats] = []
+        self.last_standby: List[BackupStats] = []
+        self.snapshots = 0
+        self.standby_refreshes = 0
+        self.failures = 0
+    
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Backup metrics for monitoring"""
+        stats: Dict[str, float] = {
+            "snapshots": self.snapshots,
+            "standby_refreshes": self.standby_refreshes,
+            "failures": self.failures
+        }
+        for name, copies in (("snapshot", self.last_snapshot), ("standby", self.last_standby)):
+            if copies:
+                pages = sum(copy.pages for copy in copies)
+                duration = sum(copy.duration for copy in copies)
+                stats[f"last_{name}_pages"] = pages
+                stats[f"last_{name}_duration"] = duration
+                stats[f"last_{name}_pages_per_second"] = pages / duration if duration > 0 else float(pages)
+                stats[f"last_{name}_finished_at"] = max(copy.finished_at for copy in copies).timestamp()
+        return stats
+    
+    async def start(self) -> None:
+        """Start the periodic snapshot and standby loops"""
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._every(self.interval, self.snapshot)))
+        if self.standby_dir:
+            self._tasks.append(asyncio.create_task(self._every(self.standby_interval, self.refresh_standby)))
+    
+    async def stop(self) -> None:
+        """Stop the loops, letting a copy in progress finish"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        # Waiting for the lock lets a running copy complete
+        async with self._lock:
+            pass
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def snapshot(self) -> List[BackupStats]:
+        """Write a new timestamped snapshot of every database and prune old ones"""
+        async with self._lock:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            suffix = datetime.now().strftime("%Y%m%d-%H%M%S")
+            copies = []
+            for db in self.databases:
+                stem = self._stem(db)
+                path = os.path.join(self.backup_dir, f"{stem}-{suffix}.db")
+                copies.append(await self._copy(db, path))
+                await asyncio.to_thread(self._prune, stem)
+            self.last_snapshot = copies
+            self.snapshots += 1
+            return copies
+    
+    async def refresh_standby(self) -> List[BackupStats]:
+        """Bring the warm standby copy of every database up to date"""
+        if not self.standby_dir:
+            raise ValueError("No standby directory configured")
+        async with self._lock:
+            os.makedirs(self.standby_dir, exist_ok=True)
+            copies = [
+                await self._copy(db, os.path.join(self.standby_dir, f"{self._stem(db)}.db"))
+                for db in self.databases
+            ]
+            self.last_standby = copies
+            self.standby_refreshes += 1
+            return copies
+    
+    async def _every(self, seconds: float, job: Callable[[], Awaitable[object]]) -> None:
+        """Run ``job`` every ``seconds`` until cancelled"""
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await job()
+            except Exception as e:
+                self.failures += 1
+                print(f"Error backing up database: {e}")
+    
+    async def _copy(self, db: DatabaseConnection, path: str) -> BackupStats:
+        """Copy one database to ``path``"""
+        if db.is_memory:
+            # Only the writer connection can see an in-memory database
+            return await db.run(lambda conn: self._copy_from(conn, db.db_path, path, pause=0))
+        return await asyncio.to_thread(self._copy_file, db, path)
+    
+    def _copy_file(self, db: DatabaseConnection, path: str) -> BackupStats:
+        """Copy a file database from a dedicated connection pinned to one snapshot"""
+        source = sqlite3.connect(db.db_path, timeout=db.busy_timeout / 1000)
+        try:
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            return self._copy_from(source, db.db_path, path)
+        finally:
+            source.close()
+    
+    def _copy_from(
+        self, source: sqlite3.Connection, name: str, path: str, pause: Optional[float] = None
+    ) -> BackupStats:
+        """Run the backup in steps into a temporary file and move it into place
+        
+        ``pause`` seconds, ``step_pause`` by default, are slept between steps.
+        """
+        pause = self.step_pause if pause is None else pause
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        pages = 0
+        
+        def progress(status: int, remaining: int, total: int) -> None:
+            nonlocal pages
+            pages = total
+            # Called after every step; backup()'s own sleep argument only
+            # applies when the source is busy or locked
+            if remaining and pause > 0:
+                time.sleep(pause)
+        
+        started = time.perf_counter()
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target, pages=self.pages_per_step, progress=progress)
+            # A self-contained file: no -wal sidecar next to the copy
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+        os.replace(tmp_path, path)
+        return BackupStats(
+            source=name,
+            path=path,
+            pages=pages,
+            duration=time.perf_counter() - started,
+            finished_at=datetime.now()
+        )
+    
+    def _prune(self, stem: str) -> None:
+        """Delete all but the newest ``keep`` snapshots of one database"""
+        snapshots = sorted(
+            name for name in os.listdir(self.backup_dir)
+            if name.startswith(f"{stem}-") and name.endswith(".db")
+        )
+        for name in snapshots[:max(len(snapshots) - self.keep, 0)]:
+            os.remove(os.path.join(self.backup_dir, name))
+    
+    @staticmethod
+    def _stem(db: DatabaseConnection) -> str:
+        """File name stem used for a database's copies"""
+        if db.is_memory:
+            return "memory"
+        return os.path.splitext(os.path.basename(db.db_path))[0]
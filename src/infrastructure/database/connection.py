@@ -1,78 +1,345 @@
+import asyncio
 import sqlite3
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, NamedTuple, Optional, Sequence, Set, TypeVar
 import os
+from src.infrastructure.database.group_commit import GroupCommitWriter
+from src.infrastructure.database.migrations import apply_migrations
+
+
+T = TypeVar('T')
+
+JOURNAL_MODES = frozenset({"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"})
+SYNCHRONOUS_MODES = frozenset({"OFF", "NORMAL", "FULL", "EXTRA"})
+
+
+class StagedWrite(NamedTuple):
+    """A save prepared to run inside a transaction on ``db`` that someone else commits
+    
+    ``apply`` runs on the open transaction; ``committed`` is called once it
+    has committed, e.g. to refresh a cache.
+    """
+    db: "DatabaseConnection"
+    apply: Callable[[sqlite3.Connection], None]
+    committed: Callable[[], None] = lambda: None
 
 
 class DatabaseConnection:
-    """Database connection manager for SQLite"""
+    """Database connection manager for SQLite
+
+    Writes go through a single writer connection owned by a dedicated
+    writer thread. Reads are served by a pool of reader threads, each with
+    its own connection, so browse traffic never queues behind registrations.
+    File databases run in WAL mode so readers and the writer do not block
+    each other. In-memory databases cannot be shared between connections,
+    so for them every call is served by the writer connection.
+
+    ``get_connection`` remains available for synchronous callers such as
+    tests and maintenance scripts; it returns the writer connection.
+
+    With ``group_commit_window_ms`` set, ``execute_grouped`` writes that
+    arrive within the window share one transaction and one commit. Grouped
+    callers are told their write is durable, so group commit raises
+    ``synchronous`` to ``FULL``: in WAL mode ``NORMAL`` does not sync the
+    log on commit.
     
-    def __init__(self, db_path: str = "bot_database.db"):
+    A shard of a ``ShardedDatabase`` is given the main database as its
+    ``catalog``: it is attached to every connection and temporary
+    ``events`` and ``events_archive`` views over it shadow the shard's own
+    (empty) tables, so registration queries joining them work unchanged.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "bot_database.db",
+        read_pool_size: int = 4,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        cache_size: int = -16000,
+        mmap_size: int = 268435456,
+        busy_timeout: int = 5000,
+        group_commit_window_ms: float = 0,
+        group_commit_max_batch: int = 64,
+        catalog: Optional["DatabaseConnection"] = None
+    ):
+        if catalog is not None and catalog.is_memory:
+            raise ValueError("An in-memory database cannot be attached as a catalog")
+        # Both end up in PRAGMA statements, which cannot take parameters
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Invalid journal mode: {journal_mode}. Must be one of {sorted(JOURNAL_MODES)}")
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid synchronous mode: {synchronous}. Must be one of {sorted(SYNCHRONOUS_MODES)}")
+        if group_commit_window_ms > 0 and synchronous in ("OFF", "NORMAL"):
+            synchronous = "FULL"
         self.db_path = db_path
+        self.catalog = catalog
+        self.read_pool_size = read_pool_size
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
         self.connection: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._db_thread_ids: Set[int] = set()
+        self._init_lock = threading.Lock()
+        self._local = threading.local()
+        self._read_connections: List[sqlite3.Connection] = []
+        self.group_commit: Optional[GroupCommitWriter] = None
+        if group_commit_window_ms > 0:
+            self.group_commit = GroupCommitWriter(
+                self._get_executor,
+                self.get_connection,
+                window=group_commit_window_ms / 1000,
+                max_batch=group_commit_max_batch
+            )
+
+    @property
+    def is_memory(self) -> bool:
+        """Whether this is a private in-memory database"""
+        return self.db_path == ":memory:" or self.db_path.startswith("file::memory:")
+
+    @property
+    def uses_read_pool(self) -> bool:
+        """Whether reads are served by separate reader connections"""
+        return self.read_pool_size > 0 and not self.is_memory
+
+    @property
+    def shards(self) -> List["DatabaseConnection"]:
+        """The databases holding user-keyed rows; just this one when unsharded"""
+        return [self]
+    
+    def shard_for(self, key: str) -> "DatabaseConnection":
+        """The database holding rows for ``key``"""
+        return self
     
     def get_connection(self) -> sqlite3.Connection:
-        """Get database connection, creating it if necessary"""
+        """Get the writer connection, creating it if necessary"""
         if self.connection is None:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row  # Enable dict-like access
-            self._create_tables()
+            with self._init_lock:
+                if self.connection is None:
+                    # The connection is shared with the writer thread
+                    connection = self._connect()
+                    connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+                    connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+                    self._migrate(connection)
+                    self._attach_catalog(connection)
+                    self.connection = connection
         return self.connection
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the configured per-connection pragmas"""
+        connection = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            check_same_thread=False
+        )
+        connection.row_factory = sqlite3.Row  # Enable dict-like access
+        connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        connection.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return connection
+
+    def _attach_catalog(self, connection: sqlite3.Connection) -> None:
+        """Attach the catalog database and read its events through temp views"""
+        if self.catalog is None:
+            return
+        # The catalog's schema must exist before the view can refer to it
+        self.catalog.get_connection()
+        connection.execute("ATTACH DATABASE ? AS catalog", (self.catalog.db_path,))
+        connection.execute("CREATE TEMP VIEW IF NOT EXISTS events AS SELECT * FROM catalog.events")
+        connection.execute("CREATE TEMP VIEW IF NOT EXISTS events_archive AS SELECT * FROM catalog.events_archive")
     
-    def _create_tables(self) -> None:
-        """Create required tables if they don't exist"""
-        conn = self.get_connection()
-        
-        # Create users table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id TEXT PRIMARY KEY,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                birth_year INTEGER NOT NULL,
-                is_admin BOOLEAN DEFAULT FALSE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    def _get_read_connection(self) -> sqlite3.Connection:
+        """Get the calling reader thread's connection, creating it if necessary"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Make sure the schema exists before the first reader opens
+            self.get_connection()
+            connection = self._connect()
+            self._attach_catalog(connection)
+            connection.execute("PRAGMA query_only = ON")
+            self._local.connection = connection
+            with self._init_lock:
+                self._read_connections.append(connection)
+        return connection
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the single-threaded executor that owns the writer connection"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="sqlite-writer",
+                initializer=self._register_db_thread
             )
-        """)
-        
-        # Create user_states table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS user_states (
-                user_id TEXT PRIMARY KEY,
-                current_step TEXT NOT NULL,
-                context TEXT,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        return self._executor
+
+    def _get_read_executor(self) -> ThreadPoolExecutor:
+        """Get the executor whose threads each own a reader connection"""
+        if self._read_executor is None:
+            self._read_executor = ThreadPoolExecutor(
+                max_workers=self.read_pool_size,
+                thread_name_prefix="sqlite-reader",
+                initializer=self._register_db_thread
             )
-        """)
+        return self._read_executor
+
+    def _register_db_thread(self) -> None:
+        """Remember database threads so close() never tries to join itself"""
+        self._db_thread_ids.add(threading.get_ident())
+
+    async def run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``func(connection)`` on the writer thread and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), lambda: func(self.get_connection())
+        )
+
+    async def run_read(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run the read-only ``func(connection)`` on a reader thread"""
+        if not self.uses_read_pool:
+            return await self.run(func)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_read_executor(), lambda: func(self._get_read_connection())
+        )
+
+    async def run_in_transaction(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``func(connection)`` on the writer thread and commit afterwards
+
+        The transaction is rolled back if ``func`` raises.
+        """
+        def transaction(conn: sqlite3.Connection) -> T:
+            try:
+                result = func(conn)
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+            return result
+
+        return await self.run(transaction)
+
+    async def data_version(self) -> int:
+        """``PRAGMA data_version`` of the writer connection
         
-        # Create events table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                event_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                date DATETIME NOT NULL,
-                created_by TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        It changes only when another connection, e.g. another process,
+        commits to the database.
+        """
+        return await self.run(lambda conn: conn.execute("PRAGMA data_version").fetchone()[0])
+    
+    async def fetch_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        """Execute a query and return the first row"""
+        return await self.run_read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetch_all(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """Execute a query and return all rows"""
+        return await self.run_read(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Execute a write statement, commit it and return the affected row count"""
+        return await self.run_in_transaction(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def execute_grouped(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Execute a write statement, sharing its commit with concurrent writes
+
+        With group commit enabled the statement joins the current batch and
+        the call returns once that batch is committed; otherwise this is the
+        same as ``execute``.
+        """
+        if self.group_commit is None:
+            return await self.execute(sql, params)
+        return await self.group_commit.execute(sql, params)
+
+    async def run_grouped(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run a small write transaction, sharing its commit with concurrent writes
         
-        # Create registrations table
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS registrations (
-                user_id TEXT NOT NULL,
-                event_id TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (user_id, event_id)
-            )
-        """)
+        Falls back to ``run_in_transaction`` when group commit is disabled.
+        """
+        if self.group_commit is None:
+            return await self.run_in_transaction(func)
+        return await self.group_commit.run(func)
+    
+    async def stream(
+        self, sql: str, params: Sequence[Any] = (), batch_size: int = 1000
+    ) -> AsyncIterator[List[sqlite3.Row]]:
+        """Iterate over a query's rows in lists of up to ``batch_size`` rows
+        
+        File databases get a dedicated read-only connection and thread for
+        the lifetime of the iteration, so a long export never holds a pooled
+        reader. In-memory databases stream from the writer connection.
+        Wrap the iteration in ``contextlib.aclosing`` when breaking out early
+        so the cursor is released right away.
+        """
+        loop = asyncio.get_running_loop()
+        if self.is_memory:
+            executor = self._get_executor()
+            
+            def open_cursor() -> sqlite3.Cursor:
+                return self.get_connection().execute(sql, params)
+            
+            def close_cursor(cursor: sqlite3.Cursor) -> None:
+                # close() may have run first and closed the connection already
+                if self.connection is not None:
+                    cursor.close()
+        else:
+            self.get_connection()
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-stream")
+            
+            def open_cursor() -> sqlite3.Cursor:
+                connection = self._connect()
+                self._attach_catalog(connection)
+                connection.execute("PRAGMA query_only = ON")
+                return connection.execute(sql, params)
+            
+            def close_cursor(cursor: sqlite3.Cursor) -> None:
+                cursor.connection.close()
         
-        conn.commit()
+        try:
+            cursor = await loop.run_in_executor(executor, open_cursor)
+            try:
+                while True:
+                    rows = await loop.run_in_executor(executor, cursor.fetchmany, batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                if self.is_memory and self._executor is None:
+                    close_cursor(cursor)
+                else:
+                    await loop.run_in_executor(executor, close_cursor, cursor)
+        finally:
+            if not self.is_memory:
+                executor.shutdown(wait=False)
     
+    def _migrate(self, connection: sqlite3.Connection) -> None:
+        """Apply pending schema migrations"""
+        apply_migrations(connection)
+
     def close(self) -> None:
-        """Close the database connection"""
+        """Close all database connections"""
+        # Let queued work finish before the connections go away
+        wait = threading.get_ident() not in self._db_thread_ids
+        if self._read_executor:
+            self._read_executor.shutdown(wait=wait)
+            self._read_executor = None
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        for connection in self._read_connections:
+            connection.close()
+        self._read_connections = []
+        self._local = threading.local()
         if self.connection:
             self.connection.close()
             self.connection = None
-    
+
     def __del__(self):
         """Cleanup on object deletion"""
-        self.close()
\ No newline at end of file
+        # __init__ may have rejected its arguments before setting anything up
+        if hasattr(self, "_local"):
+            self.close()
@@ -0,0 +1,31 @@
+from typing import Any, Tuple
+from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.sharding import ShardedDatabase, UserDatabase, check_shard_count
+
+
+def open_databases(config: Any) -> Tuple[DatabaseConnection, UserDatabase]:
+    """Open the main database and the storage for user-keyed tables
+    
+    Returns ``(db_connection, user_db)``. Events always live in
+    ``db_connection``; ``user_db`` is the same object unless
+    ``DATABASE_SHARDS`` asks for several shard files. Raises ValueError if
+    ``DATABASE_SHARDS`` differs from the count the data was written with.
+    """
+    options = dict(
+        read_pool_size=config.DATABASE_READ_POOL_SIZE,
+        journal_mode=config.DATABASE_JOURNAL_MODE,
+        synchronous=config.DATABASE_SYNCHRONOUS,
+        cache_size=config.DATABASE_CACHE_SIZE,
+        mmap_size=config.DATABASE_MMAP_SIZE,
+        busy_timeout=config.DATABASE_BUSY_TIMEOUT,
+        group_commit_window_ms=config.DATABASE_GROUP_COMMIT_WINDOW_MS,
+        group_commit_max_batch=config.DATABASE_GROUP_COMMIT_MAX_BATCH
+    )
+    db_connection = DatabaseConnection(config.DATABASE_PATH, **options)
+    if config.DATABASE_SHARDS > 1:
+        user_db = ShardedDatabase.open(
+            config.DATABASE_PATH, config.DATABASE_SHARDS, catalog=db_connection, **options
+        )
+        return db_connection, user_db
+    check_shard_count(db_connection, 1)
+    return db_connection, db_connection
@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+
+T = TypeVar('T')
+
+PendingWrite = Tuple[Callable[[sqlite3.Connection], Any], asyncio.AbstractEventLoop, asyncio.Future]
+
+
+class GroupCommitWriter:
+    """Coalesces small writes into shared transactions
+
+    Writes submitted within ``window`` seconds of each other, up to
+    ``max_batch`` writes, are executed in one transaction and made durable
+    by one commit. Each write runs inside its own savepoint, so a failing
+    write (e.g. an ``IntegrityError``) only fails its own caller. Every
+    caller's future resolves after the shared commit.
+    
+    Batches are collected on the event loop: the first write of a batch
+    starts a timer and the batch is handed to the writer thread when the
+    timer fires or the batch is full, so the writer thread never sits idle
+    waiting for the window to close.
+    """
+
+    def __init__(
+        self,
+        executor_factory: Callable[[], Executor],
+        connection_factory: Callable[[], sqlite3.Connection],
+        window: float = 0.003,
+        max_batch: int = 64
+    ):
+        self._executor_factory = executor_factory
+        self._connection_factory = connection_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._batch: List[PendingWrite] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.writes = 0
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Queue a write statement and wait until its batch is committed"""
+        return await self.run(lambda conn: conn.execute(sql, params).rowcount)
+    
+    async def run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Queue ``func(connection)`` and wait until its batch is committed
+        
+        ``func`` may issue several statements; they succeed or fail together.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # A batch never mixes callers from different event loops
+        if self._batch and self._batch[0][1] is not loop:
+            self._submit()
+        self._batch.append((func, loop, future))
+        if len(self._batch) >= self.max_batch:
+            self._submit()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._submit)
+        return await future
+
+    def _submit(self) -> None:
+        """Hand the collected batch to the writer thread"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            self._executor_factory().submit(self._commit_batch, batch)
+
+    def _commit_batch(self, batch: List[PendingWrite]) -> None:
+        """Execute a batch in one transaction and resolve its callers"""
+        conn = self._connection_factory()
+        results: List[Tuple[bool, Any]] = []
+        try:
+            conn.execute("BEGIN")
+            for func, _, _ in batch:
+                conn.execute("SAVEPOINT group_commit_write")
+                try:
+                    result = func(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO group_commit_write")
+                    results.append((False, e))
+                else:
+                    results.append((True, result))
+                conn.execute("RELEASE group_commit_write")
+            conn.commit()
+        except Exception as e:
+            # The shared commit failed, so none of the writes are durable
+            if conn.in_transaction:
+                conn.rollback()
+            results = [(False, e)] * len(batch)
+
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, loop, future), (ok, value) in zip(batch, results):
+            loop.call_soon_threadsafe(self._resolve, future, ok, value)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, ok: bool, value: Any) -> None:
+        """Complete a caller's future on its own event loop"""
+        if future.cancelled():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
@@ -0,0 +1,309 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema change, identified by a strictly increasing version"""
+    version: int
+    name: str
+    statements: Sequence[str] = ()
+    apply: Optional[Callable[[sqlite3.Connection], None]] = None
+
+    def run(self, conn: sqlite3.Connection) -> None:
+        """Apply the migration on an open transaction"""
+        for statement in self.statements:
+            conn.execute(statement)
+        if self.apply is not None:
+            self.apply(conn)
+
+
+# Current time as epoch seconds, for column defaults
+_NOW = "(CAST(strftime('%s', 'now') AS INTEGER))"
+
+
+def _iso_to_epoch(value, assume_utc: int) -> Optional[int]:
+    """SQL function converting a stored ISO string to epoch seconds
+
+    Values written by the application are naive local times; column defaults
+    (``CURRENT_TIMESTAMP``) are UTC.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    parsed = datetime.fromisoformat(value)
+    if assume_utc and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _convert_timestamps_to_epoch(conn: sqlite3.Connection) -> None:
+    """Rebuild the tables with INTEGER epoch timestamp columns"""
+    conn.create_function("iso_to_epoch", 2, _iso_to_epoch, deterministic=True)
+    now = _NOW
+
+    conn.execute(f"""
+        CREATE TABLE users_new (
+            user_id TEXT PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            birth_year INTEGER NOT NULL,
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at INTEGER DEFAULT {now}
+        )
+    """)
+    conn.execute("""
+        INSERT INTO users_new
+        SELECT user_id, first_name, last_name, birth_year, is_admin, iso_to_epoch(created_at, 1)
+        FROM users
+    """)
+
+    conn.execute(f"""
+        CREATE TABLE user_states_new (
+            user_id TEXT PRIMARY KEY,
+            current_step TEXT NOT NULL,
+            context TEXT,
+            updated_at INTEGER DEFAULT {now}
+        )
+    """)
+    conn.execute("""
+        INSERT INTO user_states_new
+        SELECT user_id, current_step, context, iso_to_epoch(updated_at, 1)
+        FROM user_states
+    """)
+
+    conn.execute(f"""
+        CREATE TABLE events_new (
+            event_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            date INTEGER NOT NULL,
+            created_by TEXT NOT NULL,
+            created_at INTEGER DEFAULT {now}
+        )
+    """)
+    conn.execute("""
+        INSERT INTO events_new
+        SELECT event_id, name, iso_to_epoch(date, 0), created_by, iso_to_epoch(created_at, 0)
+        FROM events
+    """)
+
+    conn.execute(f"""
+        CREATE TABLE registrations_new (
+            user_id TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            created_at INTEGER DEFAULT {now},
+            PRIMARY KEY (user_id, event_id)
+        )
+    """)
+    conn.execute("""
+        INSERT INTO registrations_new
+        SELECT user_id, event_id, iso_to_epoch(created_at, 0)
+        FROM registrations
+    """)
+
+    for table in ("users", "user_states", "events", "registrations"):
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    # Dropping the old tables dropped their indexes as well
+    conn.execute("CREATE INDEX idx_registrations_event_id ON registrations (event_id)")
+    conn.execute("CREATE INDEX idx_events_date ON events (date)")
+    conn.execute("CREATE INDEX idx_registrations_user_id_created_at ON registrations (user_id, created_at)")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create_base_tables", (
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            birth_year INTEGER NOT NULL,
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_states (
+            user_id TEXT PRIMARY KEY,
+            current_step TEXT NOT NULL,
+            context TEXT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            event_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            date DATETIME NOT NULL,
+            created_by TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS registrations (
+            user_id TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, event_id)
+        )
+        """,
+    )),
+    Migration(2, "index_registrations_event_id", (
+        "CREATE INDEX IF NOT EXISTS idx_registrations_event_id ON registrations (event_id)",
+    )),
+    Migration(3, "index_events_date", (
+        "CREATE INDEX IF NOT EXISTS idx_events_date ON events (date)",
+    )),
+    Migration(4, "index_registrations_user_id_created_at", (
+        "CREATE INDEX IF NOT EXISTS idx_registrations_user_id_created_at ON registrations (user_id, created_at)",
+    )),
+    Migration(5, "epoch_timestamps", apply=_convert_timestamps_to_epoch),
+    Migration(6, "index_events_date_event_id", (
+        # Serves both date range scans and (date, event_id) keyset pagination
+        "CREATE INDEX IF NOT EXISTS idx_events_date_event_id ON events (date, event_id)",
+        "DROP INDEX IF EXISTS idx_events_date",
+    )),
+    Migration(7, "events_capacity", (
+        # NULL means unlimited seats
+        "ALTER TABLE events ADD COLUMN capacity INTEGER",
+    )),
+    Migration(8, "archive_tables", (
+        # Same columns as the hot tables, so rows move with INSERT ... SELECT *
+        """
+        CREATE TABLE IF NOT EXISTS events_archive (
+            event_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            date INTEGER NOT NULL,
+            created_by TEXT NOT NULL,
+            created_at INTEGER,
+            capacity INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS registrations_archive (
+            user_id TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            created_at INTEGER,
+            PRIMARY KEY (user_id, event_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_events_archive_date ON events_archive (date)",
+        "CREATE INDEX IF NOT EXISTS idx_registrations_archive_event_id ON registrations_archive (event_id)",
+    )),
+    Migration(9, "events_search", (
+        # External content: the index stores only tokens and reads names from
+        # events; SqliteEventRepository keeps it in step with its writes
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            name,
+            content='events',
+            content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        "INSERT INTO events_fts (events_fts) VALUES ('rebuild')",
+    )),
+    Migration(10, "settings", (
+        # Deployment facts the data depends on, e.g. the shard count
+        "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    )),
+    Migration(11, "events_seats_taken", (
+        # Seats handed out for capped events, kept by SqliteRegistrationRepository.
+        # The backfill sees local registrations only; a sharded deployment
+        # recounts across shards on startup
+        "ALTER TABLE events ADD COLUMN seats_taken INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE events_archive ADD COLUMN seats_taken INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE events SET seats_taken = (
+            SELECT COUNT(*) FROM registrations WHERE registrations.event_id = events.event_id
+        )
+        WHERE capacity IS NOT NULL
+        """,
+    )),
+    Migration(12, "events_stable_id", (
+        # The search index links to events by rowid, and VACUUM may renumber
+        # an implicit rowid; an INTEGER PRIMARY KEY aliases it and is kept.
+        # It goes last so events and events_archive keep the same columns
+        f"""
+        CREATE TABLE events_new (
+            event_id TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            date INTEGER NOT NULL,
+            created_by TEXT NOT NULL,
+            created_at INTEGER DEFAULT {_NOW},
+            capacity INTEGER,
+            seats_taken INTEGER NOT NULL DEFAULT 0,
+            id INTEGER PRIMARY KEY
+        )
+        """,
+        """
+        INSERT INTO events_new (event_id, name, date, created_by, created_at, capacity, seats_taken, id)
+        SELECT event_id, name, date, created_by, created_at, capacity, seats_taken, rowid FROM events
+        """,
+        "DROP TABLE events",
+        "ALTER TABLE events_new RENAME TO events",
+        "CREATE INDEX idx_events_date_event_id ON events (date, event_id)",
+        "ALTER TABLE events_archive ADD COLUMN id INTEGER",
+        "DROP TABLE events_fts",
+        f"""
+        CREATE VIRTUAL TABLE events_fts USING fts5(
+            name,
+            content='events',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        "INSERT INTO events_fts (events_fts) VALUES ('rebuild')",
+    )),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the highest applied migration version, 0 for a fresh database"""
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(
+    conn: sqlite3.Connection,
+    migrations: Sequence[Migration] = MIGRATIONS
+) -> List[int]:
+    """Bring the schema up to date and return the versions that were applied
+
+    Each migration runs in its own ``BEGIN IMMEDIATE`` transaction together
+    with its ``schema_version`` row, so a crash never leaves a half-applied
+    migration and concurrent processes cannot apply the same one twice.
+    Readers keep working while migrations run in WAL mode.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= get_schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if migration.version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            migration.run(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (migration.version, migration.name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+    return applied
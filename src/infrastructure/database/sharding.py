@@ -0,0 +1,213 @@
+import asyncio
+import heapq
+import os
+import sqlite3
+import zlib
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from src.infrastructure.database.connection import DatabaseConnection
+
+
+class ShardedDatabase:
+    """User-keyed tables partitioned across several SQLite files
+    
+    ``users``, ``user_states`` and ``registrations`` rows live in the shard
+    chosen by a stable hash of their ``user_id``. Each shard is a separate
+    ``DatabaseConnection`` with its own file, writer thread and lock, so
+    writes for different users no longer queue behind one another. Events
+    stay in the catalog database, which every shard attaches to read them.
+    """
+    
+    def __init__(self, shards: Sequence[DatabaseConnection]):
+        if not shards:
+            raise ValueError("A sharded database needs at least one shard")
+        self._shards = list(shards)
+    
+    @classmethod
+    def open(
+        cls,
+        db_path: str,
+        shard_count: int,
+        catalog: DatabaseConnection,
+        **options: Any
+    ) -> "ShardedDatabase":
+        """Open ``shard_count`` shards next to ``db_path`` (bot.shard0.db, ...)
+        
+        Raises ValueError if the catalog was set up with another shard count.
+        """
+        check_shard_count(catalog, shard_count)
+        root, ext = os.path.splitext(db_path)
+        return cls([
+            DatabaseConnection(f"{root}.shard{i}{ext}", catalog=catalog, **options)
+            for i in range(shard_count)
+        ])
+    
+    @property
+    def shards(self) -> List[DatabaseConnection]:
+        """All shards, in hash order"""
+        return self._shards
+    
+    def shard_for(self, key: str) -> DatabaseConnection:
+        """The shard holding rows for ``key``"""
+        # crc32 rather than hash(): str hashes change between processes
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+    
+    def close(self) -> None:
+        """Close every shard"""
+        for shard in self._shards:
+            shard.close()
+
+
+UserDatabase = Union[DatabaseConnection, ShardedDatabase]
+
+
+def check_shard_count(catalog: DatabaseConnection, shard_count: int) -> None:
+    """Record the shard count in the catalog and refuse to open with another one
+    
+    Rows are placed by ``crc32(user_id) % shard_count`` and nothing moves
+    them, so a changed ``DATABASE_SHARDS`` would silently hide every
+    existing user, state and registration. A catalog from before the count
+    was recorded that already holds users was unsharded.
+    """
+    conn = catalog.get_connection()
+    row = conn.execute("SELECT value FROM settings WHERE name = 'shard_count'").fetchone()
+    if row is None:
+        has_users = conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None
+        conn.execute(
+            "INSERT OR IGNORE INTO settings (name, value) VALUES ('shard_count', ?)",
+            (str(1 if has_users else shard_count),)
+        )
+        conn.commit()
+        row = conn.execute("SELECT value FROM settings WHERE name = 'shard_count'").fetchone()
+    stored = int(row[0])
+    if stored != shard_count:
+        raise ValueError(
+            f"{catalog.db_path} holds data for {stored} shard(s) but {shard_count} were configured; "
+            f"user data is not moved between shards, so set DATABASE_SHARDS={stored}"
+        )
+
+
+async def fetch_all_shards(
+    db: UserDatabase, sql: str, params: Sequence[Any] = ()
+) -> List[sqlite3.Row]:
+    """Run a query on every shard concurrently and concatenate the rows"""
+    if len(db.shards) == 1:
+        return await db.shards[0].fetch_all(sql, params)
+    results = await asyncio.gather(*(shard.fetch_all(sql, params) for shard in db.shards))
+    return [row for rows in results for row in rows]
+
+
+async def stream_all_shards(
+    db: UserDatabase, sql: str, params: Sequence[Any] = (), batch_size: int = 1000
+) -> AsyncIterator[List[sqlite3.Row]]:
+    """Stream a query's row batches from one shard after another"""
+    for shard in db.shards:
+        async for rows in shard.stream(sql, params, batch_size):
+            yield rows
+
+
+async def stream_merged_shards(
+    db: UserDatabase,
+    sql: str,
+    key: Callable[[sqlite3.Row], Any],
+    params: Sequence[Any] = (),
+    batch_size: int = 1000
+) -> AsyncIterator[List[sqlite3.Row]]:
+    """Stream a query that every shard returns ordered by ``key`` as one ordered stream
+    
+    A k-way merge over the shards' cursors, holding one batch per shard.
+    """
+    if len(db.shards) == 1:
+        async for rows in db.shards[0].stream(sql, params, batch_size):
+            yield rows
+        return
+    
+    streams = [shard.stream(sql, params, batch_size) for shard in db.shards]
+    try:
+        buffers: List[Tuple[List[sqlite3.Row], int]] = []
+        heap: List[Tuple[Any, int]] = []
+        for i, stream in enumerate(streams):
+            rows = await anext(stream, [])
+            buffers.append((rows, 0))
+            if rows:
+                heap.append((key(rows[0]), i))
+        heapq.heapify(heap)
+        
+        merged: List[sqlite3.Row] = []
+        while heap:
+            _, i = heapq.heappop(heap)
+            rows, position = buffers[i]
+            merged.append(rows[position])
+            position += 1
+            if position == len(rows):
+                rows, position = await anext(streams[i], []), 0
+            buffers[i] = (rows, position)
+            if rows:
+                heapq.heappush(heap, (key(rows[position]), i))
+            if len(merged) >= batch_size:
+                yield merged
+                merged = []
+        if merged:
+            yield merged
+    finally:
+        for stream in streams:
+            await stream.aclose()
+
+
+async def bulk_insert(
+    db: UserDatabase,
+    sql: str,
+    rows: Iterable[Tuple[Any, ...]],
+    batch_size: int = 10000,
+    shard_key: Optional[Callable[[Tuple[Any, ...]], str]] = None,
+    write: Optional[Callable[[sqlite3.Connection, List[Tuple[Any, ...]]], int]] = None
+) -> int:
+    """Insert rows with ``executemany``, committing every ``batch_size`` rows
+    
+    ``rows`` may be a generator over a file of any size: at most two batches
+    are held in memory, the one being written and the next one being built
+    meanwhile. With ``shard_key`` each batch is split by shard and the
+    shards write their part concurrently. ``write`` replaces the plain
+    ``executemany`` of ``sql`` when a batch needs more statements in its
+    transaction; it returns the rows it inserted. Returns the number of
+    rows inserted.
+    """
+    def insert(batch: List[Tuple[Any, ...]]) -> Callable[[sqlite3.Connection], int]:
+        def run(conn: sqlite3.Connection) -> int:
+            if write is not None:
+                return write(conn, batch)
+            before = conn.total_changes
+            conn.executemany(sql, batch)
+            return conn.total_changes - before
+        return run
+    
+    inserted = 0
+    pending: Optional[asyncio.Task] = None
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if pending is not None:
+            inserted += await pending
+        if not batch:
+            return inserted
+        pending = asyncio.ensure_future(_insert_batch(db, batch, insert, shard_key))
+        # Let the write reach its writer thread before the next batch is built
+        await asyncio.sleep(0)
+
+
+async def _insert_batch(
+    db: UserDatabase,
+    batch: List[Tuple[Any, ...]],
+    insert: Callable[[List[Tuple[Any, ...]]], Callable[[sqlite3.Connection], int]],
+    shard_key: Optional[Callable[[Tuple[Any, ...]], str]]
+) -> int:
+    """Write one batch, split across shards when there are several"""
+    if shard_key is None or len(db.shards) == 1:
+        return await db.shards[0].run_in_transaction(insert(batch))
+    by_shard: Dict[DatabaseConnection, List[Tuple[Any, ...]]] = {}
+    for row in batch:
+        by_shard.setdefault(db.shard_for(shard_key(row)), []).append(row)
+    counts = await asyncio.gather(*(
+        shard.run_in_transaction(insert(rows)) for shard, rows in by_shard.items()
+    ))
+    return sum(counts)
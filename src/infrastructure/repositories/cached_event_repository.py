@@ -0,0 +1,178 @@
+import asyncio
+import heapq
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+from src.domain.entities.event import Event
+from src.domain.entities.timestamps import to_epoch
+from src.domain.repositories.event_repository import EventCursor, EventRepository
+
+
+class CachedEventRepository(EventRepository):
+    """Caching decorator that keeps the future-event catalog in memory
+    
+    Future events are held in (date, event_id) order, so browse reads and
+    keyset pages are answered with a bisect instead of a query. Writes made
+    through this repository update the cache in place, and a heap of start
+    times drops each event the moment it stops being in the future. Past
+    events and ``get_all_events`` are always read from the wrapped
+    repository.
+    
+    Writes made by other processes are not seen until ``invalidate`` is
+    called.
+    """
+    
+    def __init__(self, inner: EventRepository, clock: Callable[[], float] = time.time):
+        self.inner = inner
+        self._clock = clock
+        self._events: Dict[str, Event] = {}
+        self._dates: Dict[str, int] = {}
+        self._keys: List[Tuple[int, str]] = []
+        self._expiry: List[Tuple[int, str]] = []
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Cache counters for monitoring"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._events)}
+    
+    def invalidate(self) -> None:
+        """Drop the cached catalog; the next read reloads it"""
+        self._events = {}
+        self._dates = {}
+        self._keys = []
+        self._expiry = []
+        self._loaded = False
+    
+    async def create_event(self, event: Event) -> Event:
+        """Create a new event"""
+        created = await self.inner.create_event(event)
+        # Added even before the first load, so a load racing this write cannot miss it
+        self._add(created)
+        return created
+    
+    async def get_event_by_id(self, event_id: str, include_archive: bool = False) -> Optional[Event]:
+        """Get event by ID, falling back to archived events if asked to"""
+        await self._ensure_loaded()
+        event = self._events.get(event_id)
+        if event is not None:
+            self.hits += 1
+            return event
+        self.misses += 1
+        return await self.inner.get_event_by_id(event_id, include_archive)
+    
+    async def get_events_by_ids(self, event_ids: List[str]) -> List[Event]:
+        """Get the existing events among the given IDs in one query"""
+        await self._ensure_loaded()
+        if all(event_id in self._events for event_id in event_ids):
+            self.hits += 1
+            return [self._events[event_id] for event_id in sorted(set(event_ids), key=self._key)]
+        self.misses += 1
+        return await self.inner.get_events_by_ids(event_ids)
+    
+    async def get_all_events(self, include_archive: bool = False) -> List[Event]:
+        """Get all events, optionally including archived ones"""
+        return await self.inner.get_all_events(include_archive)
+    
+    async def get_future_events(self) -> List[Event]:
+        """Get all future events"""
+        await self._ensure_loaded()
+        self.hits += 1
+        return [self._events[event_id] for _, event_id in self._keys]
+    
+    async def get_future_events_page(
+        self,
+        limit: int,
+        after: Optional[EventCursor] = None,
+        before: Optional[EventCursor] = None
+    ) -> List[Event]:
+        """Get up to ``limit`` future events after or before a cursor, in date order"""
+        await self._ensure_loaded()
+        self.hits += 1
+        if before is not None:
+            end = bisect_left(self._keys, (to_epoch(before.date), before.event_id))
+            keys = self._keys[max(0, end - limit):end]
+        elif after is not None:
+            start = bisect_right(self._keys, (to_epoch(after.date), after.event_id))
+            keys = self._keys[start:start + limit]
+        else:
+            keys = self._keys[:limit]
+        return [self._events[event_id] for _, event_id in keys]
+    
+    async def search_events(self, query: str, limit: int = 10) -> List[Event]:
+        """Find future events whose name matches ``query``, best matches first"""
+        return await self.inner.search_events(query, limit)
+    
+    async def delete_event(self, event_id: str) -> bool:
+        """Delete an event"""
+        deleted = await self.inner.delete_event(event_id)
+        self._remove(event_id)
+        return deleted
+    
+    async def import_events(self, events: Iterable[Event]) -> int:
+        """Insert many events in large batches, skipping existing IDs; return how many were added"""
+        imported = await self.inner.import_events(events)
+        # Reloading is cheaper than tracking which rows were skipped
+        self.invalidate()
+        return imported
+    
+    def iter_all_events(self, batch_size: int = 1000, include_archive: bool = False) -> AsyncIterator[Event]:
+        """Iterate over all events in date order without loading them all at once"""
+        return self.inner.iter_all_events(batch_size, include_archive)
+    
+    async def iter_future_events(self, batch_size: int = 1000) -> AsyncIterator[Event]:
+        """Iterate over future events in date order without loading them all at once"""
+        await self._ensure_loaded()
+        self.hits += 1
+        # Already in memory; iterate over a snapshot so writes cannot disturb it
+        for _, event_id in list(self._keys):
+            event = self._events.get(event_id)
+            if event is not None:
+                yield event
+    
+    async def _ensure_loaded(self) -> None:
+        """Load the catalog on first use and expire events that have started"""
+        if not self._loaded:
+            async with self._load_lock:
+                if not self._loaded:
+                    self.misses += 1
+                    for event in await self.inner.get_future_events():
+                        self._add(event)
+                    self._loaded = True
+        self._expire()
+    
+    def _expire(self) -> None:
+        """Drop every event whose start time is no longer in the future"""
+        now = int(self._clock())
+        while self._expiry and self._expiry[0][0] <= now:
+            date, event_id = heapq.heappop(self._expiry)
+            # Skip heap entries left behind by deletes
+            if self._dates.get(event_id) == date:
+                self._remove(event_id)
+    
+    def _key(self, event_id: str) -> Tuple[int, str]:
+        """Sort key of a cached event"""
+        return self._dates[event_id], event_id
+    
+    def _add(self, event: Event) -> None:
+        """Insert an event if it is still in the future"""
+        date = to_epoch(event.date)
+        if date <= int(self._clock()):
+            return
+        self._remove(event.event_id)
+        self._events[event.event_id] = event
+        self._dates[event.event_id] = date
+        insort(self._keys, (date, event.event_id))
+        heapq.heappush(self._expiry, (date, event.event_id))
+    
+    def _remove(self, event_id: str) -> None:
+        """Remove an event from the sorted index; its heap entry is skipped later"""
+        if self._events.pop(event_id, None) is None:
+            return
+        key = (self._dates.pop(event_id), event_id)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from src.domain.entities.user import User
+from src.domain.repositories.user_repository import UserRepository
+from src.infrastructure.database.connection import StagedWrite
+
+
+class CachedUserRepository(UserRepository):
+    """Write-through LRU cache in front of a user repository
+    
+    Keeps up to ``max_size`` users, each for at most ``ttl`` seconds.
+    Unknown users are cached too, so onboarding updates do not query for a
+    row that does not exist yet. ``save_user`` and ``update_user`` write to
+    the wrapped repository first and then refresh the cached entry. A
+    lookup that a save or invalidation overtook is not cached, so a stale
+    miss never hides a user who just finished onboarding.
+    """
+    
+    def __init__(
+        self,
+        inner: UserRepository,
+        max_size: int = 10000,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.inner = inner
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Optional[User]]]" = OrderedDict()
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Cache counters for monitoring"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries)
+        }
+    
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Forget one user, or every user when no ID is given"""
+        self._invalidations += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+    
+    async def get_user(self, user_id: str) -> Optional[User]:
+        """Get user by ID"""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > self._clock():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        invalidations = self._invalidations
+        user = await self.inner.get_user(user_id)
+        current = self._entries.get(user_id)
+        if current is not entry:
+            # Stored while we were reading; that entry is at least as new
+            return current[1] if current is not None else user
+        if self._invalidations == invalidations:
+            self._store(user_id, user)
+        return user
+    
+    async def save_user(self, user: User) -> None:
+        """Save user to database"""
+        await self.inner.save_user(user)
+        self._store(user.user_id, user)
+    
+    async def update_user(self, user: User) -> None:
+        """Update existing user"""
+        await self.inner.update_user(user)
+        self._store(user.user_id, user)
+    
+    def stage_save(self, user: User) -> Optional[StagedWrite]:
+        """The wrapped repository's staged save, refreshing the entry once it commits
+        
+        None if the wrapped repository cannot stage its saves.
+        """
+        stage = getattr(self.inner, "stage_save", None)
+        staged = stage(user) if stage is not None else None
+        if staged is None:
+            return None
+        
+        def committed() -> None:
+            staged.committed()
+            self._store(user.user_id, user)
+        
+        return staged._replace(committed=committed)
+    
+    def _store(self, user_id: str, user: Optional[User]) -> None:
+        """Insert or refresh an entry, evicting the least recently used ones"""
+        self._entries[user_id] = (self._clock() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,180 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from src.infrastructure.repositories.registration_index import WriteLog
+
+
+class Seats:
+    """Seat accounting of one event
+    
+    ``taken`` counts committed registrations plus reservations whose insert
+    is still in flight, so a seat is never handed out twice.
+    """
+    
+    __slots__ = ("date", "capacity", "taken", "in_flight", "_settled")
+    
+    def __init__(self, date: int, capacity: Optional[int], taken: int = 0):
+        self.date = date
+        self.capacity = capacity
+        self.taken = taken
+        self.in_flight = 0
+        self._settled: Optional[asyncio.Future] = None
+    
+    @property
+    def remaining(self) -> Optional[int]:
+        """Free seats, or None for an unlimited event"""
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.taken, 0)
+    
+    def reserve(self) -> bool:
+        """Take a seat if one is free; pair with ``confirm`` or ``cancel``"""
+        if self.capacity is not None and self.taken >= self.capacity:
+            return False
+        self.taken += 1
+        self.in_flight += 1
+        return True
+    
+    async def admit(self) -> bool:
+        """Reserve a seat, refusing only once every seat is committed
+        
+        While the last seats are held by inserts in flight, some of which
+        may still fail (e.g. duplicate taps), wait for them to settle
+        instead of turning users away from seats that end up free.
+        """
+        while not self.reserve():
+            if not self.in_flight:
+                return False
+            if self._settled is None:
+                self._settled = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self._settled)
+        return True
+    
+    def confirm(self) -> None:
+        """The reserved seat's registration was committed"""
+        self.in_flight -= 1
+        self._wake()
+    
+    def cancel(self) -> None:
+        """The reserved seat's registration was not inserted"""
+        self.in_flight -= 1
+        self.taken -= 1
+        self._wake()
+    
+    def _wake(self) -> None:
+        """Let callers waiting in ``admit`` try again"""
+        if self._settled is not None:
+            self._settled.set_result(None)
+            self._settled = None
+
+
+SeatsLoader = Callable[[str], Awaitable[Optional[Seats]]]
+
+
+class EventAdmission:
+    """In-process seat counters that admit registrations to capped events
+    
+    Reserving a seat is a synchronous check-and-increment on the event loop,
+    so thousands of concurrent taps are decided without a database round
+    trip and taps beyond capacity never reach the writer. Counters are
+    loaded from the database on first use; a reserved seat is then claimed
+    from the catalog's ``seats_taken`` counter, which has the final say.
+    
+    Like the registration index, counters only see this process's writes
+    and are cleared when another process is found to have written.
+    """
+    
+    def __init__(self, max_events: int = 10000):
+        self.max_events = max_events
+        self._seats: "OrderedDict[str, Seats]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Writes outside reservations; a load that raced one is redone
+        self._writes = WriteLog()
+        self.admitted = 0
+        self.rejected = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Admission counters for monitoring"""
+        return {
+            "events": len(self._seats),
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
+    
+    async def seats(self, event_id: str, load: SeatsLoader) -> Optional[Seats]:
+        """Seat counter of an event, loading it once however many callers wait
+        
+        Returns None if the event does not exist.
+        """
+        seats = self._seats.get(event_id)
+        if seats is not None:
+            self._seats.move_to_end(event_id)
+            return seats
+        pending = self._loading.get(event_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[event_id] = future
+        try:
+            while True:
+                mark = self._writes.begin()
+                try:
+                    seats = await load(event_id)
+                    if self._writes.accepts(event_id, mark):
+                        break
+                finally:
+                    self._writes.end(mark)
+            if seats is not None:
+                self._seats[event_id] = seats
+                self._evict()
+            future.set_result(seats)
+            return seats
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._loading[event_id]
+    
+    def record(self, admitted: bool) -> None:
+        """Count an admission decision"""
+        if admitted:
+            self.admitted += 1
+        else:
+            self.rejected += 1
+    
+    def added(self, event_id: str) -> None:
+        """A registration was inserted without a reservation; count its seat"""
+        self._writes.wrote(event_id)
+        seats = self._seats.get(event_id)
+        if seats is not None:
+            seats.taken += 1
+    
+    def released(self, event_id: str) -> None:
+        """A registration was deleted; free its seat"""
+        self._writes.wrote(event_id)
+        seats = self._seats.get(event_id)
+        if seats is not None and seats.taken > 0:
+            seats.taken -= 1
+    
+    def forget(self, event_id: str) -> None:
+        """Drop an event's counter, e.g. once it is archived"""
+        self._writes.wrote(event_id)
+        seats = self._seats.get(event_id)
+        if seats is not None and not seats.in_flight:
+            del self._seats[event_id]
+    
+    def clear(self) -> None:
+        """Drop every counter, e.g. after a bulk import or another process's writes"""
+        self._writes.clear()
+        self._seats.clear()
+    
+    def _evict(self) -> None:
+        """Drop least recently used counters without reservations in flight"""
+        for event_id in list(self._seats):
+            if len(self._seats) <= self.max_events:
+                return
+            if not self._seats[event_id].in_flight:
+                del self._seats[event_id]
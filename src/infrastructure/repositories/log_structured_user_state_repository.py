@@ -0,0 +1,243 @@
+import asyncio
+import os
+import re
+import struct
+import zlib
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from src.domain.entities.timestamps import to_epoch
+from src.domain.entities.user_state import UserState, stored_context
+from src.domain.repositories.user_state_repository import UserStateRepository
+
+
+# Record: crc32 and length of the payload, then the payload itself.
+# Payload: updated_at, the byte lengths of user_id, current_step and
+# context (NO_CONTEXT for None), then the three UTF-8 strings.
+_HEADER = struct.Struct("<II")
+_FIELDS = struct.Struct("<qHHI")
+_NO_CONTEXT = 0xFFFFFFFF
+_FILE_PATTERN = re.compile(r"^(log|snapshot)\.(\d+)$")
+
+# user_id -> (current_step, context, updated_at)
+IndexEntry = Tuple[str, Optional[str], int]
+
+
+def _encode(user_id: str, current_step: str, context: Optional[str], updated_at: int) -> bytes:
+    """Encode one state as a checksummed record"""
+    user_id_bytes = user_id.encode()
+    step_bytes = current_step.encode()
+    context_bytes = context.encode() if context is not None else b""
+    payload = _FIELDS.pack(
+        updated_at,
+        len(user_id_bytes),
+        len(step_bytes),
+        len(context_bytes) if context is not None else _NO_CONTEXT
+    ) + user_id_bytes + step_bytes + context_bytes
+    return _HEADER.pack(zlib.crc32(payload), len(payload)) + payload
+
+
+def _decode(data: bytes) -> Iterator[Tuple[int, str, IndexEntry]]:
+    """Yield (end offset, user_id, entry) for every intact record
+    
+    Stops at the first short or corrupt record, which is what a write torn
+    by a crash leaves behind.
+    """
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        crc, length = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or length < _FIELDS.size or zlib.crc32(payload) != crc:
+            return
+        updated_at, user_id_len, step_len, context_len = _FIELDS.unpack_from(payload)
+        pos = _FIELDS.size
+        user_id = payload[pos:pos + user_id_len].decode()
+        pos += user_id_len
+        current_step = payload[pos:pos + step_len].decode()
+        pos += step_len
+        context = None if context_len == _NO_CONTEXT else payload[pos:pos + context_len].decode()
+        offset = start + length
+        yield offset, user_id, (current_step, context, updated_at)
+
+
+class LogStructuredUserStateRepository(UserStateRepository):
+    """User state store built on an append-only log and an in-memory index
+    
+    Every save appends one record to the current log file and updates a
+    hash index holding the latest state per user, so writes are sequential
+    appends and reads never touch disk. Once the log outgrows
+    ``compact_bytes`` (and the last snapshot), appends switch to a new log
+    file and the index is written out as a snapshot in a background thread;
+    older logs and snapshots are then deleted. ``start`` rebuilds the index
+    by loading the newest snapshot and replaying the logs written after it,
+    discarding a record torn by a crash.
+    
+    With ``fsync`` off a save is durable once the OS has it, which survives
+    a process crash but not power loss.
+    """
+    
+    def __init__(self, directory: str, fsync: bool = False, compact_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self._index: Dict[str, IndexEntry] = {}
+        self._log: Optional[BinaryIO] = None
+        self._generation = 0
+        self._log_bytes = 0
+        self._snapshot_bytes = 0
+        self._load_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._compaction: Optional[asyncio.Task] = None
+        self.compactions = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Store counters for monitoring"""
+        return {
+            "size": len(self._index),
+            "generation": self._generation,
+            "log_bytes": self._log_bytes,
+            "snapshot_bytes": self._snapshot_bytes,
+            "compactions": self.compactions
+        }
+    
+    async def start(self) -> None:
+        """Rebuild the index from disk"""
+        await self._ensure_loaded()
+    
+    async def stop(self) -> None:
+        """Wait for a running compaction and close the log"""
+        if self._compaction is not None:
+            await self._compaction
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+    
+    async def get_user_state(self, user_id: str) -> Optional[UserState]:
+        """Get user state by ID"""
+        await self._ensure_loaded()
+        entry = self._index.get(user_id)
+        if entry is None:
+            return None
+        current_step, context, updated_at = entry
+        return UserState.from_row(user_id, current_step, context, updated_at)
+    
+    async def save_user_state(self, user_state: UserState) -> None:
+        """Append the state to the log"""
+        await self._ensure_loaded()
+        entry = (user_state.current_step, stored_context(user_state), to_epoch(datetime.now()))
+        record = _encode(user_state.user_id, *entry)
+        async with self._write_lock:
+            self._log.write(record)
+            self._index[user_state.user_id] = entry
+            self._log_bytes += len(record)
+            if self.fsync:
+                await asyncio.to_thread(os.fsync, self._log.fileno())
+        if self._compaction is None and self._log_bytes >= max(self.compact_bytes, self._snapshot_bytes):
+            self._compaction = asyncio.create_task(self.compact())
+    
+    async def update_user_state(self, user_state: UserState) -> None:
+        """Update existing user state"""
+        await self.save_user_state(user_state)
+    
+    async def compact(self) -> None:
+        """Snapshot the index and drop the log files it replaces"""
+        await self._ensure_loaded()
+        try:
+            # New appends go to the next log while the snapshot is written
+            async with self._write_lock:
+                generation = self._generation + 1
+                self._open_log(generation)
+                entries = list(self._index.items())
+            self._snapshot_bytes = await asyncio.to_thread(self._write_snapshot, generation, entries)
+            self.compactions += 1
+        finally:
+            self._compaction = None
+    
+    async def _ensure_loaded(self) -> None:
+        """Load the snapshot and replay the logs on first use"""
+        if self._log is None:
+            async with self._load_lock:
+                if self._log is None:
+                    await asyncio.to_thread(self._load)
+    
+    def _load(self) -> None:
+        """Rebuild the index from the newest snapshot and the logs after it"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = {}
+        logs: List[int] = []
+        snapshots: List[int] = []
+        for name in os.listdir(self.directory):
+            match = _FILE_PATTERN.match(name)
+            if match:
+                (logs if match.group(1) == "log" else snapshots).append(int(match.group(2)))
+        
+        # snapshot.N holds everything written to logs before log.N
+        snapshot = max(snapshots, default=0)
+        if snapshot:
+            with open(self._path("snapshot", snapshot), "rb") as f:
+                data = f.read()
+            self._index.update((user_id, entry) for _, user_id, entry in _decode(data))
+            self._snapshot_bytes = len(data)
+        
+        generation = max([snapshot] + logs) or 1
+        for log in sorted(n for n in logs if n >= snapshot):
+            path = self._path("log", log)
+            with open(path, "rb") as f:
+                data = f.read()
+            end = 0
+            for end, user_id, entry in _decode(data):
+                self._index[user_id] = entry
+            if end < len(data):
+                # Drop a record torn by a crash so new appends follow intact ones
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+            if log == generation:
+                self._log_bytes = end
+        
+        self._remove_older_than(snapshot)
+        self._generation = generation
+        self._log = open(self._path("log", generation), "ab", buffering=0)
+    
+    def _open_log(self, generation: int) -> None:
+        """Switch appends to a fresh log file"""
+        self._log.close()
+        self._log = open(self._path("log", generation), "ab", buffering=0)
+        self._generation = generation
+        self._log_bytes = 0
+    
+    def _write_snapshot(self, generation: int, entries: List[Tuple[str, IndexEntry]]) -> int:
+        """Durably write snapshot.N, then delete what it replaces; return its size"""
+        path = self._path("snapshot", generation)
+        size = 0
+        with open(path + ".tmp", "wb") as f:
+            for user_id, entry in entries:
+                record = _encode(user_id, *entry)
+                f.write(record)
+                size += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._sync_directory()
+        self._remove_older_than(generation)
+        return size
+    
+    def _remove_older_than(self, generation: int) -> None:
+        """Delete snapshots and logs made obsolete by snapshot.N, and leftover temp files"""
+        for name in os.listdir(self.directory):
+            match = _FILE_PATTERN.match(name)
+            if name.endswith(".tmp") or (match and int(match.group(2)) < generation):
+                os.remove(os.path.join(self.directory, name))
+    
+    def _sync_directory(self) -> None:
+        """Make renames in the directory durable"""
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    
+    def _path(self, kind: str, generation: int) -> str:
+        """Path of a log or snapshot file"""
+        return os.path.join(self.directory, f"{kind}.{generation}")
@@ -0,0 +1,218 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set
+
+
+class EventMembers:
+    """Registered users of one event
+    
+    Numeric Telegram user IDs are kept in a sorted ``array('q')`` (8 bytes
+    each); any other ID goes to a small fallback set.
+    """
+    
+    __slots__ = ("date", "ids", "others")
+    
+    def __init__(self, date: int, user_ids: Iterable[str] = ()):
+        self.date = date
+        self.others: Set[str] = set()
+        numeric = []
+        for user_id in user_ids:
+            key = _as_int(user_id)
+            if key is None:
+                self.others.add(user_id)
+            else:
+                numeric.append(key)
+        numeric.sort()
+        self.ids = array('q', numeric)
+    
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.others)
+    
+    def __contains__(self, user_id: str) -> bool:
+        key = _as_int(user_id)
+        if key is None:
+            return user_id in self.others
+        index = bisect_left(self.ids, key)
+        return index < len(self.ids) and self.ids[index] == key
+    
+    def add(self, user_id: str) -> None:
+        """Add a user, keeping the array sorted"""
+        key = _as_int(user_id)
+        if key is None:
+            self.others.add(user_id)
+        elif user_id not in self:
+            insort(self.ids, key)
+    
+    def discard(self, user_id: str) -> None:
+        """Remove a user if present"""
+        key = _as_int(user_id)
+        if key is None:
+            self.others.discard(user_id)
+            return
+        index = bisect_left(self.ids, key)
+        if index < len(self.ids) and self.ids[index] == key:
+            del self.ids[index]
+
+
+def _as_int(user_id: str) -> Optional[int]:
+    """The user ID as a 64-bit integer if it round-trips exactly, else None"""
+    if not user_id.isdigit() or (len(user_id) > 1 and user_id[0] == "0"):
+        return None
+    value = int(user_id)
+    return value if value < 2 ** 63 else None
+
+
+class WriteLog:
+    """Detects writes to an event that race a load of it from the database
+    
+    A load calls ``begin`` before reading and ``accepts`` with the returned
+    mark before installing what it read; ``end`` must follow every
+    ``begin``. Writes are only remembered while some load is running, so
+    memory stays bounded by the writes that overlap loads rather than
+    growing with every event ever written to.
+    """
+    
+    def __init__(self):
+        self._sequence = 0
+        self._cleared_at = 0
+        self._written: Dict[str, int] = {}
+        self._loads: Dict[int, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._written)
+    
+    def begin(self) -> int:
+        """Start a load; returns its mark"""
+        self._loads[self._sequence] = self._loads.get(self._sequence, 0) + 1
+        return self._sequence
+    
+    def end(self, mark: int) -> None:
+        """Finish a load, forgetting writes no running load needs to know about"""
+        self._loads[mark] -= 1
+        if not self._loads[mark]:
+            del self._loads[mark]
+        if not self._loads:
+            self._written.clear()
+        elif mark < min(self._loads):
+            oldest = min(self._loads)
+            self._written = {event_id: seq for event_id, seq in self._written.items() if seq > oldest}
+    
+    def wrote(self, event_id: str) -> None:
+        """Record a write to an event"""
+        self._sequence += 1
+        if self._loads:
+            self._written[event_id] = self._sequence
+    
+    def clear(self) -> None:
+        """Record a write to every event"""
+        self._sequence += 1
+        self._cleared_at = self._sequence
+        self._written.clear()
+    
+    def accepts(self, event_id: str, mark: int) -> bool:
+        """Whether a load begun at ``mark`` saw every write to the event"""
+        return self._cleared_at <= mark and self._written.get(event_id, 0) <= mark
+
+
+class RegistrationIndex:
+    """In-memory membership and attendance counts per event
+    
+    Holds the registered users of recently used events, up to
+    ``max_members`` users in total; the least recently used events are
+    dropped beyond that. Events that are not held are loaded again from the
+    database on their next lookup.
+    
+    The index only sees writes made through this process. Writes by other
+    processes, such as ``manage.py`` imports, are noticed by
+    ``SqliteRegistrationRepository.check_external_writes``, which clears it.
+    """
+    
+    def __init__(self, max_members: int = 5000000):
+        self.max_members = max_members
+        self._events: "OrderedDict[str, EventMembers]" = OrderedDict()
+        self._members = 0
+        # A load that raced a write is discarded
+        self._writes = WriteLog()
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Index counters for monitoring"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "events": len(self._events),
+            "members": self._members
+        }
+    
+    def get(self, event_id: str) -> Optional[EventMembers]:
+        """Members of an event, or None if the event is not held"""
+        members = self._events.get(event_id)
+        if members is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._events.move_to_end(event_id)
+        return members
+    
+    def begin_load(self) -> int:
+        """Mark the start of loading events; pair with ``end_load``"""
+        return self._writes.begin()
+    
+    def end_load(self, mark: int) -> None:
+        """Mark the end of a load started with ``begin_load``, whether it succeeded or not"""
+        self._writes.end(mark)
+    
+    def install(self, event_id: str, members: EventMembers, mark: int) -> bool:
+        """Hold a freshly loaded event unless it was written to since ``mark``"""
+        if not self._writes.accepts(event_id, mark):
+            return False
+        self._drop(event_id)
+        self._events[event_id] = members
+        self._members += len(members)
+        self._evict()
+        return True
+    
+    def added(self, user_id: str, event_id: str) -> None:
+        """Record a registration that was committed"""
+        self._writes.wrote(event_id)
+        members = self._events.get(event_id)
+        if members is not None:
+            before = len(members)
+            members.add(user_id)
+            self._members += len(members) - before
+            self._evict()
+    
+    def removed(self, user_id: str, event_id: str) -> None:
+        """Record a registration that was deleted"""
+        self._writes.wrote(event_id)
+        members = self._events.get(event_id)
+        if members is not None:
+            before = len(members)
+            members.discard(user_id)
+            self._members += len(members) - before
+    
+    def clear(self) -> None:
+        """Forget every event, e.g. after a bulk import"""
+        self._writes.clear()
+        self._events.clear()
+        self._members = 0
+    
+    def forget(self, event_id: str) -> None:
+        """Stop holding an event, e.g. once it is archived"""
+        self._writes.wrote(event_id)
+        self._drop(event_id)
+    
+    def _drop(self, event_id: str) -> None:
+        """Stop holding an event"""
+        members = self._events.pop(event_id, None)
+        if members is not None:
+            self._members -= len(members)
+    
+    def _evict(self) -> None:
+        """Drop least recently used events until the member bound holds"""
+        while self._members > self.max_members and len(self._events) > 1:
+            event_id, members = self._events.popitem(last=False)
+            self._members -= len(members)
@@ -1,91 +1,233 @@
-from typing import List, Optional
+import re
+import sqlite3
+from typing import AsyncIterator, Iterable, List, Optional
 from datetime import datetime
 from src.domain.entities.event import Event
-from src.domain.repositories.event_repository import EventRepository
+from src.domain.entities.timestamps import epoch_of, to_epoch
+from src.domain.repositories.event_repository import EventCursor, EventRepository
 from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.sharding import bulk_insert
+
+
+_SEARCH_TOKEN = re.compile(r"\w+")
 
 
 class SqliteEventRepository(EventRepository):
-    """SQLite implementation of event repository"""
+    """SQLite implementation of event repository
+    
+    Event names are indexed in the ``events_fts`` full-text table, keyed by
+    the events' ``id``, which every write here updates in the same
+    transaction.
+    """
     
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
     
-    def create_event(self, event: Event) -> Event:
+    async def create_event(self, event: Event) -> Event:
         """Create a new event"""
-        conn = self.db.get_connection()
-        conn.execute(
-            """
-            INSERT INTO events (event_id, name, date, created_by, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (event.event_id, event.name, event.date.isoformat(), event.created_by, 
-             event.created_at.isoformat() if event.created_at else datetime.now().isoformat())
-        )
-        conn.commit()
+        def create(conn: sqlite3.Connection) -> None:
+            # lastrowid is the new row's id, which aliases the rowid
+            event_key = conn.execute(
+                """
+                INSERT INTO events (event_id, name, date, created_by, created_at, capacity)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (event.event_id, event.name, to_epoch(event.date), event.created_by, 
+                 to_epoch(event.created_at or datetime.now()), event.capacity)
+            ).lastrowid
+            conn.execute("INSERT INTO events_fts (rowid, name) VALUES (?, ?)", (event_key, event.name))
+        
+        await self.db.run_in_transaction(create)
         return event
     
-    def get_event_by_id(self, event_id: str) -> Optional[Event]:
-        """Get event by ID"""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
+    async def get_event_by_id(self, event_id: str, include_archive: bool = False) -> Optional[Event]:
+        """Get event by ID, falling back to archived events if asked to"""
+        row = await self.db.fetch_one(
             "SELECT * FROM events WHERE event_id = ?", (event_id,)
         )
-        row = cursor.fetchone()
+        if not row and include_archive:
+            row = await self.db.fetch_one(
+                "SELECT * FROM events_archive WHERE event_id = ?", (event_id,)
+            )
         
         if not row:
             return None
         
-        return Event(
-            event_id=row['event_id'],
-            name=row['name'],
-            date=datetime.fromisoformat(row['date']),
-            created_by=row['created_by'],
-            created_at=datetime.fromisoformat(row['created_at'])
-        )
+        return self._row_to_event(row)
     
-    def get_all_events(self) -> List[Event]:
-        """Get all events"""
-        conn = self.db.get_connection()
-        cursor = conn.execute("SELECT * FROM events ORDER BY date ASC")
-        rows = cursor.fetchall()
-        
+    async def get_events_by_ids(self, event_ids: List[str]) -> List[Event]:
+        """Get the existing events among the given IDs in one query"""
+        if not event_ids:
+            return []
+        # Stay well below SQLite's bound-parameter limit
         events = []
-        for row in rows:
-            events.append(Event(
-                event_id=row['event_id'],
-                name=row['name'],
-                date=datetime.fromisoformat(row['date']),
-                created_by=row['created_by'],
-                created_at=datetime.fromisoformat(row['created_at'])
-            ))
-        
+        for start in range(0, len(event_ids), 500):
+            chunk = event_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = await self.db.fetch_all(
+                f"SELECT * FROM events WHERE event_id IN ({placeholders})",
+                chunk
+            )
+            events.extend(self._row_to_event(row) for row in rows)
+        # Chunks are ordered by the caller's IDs, so sort the whole result once
+        events.sort(key=lambda event: (epoch_of(event, "date"), event.event_id))
         return events
     
-    def get_future_events(self) -> List[Event]:
+    async def get_all_events(self, include_archive: bool = False) -> List[Event]:
+        """Get all events, optionally including archived ones"""
+        rows = await self.db.fetch_all(f"SELECT * FROM {self._source(include_archive)} ORDER BY date ASC")
+        return [self._row_to_event(row) for row in rows]
+    
+    async def get_future_events(self) -> List[Event]:
         """Get all future events"""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
+        rows = await self.db.fetch_all(
             "SELECT * FROM events WHERE date > ? ORDER BY date ASC", 
-            (datetime.now().isoformat(),)
+            (to_epoch(datetime.now()),)
         )
-        rows = cursor.fetchall()
+        return [self._row_to_event(row) for row in rows]
+    
+    async def get_future_events_page(
+        self,
+        limit: int,
+        after: Optional[EventCursor] = None,
+        before: Optional[EventCursor] = None
+    ) -> List[Event]:
+        """Get up to ``limit`` future events after or before a cursor, in date order"""
+        now = to_epoch(datetime.now())
+        if before is not None:
+            # Walk the index backwards from the cursor, then restore date order
+            rows = await self.db.fetch_all(
+                """
+                SELECT * FROM events
+                WHERE date > ? AND (date, event_id) < (?, ?)
+                ORDER BY date DESC, event_id DESC
+                LIMIT ?
+                """,
+                (now, to_epoch(before.date), before.event_id, limit)
+            )
+            rows.reverse()
+        elif after is not None and to_epoch(after.date) > now:
+            # The cursor already implies date > now; keep it as the only range
+            # bound so SQLite seeks straight to it
+            rows = await self.db.fetch_all(
+                """
+                SELECT * FROM events
+                WHERE (date, event_id) > (?, ?)
+                ORDER BY date ASC, event_id ASC
+                LIMIT ?
+                """,
+                (to_epoch(after.date), after.event_id, limit)
+            )
+        else:
+            rows = await self.db.fetch_all(
+                "SELECT * FROM events WHERE date > ? ORDER BY date ASC, event_id ASC LIMIT ?",
+                (now, limit)
+            )
+        return [self._row_to_event(row) for row in rows]
+    
+    async def delete_event(self, event_id: str) -> bool:
+        """Delete an event"""
+        def delete(conn: sqlite3.Connection) -> int:
+            unindex_events(conn, [event_id])
+            return conn.execute("DELETE FROM events WHERE event_id = ?", (event_id,)).rowcount
         
-        events = []
-        for row in rows:
-            events.append(Event(
-                event_id=row['event_id'],
-                name=row['name'],
-                date=datetime.fromisoformat(row['date']),
-                created_by=row['created_by'],
-                created_at=datetime.fromisoformat(row['created_at'])
-            ))
+        rowcount = await self.db.run_in_transaction(delete)
+        return rowcount > 0
+    
+    async def import_events(self, events: Iterable[Event]) -> int:
+        """Insert many events in large batches, skipping existing IDs; return how many were added"""
+        now = to_epoch(datetime.now())
+        rows = (
+            (event.event_id, event.name, epoch_of(event, "date"), event.created_by,
+             epoch_of(event, "created_at") or now, event.capacity)
+            for event in events
+        )
+        sql = """
+            INSERT OR IGNORE INTO events (event_id, name, date, created_by, created_at, capacity)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """
         
-        return events
+        def write(conn: sqlite3.Connection, batch: List[tuple]) -> int:
+            # New rows get ids above the previous maximum; index them in the
+            # batch's own transaction so a crash never leaves them unsearchable
+            last = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+            before = conn.total_changes
+            conn.executemany(sql, batch)
+            imported = conn.total_changes - before
+            conn.execute(
+                "INSERT INTO events_fts (rowid, name) SELECT id, name FROM events WHERE id > ?",
+                (last,)
+            )
+            return imported
+        
+        return await bulk_insert(self.db, sql, rows, write=write)
     
-    def delete_event(self, event_id: str) -> bool:
-        """Delete an event"""
-        conn = self.db.get_connection()
-        cursor = conn.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
-        conn.commit()
-        return cursor.rowcount > 0
\ No newline at end of file
+    async def iter_all_events(self, batch_size: int = 1000, include_archive: bool = False) -> AsyncIterator[Event]:
+        """Iterate over all events in date order without loading them all at once"""
+        async for rows in self.db.stream(
+            f"SELECT * FROM {self._source(include_archive)} ORDER BY date ASC, event_id ASC",
+            batch_size=batch_size
+        ):
+            for row in rows:
+                yield self._row_to_event(row)
+    
+    async def iter_future_events(self, batch_size: int = 1000) -> AsyncIterator[Event]:
+        """Iterate over future events in date order without loading them all at once"""
+        async for rows in self.db.stream(
+            "SELECT * FROM events WHERE date > ? ORDER BY date ASC, event_id ASC",
+            (to_epoch(datetime.now()),),
+            batch_size
+        ):
+            for row in rows:
+                yield self._row_to_event(row)
+    
+    async def search_events(self, query: str, limit: int = 10) -> List[Event]:
+        """Find future events whose name matches the words of ``query``, best matches first"""
+        match = fts_query(query)
+        if not match:
+            return []
+        rows = await self.db.fetch_all(
+            """
+            SELECT e.* FROM events_fts
+            JOIN events e ON e.id = events_fts.rowid
+            WHERE events_fts MATCH ? AND e.date > ?
+            ORDER BY events_fts.rank, e.date ASC
+            LIMIT ?
+            """,
+            (match, to_epoch(datetime.now()), limit)
+        )
+        return [self._row_to_event(row) for row in rows]
+    
+    @staticmethod
+    def _source(include_archive: bool) -> str:
+        """The events table, or a union with the archive"""
+        if include_archive:
+            return "(SELECT * FROM events UNION ALL SELECT * FROM events_archive)"
+        return "events"
+    
+    @staticmethod
+    def _row_to_event(row: sqlite3.Row) -> Event:
+        """Build an Event from a database row, leaving timestamps undecoded"""
+        return Event.from_row(
+            row['event_id'], row['name'], row['date'], row['created_by'], row['created_at'], row['capacity']
+        )
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix
+    
+    Words are quoted, so user input can never be parsed as FTS5 syntax.
+    """
+    return " ".join(f'"{token}"*' for token in _SEARCH_TOKEN.findall(text))
+
+
+def unindex_events(conn: sqlite3.Connection, event_ids: List[str]) -> None:
+    """Remove events from the search index; call before deleting their rows"""
+    placeholders = ", ".join("?" * len(event_ids))
+    conn.execute(
+        f"""
+        INSERT INTO events_fts (events_fts, rowid, name)
+        SELECT 'delete', id, name FROM events WHERE event_id IN ({placeholders})
+        """,
+        event_ids
+    )
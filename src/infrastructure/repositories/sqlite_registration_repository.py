@@ -1,84 +1,519 @@
-from typing import List
+import asyncio
+import sqlite3
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
-from src.domain.entities.registration import Registration
+from src.domain.entities.event import Event
+from src.domain.entities.registration import Registration, RegistrationOutcome, RegistrationResult
+from src.domain.entities.timestamps import epoch_of, to_epoch
 from src.domain.repositories.registration_repository import RegistrationRepository
 from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.sharding import (
+    UserDatabase, bulk_insert, fetch_all_shards, stream_all_shards, stream_merged_shards
+)
+from src.infrastructure.repositories.event_admission import EventAdmission, Seats
+from src.infrastructure.repositories.registration_index import EventMembers, RegistrationIndex
+from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
 
 
 class SqliteRegistrationRepository(RegistrationRepository):
-    """SQLite implementation of registration repository"""
+    """SQLite implementation of registration repository
     
-    def __init__(self, db_connection: DatabaseConnection):
+    Registrations are stored in the shard of their user; event lookups go to
+    the ``events`` table, which a shard reads from the attached catalog.
+    
+    Seats of events with a capacity are counted in the event's
+    ``seats_taken`` column in the catalog. A registration first claims a
+    seat there with a conditional update, which decides admission across
+    shards and processes, and then inserts its row in the user's shard; a
+    claim whose insert does not happen is handed back. A crash between the
+    two can leave a seat claimed but unused, never an event overbooked.
+    
+    With a ``RegistrationIndex``, membership checks and attendance counts
+    are answered from memory and every write here keeps the index in sync.
+    ``EventAdmission`` turns away taps beyond capacity before they reach
+    the catalog. Both only see this process's writes; ``start`` checks every
+    ``check_interval`` seconds whether another process, such as a
+    ``manage.py`` import, wrote to the databases and clears them if so.
+    """
+    
+    def __init__(
+        self,
+        db_connection: UserDatabase,
+        index: Optional[RegistrationIndex] = None,
+        admission: Optional[EventAdmission] = None
+    ):
         self.db = db_connection
+        self.index = index
+        self.admission = admission or EventAdmission()
+        self._data_versions: Optional[List[int]] = None
+        self._check_task: Optional[asyncio.Task] = None
     
-    def register_user(self, registration: Registration) -> Registration:
-        """Register user for an event"""
-        conn = self.db.get_connection()
-        conn.execute(
-            """
-            INSERT INTO registrations (user_id, event_id, created_at)
-            VALUES (?, ?, ?)
-            """,
-            (registration.user_id, registration.event_id, 
-             registration.created_at.isoformat() if registration.created_at else datetime.now().isoformat())
-        )
-        conn.commit()
+    async def register_user(self, registration: Registration) -> Registration:
+        """Register user for an event
+        
+        Raises ValueError if the event has a capacity and no seat is left.
+        """
+        seats = await self.admission.seats(registration.event_id, self._load_seats)
+        claimed = seats is not None and seats.capacity is not None
+        if claimed and not await self._claim_seat(registration.event_id):
+            raise ValueError(f"Event {registration.event_id} is fully booked")
+        try:
+            await self.db.shard_for(registration.user_id).execute_grouped(
+                """
+                INSERT INTO registrations (user_id, event_id, created_at)
+                VALUES (?, ?, ?)
+                """,
+                (registration.user_id, registration.event_id, 
+                 to_epoch(registration.created_at or datetime.now()))
+            )
+        except BaseException:
+            if claimed:
+                await asyncio.shield(self._release_seat(registration.event_id))
+            raise
+        if self.index is not None:
+            self.index.added(registration.user_id, registration.event_id)
+        self.admission.added(registration.event_id)
         return registration
     
-    def unregister_user(self, user_id: str, event_id: str) -> bool:
+    async def try_register(self, user_id: str, event_id: str, now: datetime) -> RegistrationResult:
+        """Atomically register the user if the event exists, is after ``now``,
+        has a free seat and the user is not registered yet"""
+        now_epoch = to_epoch(now)
+        members = await self._members(event_id)
+        if members is not None and user_id in members and members.date > now_epoch:
+            # Duplicate taps are answered without touching the database
+            return RegistrationResult(RegistrationOutcome.ALREADY_REGISTERED)
+        
+        seats = await self.admission.seats(event_id, self._load_seats)
+        if seats is None:
+            return RegistrationResult(RegistrationOutcome.EVENT_NOT_FOUND)
+        reserved = seats.capacity is not None and seats.date > now_epoch
+        if reserved and not await seats.admit():
+            # Sold out: refused from memory, only a duplicate tap needs a read
+            self.admission.record(False)
+            if await self.is_registered(user_id, event_id):
+                return RegistrationResult(RegistrationOutcome.ALREADY_REGISTERED)
+            return RegistrationResult(RegistrationOutcome.EVENT_FULL)
+        
+        claimed = False
+        try:
+            if reserved and await self.is_registered(user_id, event_id):
+                # A duplicate must not hold a seat other users are refused for
+                seats.cancel()
+                self.admission.record(False)
+                return RegistrationResult(RegistrationOutcome.ALREADY_REGISTERED)
+            if reserved:
+                claimed = await self._claim_seat(event_id, now_epoch)
+            result = await self.db.shard_for(user_id).run_grouped(
+                lambda conn: self._register(conn, user_id, event_id, now_epoch, not reserved or claimed)
+            )
+            registered = result.outcome == RegistrationOutcome.REGISTERED
+            if claimed and not registered:
+                await self._release_seat(event_id)
+        except BaseException:
+            if claimed:
+                await asyncio.shield(self._release_seat(event_id))
+            if reserved:
+                seats.cancel()
+            raise
+        if reserved:
+            if registered:
+                seats.confirm()
+            else:
+                seats.cancel()
+            self.admission.record(registered)
+        if self.index is not None and registered:
+            self.index.added(user_id, event_id)
+        return result
+    
+    @staticmethod
+    def _register(
+        conn: sqlite3.Connection, user_id: str, event_id: str, now_epoch: int, insert: bool
+    ) -> RegistrationResult:
+        """Insert the registration unless ``insert`` is False, and classify the outcome"""
+        inserted = 0
+        if insert:
+            inserted = conn.execute(
+                """
+                INSERT INTO registrations (user_id, event_id, created_at)
+                SELECT ?, event_id, ? FROM events
+                WHERE event_id = ? AND date > ?
+                ON CONFLICT (user_id, event_id) DO NOTHING
+                """,
+                (user_id, to_epoch(datetime.now()), event_id, now_epoch)
+            ).rowcount
+        # Same transaction: classify a refusal and fetch the name for the reply
+        event = conn.execute(
+            "SELECT name, date, capacity FROM events WHERE event_id = ?", (event_id,)
+        ).fetchone()
+        if inserted:
+            return RegistrationResult(RegistrationOutcome.REGISTERED, event['name'])
+        if event is None:
+            return RegistrationResult(RegistrationOutcome.EVENT_NOT_FOUND)
+        if event['date'] <= now_epoch:
+            return RegistrationResult(RegistrationOutcome.EVENT_IN_PAST, event['name'])
+        if event['capacity'] is not None and conn.execute(
+            "SELECT 1 FROM registrations WHERE user_id = ? AND event_id = ?", (user_id, event_id)
+        ).fetchone() is None:
+            return RegistrationResult(RegistrationOutcome.EVENT_FULL, event['name'])
+        return RegistrationResult(RegistrationOutcome.ALREADY_REGISTERED, event['name'])
+    
+    async def try_unregister(self, user_id: str, event_id: str) -> RegistrationResult:
+        """Atomically unregister the user if the event exists and they are registered"""
+        def unregister(conn: sqlite3.Connection) -> Tuple[RegistrationResult, bool]:
+            deleted = conn.execute(
+                """
+                DELETE FROM registrations
+                WHERE user_id = ? AND event_id = ?
+                  AND EXISTS (SELECT 1 FROM events WHERE event_id = ?)
+                """,
+                (user_id, event_id, event_id)
+            ).rowcount
+            event = conn.execute(
+                "SELECT name, capacity FROM events WHERE event_id = ?", (event_id,)
+            ).fetchone()
+            if event is None:
+                return RegistrationResult(RegistrationOutcome.EVENT_NOT_FOUND), False
+            if deleted:
+                return RegistrationResult(RegistrationOutcome.UNREGISTERED, event['name']), event['capacity'] is not None
+            return RegistrationResult(RegistrationOutcome.NOT_REGISTERED, event['name']), False
+        
+        result, capped = await self.db.shard_for(user_id).run_grouped(unregister)
+        if capped:
+            await self._release_seat(event_id)
+        if result.outcome == RegistrationOutcome.UNREGISTERED:
+            if self.index is not None:
+                self.index.removed(user_id, event_id)
+            self.admission.released(event_id)
+        return result
+    
+    async def unregister_user(self, user_id: str, event_id: str) -> bool:
         """Unregister user from an event"""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
+        rowcount = await self.db.shard_for(user_id).execute(
             "DELETE FROM registrations WHERE user_id = ? AND event_id = ?", 
             (user_id, event_id)
         )
-        conn.commit()
-        return cursor.rowcount > 0
+        if rowcount:
+            await self._release_seat(event_id)
+            if self.index is not None:
+                self.index.removed(user_id, event_id)
+            self.admission.released(event_id)
+        return rowcount > 0
     
-    def is_registered(self, user_id: str, event_id: str) -> bool:
+    async def is_registered(self, user_id: str, event_id: str) -> bool:
         """Check if user is registered for an event"""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
+        members = await self._members(event_id)
+        if members is not None:
+            return user_id in members
+        row = await self.db.shard_for(user_id).fetch_one(
             "SELECT 1 FROM registrations WHERE user_id = ? AND event_id = ? LIMIT 1", 
             (user_id, event_id)
         )
-        row = cursor.fetchone()
         return row is not None
     
-    def get_user_registrations(self, user_id: str) -> List[Registration]:
-        """Get all registrations for a user"""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
-            "SELECT * FROM registrations WHERE user_id = ? ORDER BY created_at ASC", 
+    async def get_user_registrations(self, user_id: str, include_archive: bool = False) -> List[Registration]:
+        """Get all registrations for a user, optionally including archived ones"""
+        rows = await self.db.shard_for(user_id).fetch_all(
+            f"SELECT * FROM {self._source(include_archive)} WHERE user_id = ? ORDER BY created_at ASC", 
             (user_id,)
         )
-        rows = cursor.fetchall()
+        return [self._row_to_registration(row) for row in rows]
+    
+    async def count_event_registrations(self, event_id: str) -> int:
+        """Count the users registered for an event"""
+        members = await self._members(event_id)
+        if members is not None:
+            return len(members)
+        rows = await fetch_all_shards(
+            self.db, "SELECT COUNT(*) FROM registrations WHERE event_id = ?", (event_id,)
+        )
+        return sum(row[0] for row in rows)
+    
+    async def get_event_registrations(self, event_id: str, include_archive: bool = False) -> List[Registration]:
+        """Get all registrations for an event, gathered from every shard"""
+        rows = await fetch_all_shards(
+            self.db,
+            f"SELECT * FROM {self._source(include_archive)} WHERE event_id = ? ORDER BY created_at ASC", 
+            (event_id,)
+        )
+        if len(self.db.shards) > 1:
+            rows.sort(key=lambda row: row['created_at'])
+        return [self._row_to_registration(row) for row in rows]
+    
+    async def get_user_upcoming_events(
+        self, user_id: str, now: datetime, limit: Optional[int] = None
+    ) -> List[Event]:
+        """Get events after ``now`` the user is registered for, in registration order"""
+        rows = await self.db.shard_for(user_id).fetch_all(
+            """
+            SELECT e.event_id, e.name, e.date, e.created_by, e.created_at, e.capacity
+            FROM registrations r
+            JOIN events e ON e.event_id = r.event_id
+            WHERE r.user_id = ? AND e.date > ?
+            ORDER BY r.created_at ASC
+            LIMIT ?
+            """,
+            (user_id, to_epoch(now), -1 if limit is None else limit)
+        )
+        return [SqliteEventRepository._row_to_event(row) for row in rows]
+    
+    async def import_registrations(self, registrations: Iterable[Registration]) -> int:
+        """Insert many registrations in large batches, skipping duplicates; return how many were added"""
+        now = to_epoch(datetime.now())
+        event_ids: Set[str] = set()
+        
+        def rows() -> Iterable[Tuple[str, str, int]]:
+            for registration in registrations:
+                event_ids.add(registration.event_id)
+                yield (registration.user_id, registration.event_id,
+                       epoch_of(registration, "created_at") or now)
+        
+        try:
+            return await bulk_insert(
+                self.db,
+                "INSERT OR IGNORE INTO registrations (user_id, event_id, created_at) VALUES (?, ?, ?)",
+                rows(),
+                shard_key=lambda row: row[0]
+            )
+        finally:
+            await self.recount_seats(event_ids)
+            if self.index is not None:
+                self.index.clear()
+            self.admission.clear()
+    
+    async def iter_all_registrations(
+        self, batch_size: int = 1000, include_archive: bool = False
+    ) -> AsyncIterator[Registration]:
+        """Iterate over all registrations without loading them all at once"""
+        async for rows in stream_all_shards(
+            self.db, f"SELECT * FROM {self._source(include_archive)}", batch_size=batch_size
+        ):
+            for row in rows:
+                yield self._row_to_registration(row)
+    
+    async def iter_user_registrations(self, user_id: str, batch_size: int = 1000) -> AsyncIterator[Registration]:
+        """Iterate over a user's registrations in registration order"""
+        async for rows in self.db.shard_for(user_id).stream(
+            "SELECT * FROM registrations WHERE user_id = ? ORDER BY created_at ASC",
+            (user_id,),
+            batch_size
+        ):
+            for row in rows:
+                yield self._row_to_registration(row)
+    
+    async def iter_event_registrations(self, event_id: str, batch_size: int = 1000) -> AsyncIterator[Registration]:
+        """Iterate over an event's registrations in registration order, merged across shards"""
+        async for rows in stream_merged_shards(
+            self.db,
+            "SELECT * FROM registrations WHERE event_id = ? ORDER BY created_at ASC",
+            lambda row: row['created_at'],
+            (event_id,),
+            batch_size
+        ):
+            for row in rows:
+                yield self._row_to_registration(row)
+    
+    async def warm_index(self) -> int:
+        """Load the registrations of all future events into the index; returns the events held"""
+        if self.index is None:
+            return 0
+        self.index.clear()
+        await self._remember_data_versions()
+        # An event written to while streaming is not installed and is left
+        # to load lazily
+        mark = self.index.begin_load()
+        current: Optional[str] = None
+        date = 0
+        user_ids: List[str] = []
         
-        registrations = []
+        def install() -> None:
+            if current is not None:
+                self.index.install(current, EventMembers(date, user_ids), mark)
+        
+        try:
+            async for rows in stream_merged_shards(
+                self.db,
+                """
+                SELECT r.event_id, r.user_id, e.date
+                FROM registrations r
+                JOIN events e ON e.event_id = r.event_id
+                WHERE e.date > ?
+                ORDER BY r.event_id
+                """,
+                lambda row: row['event_id'],
+                (to_epoch(datetime.now()),),
+                batch_size=10000
+            ):
+                for row in rows:
+                    if row['event_id'] != current:
+                        install()
+                        current, date, user_ids = row['event_id'], row['date'], []
+                    user_ids.append(row['user_id'])
+            install()
+        finally:
+            self.index.end_load(mark)
+        return self.index.stats["events"]
+    
+    async def recount_seats(self, event_ids: Optional[Iterable[str]] = None) -> None:
+        """Set ``seats_taken`` of capped events, or just of ``event_ids``, from every shard's rows
+        
+        Meant for quiet moments such as startup or right after an import: a
+        seat claimed concurrently whose row is not committed yet is not
+        counted.
+        """
+        event_ids = None if event_ids is None else list(event_ids)
+        if event_ids == []:
+            return
+        rows = await fetch_all_shards(
+            self.db,
+            """
+            SELECT r.event_id, COUNT(*) AS taken
+            FROM registrations r
+            JOIN events e ON e.event_id = r.event_id
+            WHERE e.capacity IS NOT NULL
+            GROUP BY r.event_id
+            """
+        )
+        taken: Dict[str, int] = {}
         for row in rows:
-            registrations.append(Registration(
-                user_id=row['user_id'],
-                event_id=row['event_id'],
-                created_at=datetime.fromisoformat(row['created_at'])
-            ))
+            taken[row['event_id']] = taken.get(row['event_id'], 0) + row['taken']
+        
+        def store(conn: sqlite3.Connection) -> None:
+            targets = event_ids
+            if targets is None:
+                targets = [row[0] for row in conn.execute("SELECT event_id FROM events WHERE capacity IS NOT NULL")]
+            conn.executemany(
+                "UPDATE events SET seats_taken = ? WHERE event_id = ? AND capacity IS NOT NULL",
+                [(taken.get(event_id, 0), event_id) for event_id in targets]
+            )
+        
+        await self._catalog.run_in_transaction(store)
+    
+    async def start(self, check_interval: float = 5.0) -> None:
+        """Check for other processes' writes every ``check_interval`` seconds; 0 disables"""
+        if self._check_task is None and check_interval > 0:
+            await self._remember_data_versions()
+            self._check_task = asyncio.create_task(self._check_periodically(check_interval))
+    
+    async def stop(self) -> None:
+        """Stop checking for other processes' writes"""
+        if self._check_task is not None:
+            self._check_task.cancel()
+            try:
+                await self._check_task
+            except asyncio.CancelledError:
+                pass
+            self._check_task = None
+    
+    async def check_external_writes(self) -> bool:
+        """Clear the index and seat counters if another process wrote since the last check
+        
+        This process writes through the writer connections only, so their
+        ``PRAGMA data_version`` changes exactly when someone else commits.
+        Returns whether anything was cleared.
+        """
+        previous = self._data_versions
+        await self._remember_data_versions()
+        if previous is None or previous == self._data_versions:
+            return False
+        if self.index is not None:
+            self.index.clear()
+        self.admission.clear()
+        return True
+    
+    def forget_events(self, event_ids: Iterable[str]) -> None:
+        """Drop in-memory state of events that left the hot tables, e.g. archived ones"""
+        for event_id in event_ids:
+            if self.index is not None:
+                self.index.forget(event_id)
+            self.admission.forget(event_id)
+    
+    async def _remember_data_versions(self) -> None:
+        """Note the current data version of the catalog and every shard"""
+        catalog = self.db.shards[0].catalog
+        databases = ([catalog] if catalog is not None else []) + self.db.shards
+        self._data_versions = list(await asyncio.gather(*(db.data_version() for db in databases)))
+    
+    async def _check_periodically(self, interval: float) -> None:
+        """Run ``check_external_writes`` every ``interval`` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check_external_writes()
+            except Exception as e:
+                print(f"Error checking for external registration writes: {e}")
+    
+    @property
+    def _catalog(self) -> DatabaseConnection:
+        """The database holding the events table and its seat counters"""
+        return self.db.shards[0].catalog or self.db.shards[0]
+    
+    async def _claim_seat(self, event_id: str, now_epoch: Optional[int] = None) -> bool:
+        """Take one of the event's free seats in the catalog, if it is after ``now_epoch``
         
-        return registrations
+        Returns False if no seat is left.
+        """
+        return await self._catalog.execute_grouped(
+            """
+            UPDATE events SET seats_taken = seats_taken + 1
+            WHERE event_id = ? AND (? IS NULL OR date > ?) AND seats_taken < capacity
+            """,
+            (event_id, now_epoch, now_epoch)
+        ) > 0
     
-    def get_event_registrations(self, event_id: str) -> List[Registration]:
-        """Get all registrations for an event"""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
-            "SELECT * FROM registrations WHERE event_id = ? ORDER BY created_at ASC", 
+    async def _release_seat(self, event_id: str) -> None:
+        """Hand a seat of the event back in the catalog"""
+        await self._catalog.execute_grouped(
+            """
+            UPDATE events SET seats_taken = seats_taken - 1
+            WHERE event_id = ? AND capacity IS NOT NULL AND seats_taken > 0
+            """,
             (event_id,)
         )
-        rows = cursor.fetchall()
-        
-        registrations = []
-        for row in rows:
-            registrations.append(Registration(
-                user_id=row['user_id'],
-                event_id=row['event_id'],
-                created_at=datetime.fromisoformat(row['created_at'])
-            ))
+    
+    async def _load_seats(self, event_id: str) -> Optional[Seats]:
+        """Read an event's capacity and the seats taken"""
+        event = await self._catalog.fetch_one(
+            "SELECT date, capacity, seats_taken FROM events WHERE event_id = ?", (event_id,)
+        )
+        if event is None:
+            return None
+        if event['capacity'] is None:
+            return Seats(event['date'], None)
+        return Seats(event['date'], event['capacity'], event['seats_taken'])
+    
+    async def _members(self, event_id: str) -> Optional[EventMembers]:
+        """The event's members from the index, loading them on a miss
         
-        return registrations
\ No newline at end of file
+        Returns None without an index or when the event does not exist.
+        """
+        if self.index is None:
+            return None
+        members = self.index.get(event_id)
+        if members is not None:
+            return members
+        mark = self.index.begin_load()
+        try:
+            event, rows = await asyncio.gather(
+                self.db.shards[0].fetch_one("SELECT date FROM events WHERE event_id = ?", (event_id,)),
+                fetch_all_shards(self.db, "SELECT user_id FROM registrations WHERE event_id = ?", (event_id,))
+            )
+            if event is None:
+                return None
+            members = EventMembers(event['date'], (row['user_id'] for row in rows))
+            self.index.install(event_id, members, mark)
+            return members
+        finally:
+            self.index.end_load(mark)
+    
+    @staticmethod
+    def _source(include_archive: bool) -> str:
+        """The registrations table, or a union with the archive"""
+        if include_archive:
+            return "(SELECT * FROM registrations UNION ALL SELECT * FROM registrations_archive)"
+        return "registrations"
+    
+    @staticmethod
+    def _row_to_registration(row: sqlite3.Row) -> Registration:
+        """Build a Registration from a database row, leaving timestamps undecoded"""
+        return Registration.from_row(row['user_id'], row['event_id'], row['created_at'])
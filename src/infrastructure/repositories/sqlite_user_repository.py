@@ -2,56 +2,53 @@ import sqlite3
 from typing import Optional
 from src.domain.entities.user import User
 from src.domain.repositories.user_repository import UserRepository
-from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.connection import StagedWrite
+from src.infrastructure.database.sharding import UserDatabase
 
 
 class SqliteUserRepository(UserRepository):
     """SQLite implementation of user repository"""
     
-    def __init__(self, db_connection: DatabaseConnection):
+    def __init__(self, db_connection: UserDatabase):
         self.db_connection = db_connection
     
     async def get_user(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
-        conn = self.db_connection.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        row = await self.db_connection.shard_for(user_id).fetch_one(
             "SELECT user_id, first_name, last_name, birth_year, is_admin FROM users WHERE user_id = ?",
             (user_id,)
         )
         
-        row = cursor.fetchone()
         if row:
-            return User(
-                user_id=row['user_id'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                birth_year=row['birth_year'],
-                is_admin=bool(row['is_admin'])
+            # Stored users were validated when they were created
+            return User.from_row(
+                row['user_id'], row['first_name'], row['last_name'], row['birth_year'], bool(row['is_admin'])
             )
         return None
     
     async def save_user(self, user: User) -> None:
         """Save user to database"""
-        conn = self.db_connection.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO users 
-            (user_id, first_name, last_name, birth_year, is_admin) 
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            user.user_id,
-            user.first_name,
-            user.last_name,
-            user.birth_year,
-            user.is_admin
-        ))
-        
-        conn.commit()
+        staged = self.stage_save(user)
+        await staged.db.run_in_transaction(staged.apply)
+    
+    def stage_save(self, user: User) -> StagedWrite:
+        """The save of ``user``, to run in a transaction on its shard"""
+        return StagedWrite(
+            self.db_connection.shard_for(user.user_id),
+            lambda conn: conn.execute("""
+                INSERT OR REPLACE INTO users 
+                (user_id, first_name, last_name, birth_year, is_admin) 
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                user.user_id,
+                user.first_name,
+                user.last_name,
+                user.birth_year,
+                user.is_admin
+            ))
+        )
     
     async def update_user(self, user: User) -> None:
         """Update existing user"""
         # For SQLite, save and update are the same operation (upsert)
-        await self.save_user(user)
\ No newline at end of file
+        await self.save_user(user)
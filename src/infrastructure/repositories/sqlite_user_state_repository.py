@@ -1,55 +1,86 @@
+import asyncio
 import sqlite3
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
-from src.domain.entities.user_state import UserState
+from src.domain.entities.user_state import UserState, stored_context
+from src.domain.entities.timestamps import to_epoch
 from src.domain.repositories.user_state_repository import UserStateRepository
-from src.infrastructure.database.connection import DatabaseConnection
+from src.infrastructure.database.connection import DatabaseConnection, StagedWrite
+from src.infrastructure.database.sharding import UserDatabase
 
 
 class SqliteUserStateRepository(UserStateRepository):
     """SQLite implementation of user state repository"""
     
-    def __init__(self, db_connection: DatabaseConnection):
+    def __init__(self, db_connection: UserDatabase):
         self.db_connection = db_connection
     
     async def get_user_state(self, user_id: str) -> Optional[UserState]:
         """Get user state by ID"""
-        conn = self.db_connection.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        row = await self.db_connection.shard_for(user_id).fetch_one(
             "SELECT user_id, current_step, context, updated_at FROM user_states WHERE user_id = ?",
             (user_id,)
         )
         
-        row = cursor.fetchone()
         if row:
-            return UserState(
-                user_id=row['user_id'],
-                current_step=row['current_step'],
-                context=row['context'],
-                updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
+            return UserState.from_row(
+                row['user_id'], row['current_step'], row['context'], row['updated_at']
             )
         return None
     
     async def save_user_state(self, user_state: UserState) -> None:
         """Save user state to database"""
-        conn = self.db_connection.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        await self.db_connection.shard_for(user_state.user_id).execute_grouped("""
             INSERT OR REPLACE INTO user_states 
-            (user_id, current_step, context) 
-            VALUES (?, ?, ?)
+            (user_id, current_step, context, updated_at) 
+            VALUES (?, ?, ?, ?)
         """, (
             user_state.user_id,
             user_state.current_step,
-            user_state.context
+            stored_context(user_state),
+            to_epoch(datetime.now())
         ))
+    
+    def stage_save(self, user_state: UserState) -> StagedWrite:
+        """The save of ``user_state``, to run in a transaction on its shard"""
+        return StagedWrite(
+            self.db_connection.shard_for(user_state.user_id),
+            lambda conn: conn.execute("""
+                INSERT OR REPLACE INTO user_states 
+                (user_id, current_step, context, updated_at) 
+                VALUES (?, ?, ?, ?)
+            """, (
+                user_state.user_id,
+                user_state.current_step,
+                stored_context(user_state),
+                to_epoch(datetime.now())
+            ))
+        )
+    
+    async def save_user_states(self, user_states: List[UserState]) -> None:
+        """Save many user states in one transaction per shard, keeping their updated_at"""
+        now = to_epoch(datetime.now())
+        rows_by_shard: Dict[DatabaseConnection, list] = {}
+        for state in user_states:
+            rows_by_shard.setdefault(self.db_connection.shard_for(state.user_id), []).append((
+                state.user_id,
+                state.current_step,
+                stored_context(state),
+                to_epoch(state.updated_at) if state.updated_at else now
+            ))
+        
+        def save(rows: list):
+            return lambda conn: conn.executemany("""
+                INSERT OR REPLACE INTO user_states 
+                (user_id, current_step, context, updated_at) 
+                VALUES (?, ?, ?, ?)
+            """, rows)
         
-        conn.commit()
+        await asyncio.gather(*(
+            shard.run_in_transaction(save(rows)) for shard, rows in rows_by_shard.items()
+        ))
     
     async def update_user_state(self, user_state: UserState) -> None:
         """Update existing user state"""
         # For SQLite, save and update are the same operation (upsert)
-        await self.save_user_state(user_state)
\ No newline at end of file
+        await self.save_user_state(user_state)
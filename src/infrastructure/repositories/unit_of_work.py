@@ -0,0 +1,359 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+from src.domain.entities.event import Event
+from src.domain.entities.registration import Registration, RegistrationResult
+from src.domain.entities.user import User
+from src.domain.entities.user_state import UserState
+from src.domain.repositories.event_repository import EventCursor, EventRepository
+from src.domain.repositories.registration_repository import RegistrationRepository
+from src.domain.repositories.user_repository import UserRepository
+from src.domain.repositories.user_state_repository import UserStateRepository
+from src.infrastructure.database.connection import DatabaseConnection, StagedWrite
+
+
+T = TypeVar("T")
+# A repository's ``stage_save``: the save prepared for a shared transaction, or None
+Stage = Callable[[Any], Optional[StagedWrite]]
+
+
+class UnitOfWork:
+    """Request-scoped view of the four repositories for one update
+    
+    Use cases built on ``users``, ``user_states``, ``events`` and
+    ``registrations`` share one identity map, so each user, state and event
+    is loaded at most once per update however many use cases ask for it.
+    Saves of users and states are tracked instead of written: only the last
+    version of each entity is kept until ``commit``. Saves of repositories
+    that can stage them (``stage_save`` returning a ``StagedWrite``) are
+    written in one transaction per database, so a user and their state on
+    the same shard are committed together or not at all. Repositories that
+    cannot, such as the in-memory write-behind state store, are written
+    after those transactions commit.
+    
+    Registration and event writes are not tracked: they run immediately,
+    since their conditional statements decide the reply, and are neither
+    delayed to ``commit`` nor undone by ``rollback``.
+    
+    Used as ``async with``: the pending writes are committed when the block
+    exits normally and dropped when it raises. ``stats`` counts the calls
+    that reached the wrapped repositories.
+    """
+    
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        user_state_repository: UserStateRepository,
+        event_repository: EventRepository,
+        registration_repository: RegistrationRepository
+    ):
+        self.round_trips = 0
+        self.hits = 0
+        self.users = ScopedUserRepository(self, user_repository)
+        self.user_states = ScopedUserStateRepository(self, user_state_repository)
+        self.events = ScopedEventRepository(self, event_repository)
+        self.registrations = ScopedRegistrationRepository(self, registration_repository)
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Round trips to the wrapped repositories, identity map hits and pending writes"""
+        return {
+            "round_trips": self.round_trips,
+            "hits": self.hits,
+            "pending": len(self.users.pending) + len(self.user_states.pending)
+        }
+    
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+    
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            self.rollback()
+    
+    async def commit(self) -> None:
+        """Write every tracked change, staged saves in one transaction per database"""
+        writes = self.users.take_pending() + self.user_states.take_pending()
+        if not writes:
+            return
+        staged: Dict[DatabaseConnection, List[StagedWrite]] = {}
+        unstaged = []
+        for write, stage, entity in writes:
+            step = stage(entity) if stage is not None else None
+            if step is None:
+                unstaged.append((write, entity))
+            else:
+                staged.setdefault(step.db, []).append(step)
+        
+        def apply_all(steps: List[StagedWrite]) -> Callable[[sqlite3.Connection], None]:
+            def apply(conn: sqlite3.Connection) -> None:
+                for step in steps:
+                    step.apply(conn)
+            return apply
+        
+        self.round_trips += len(staged) + len(unstaged)
+        await asyncio.gather(*(db.run_in_transaction(apply_all(steps)) for db, steps in staged.items()))
+        for steps in staged.values():
+            for step in steps:
+                step.committed()
+        await asyncio.gather(*(write(entity) for write, entity in unstaged))
+    
+    def rollback(self) -> None:
+        """Drop the tracked changes"""
+        self.users.take_pending()
+        self.user_states.take_pending()
+    
+    async def call(self, result: Awaitable[T]) -> T:
+        """Await a call that reaches a wrapped repository, counting it"""
+        self.round_trips += 1
+        return await result
+
+
+class _IdentityMap(Generic[T]):
+    """Entities loaded or saved in this unit, by ID, and the saves still to write"""
+    
+    def __init__(self, unit: UnitOfWork):
+        self.unit = unit
+        self.loaded: Dict[str, Optional[T]] = {}
+        self.pending: Dict[str, Tuple[Callable[[T], Awaitable[None]], Optional[Stage], T]] = {}
+    
+    async def get(self, key: str, load: Callable[[str], Awaitable[Optional[T]]]) -> Optional[T]:
+        """The entity for ``key``, loading it on first use only"""
+        if key in self.loaded:
+            self.unit.hits += 1
+            return self.loaded[key]
+        entity = await self.unit.call(load(key))
+        # A save made while loading wins over the loaded row
+        return self.loaded.setdefault(key, entity)
+    
+    def put(self, key: str, entity: T, write: Callable[[T], Awaitable[None]], inner: Any) -> None:
+        """Track a save; later saves of the same entity replace it
+        
+        ``inner``'s ``stage_save``, if it has one, lets the unit write the
+        save in a shared transaction instead of calling ``write``.
+        """
+        self.loaded[key] = entity
+        self.pending[key] = (write, getattr(inner, "stage_save", None), entity)
+    
+    def take_pending(self) -> List[Tuple[Callable[[T], Awaitable[None]], Optional[Stage], T]]:
+        """Hand over the tracked saves and forget them"""
+        pending, self.pending = list(self.pending.values()), {}
+        return pending
+
+
+class ScopedUserRepository(UserRepository):
+    """User repository of a ``UnitOfWork``"""
+    
+    def __init__(self, unit: UnitOfWork, inner: UserRepository):
+        self.inner = inner
+        self._map: _IdentityMap[User] = _IdentityMap(unit)
+    
+    @property
+    def pending(self) -> Dict[str, Any]:
+        """Saves not yet committed, by user ID"""
+        return self._map.pending
+    
+    def take_pending(self) -> list:
+        """Hand over the tracked saves and forget them"""
+        return self._map.take_pending()
+    
+    async def get_user(self, user_id: str) -> Optional[User]:
+        """Get user by ID"""
+        return await self._map.get(user_id, self.inner.get_user)
+    
+    async def save_user(self, user: User) -> None:
+        """Save user when the unit commits"""
+        self._map.put(user.user_id, user, self.inner.save_user, self.inner)
+    
+    async def update_user(self, user: User) -> None:
+        """Update existing user when the unit commits"""
+        self._map.put(user.user_id, user, self.inner.update_user, self.inner)
+
+
+class ScopedUserStateRepository(UserStateRepository):
+    """User state repository of a ``UnitOfWork``"""
+    
+    def __init__(self, unit: UnitOfWork, inner: UserStateRepository):
+        self.inner = inner
+        self._map: _IdentityMap[UserState] = _IdentityMap(unit)
+    
+    @property
+    def pending(self) -> Dict[str, Any]:
+        """Saves not yet committed, by user ID"""
+        return self._map.pending
+    
+    def take_pending(self) -> list:
+        """Hand over the tracked saves and forget them"""
+        return self._map.take_pending()
+    
+    async def get_user_state(self, user_id: str) -> Optional[UserState]:
+        """Get user state by ID"""
+        return await self._map.get(user_id, self.inner.get_user_state)
+    
+    async def save_user_state(self, user_state: UserState) -> None:
+        """Save user state when the unit commits"""
+        self._map.put(user_state.user_id, user_state, self.inner.save_user_state, self.inner)
+    
+    async def update_user_state(self, user_state: UserState) -> None:
+        """Update existing user state when the unit commits"""
+        self._map.put(user_state.user_id, user_state, self.inner.update_user_state, self.inner)
+
+
+class ScopedEventRepository(EventRepository):
+    """Event repository of a ``UnitOfWork``
+    
+    ``get_event_by_id`` goes through the identity map; everything else,
+    writes included, is passed through immediately and counted.
+    """
+    
+    def __init__(self, unit: UnitOfWork, inner: EventRepository):
+        self.unit = unit
+        self.inner = inner
+        self._map: _IdentityMap[Event] = _IdentityMap(unit)
+        self._archived: _IdentityMap[Event] = _IdentityMap(unit)
+    
+    async def create_event(self, event: Event) -> Event:
+        """Create a new event"""
+        created = await self.unit.call(self.inner.create_event(event))
+        self._map.loaded[created.event_id] = created
+        return created
+    
+    async def get_event_by_id(self, event_id: str, include_archive: bool = False) -> Optional[Event]:
+        """Get event by ID, falling back to archived events if asked to"""
+        if include_archive:
+            return await self._archived.get(event_id, lambda key: self.inner.get_event_by_id(key, True))
+        return await self._map.get(event_id, self.inner.get_event_by_id)
+    
+    async def get_events_by_ids(self, event_ids: List[str]) -> List[Event]:
+        """Get the existing events among the given IDs in one query"""
+        events = await self.unit.call(self.inner.get_events_by_ids(event_ids))
+        for event in events:
+            self._map.loaded.setdefault(event.event_id, event)
+        return events
+    
+    async def get_all_events(self, include_archive: bool = False) -> List[Event]:
+        """Get all events, optionally including archived ones"""
+        return await self.unit.call(self.inner.get_all_events(include_archive))
+    
+    async def get_future_events(self) -> List[Event]:
+        """Get all future events"""
+        return await self.unit.call(self.inner.get_future_events())
+    
+    async def get_future_events_page(
+        self,
+        limit: int,
+        after: Optional[EventCursor] = None,
+        before: Optional[EventCursor] = None
+    ) -> List[Event]:
+        """Get up to ``limit`` future events after or before a cursor, in date order"""
+        return await self.unit.call(self.inner.get_future_events_page(limit, after, before))
+    
+    async def search_events(self, query: str, limit: int = 10) -> List[Event]:
+        """Find future events whose name matches ``query``, best matches first"""
+        return await self.unit.call(self.inner.search_events(query, limit))
+    
+    async def delete_event(self, event_id: str) -> bool:
+        """Delete an event"""
+        self._map.loaded[event_id] = None
+        return await self.unit.call(self.inner.delete_event(event_id))
+    
+    async def import_events(self, events: Iterable[Event]) -> int:
+        """Insert many events in large batches, skipping existing IDs; return how many were added"""
+        return await self.unit.call(self.inner.import_events(events))
+    
+    def iter_all_events(self, batch_size: int = 1000, include_archive: bool = False) -> AsyncIterator[Event]:
+        """Iterate over all events in date order without loading them all at once"""
+        self.unit.round_trips += 1
+        return self.inner.iter_all_events(batch_size, include_archive)
+    
+    def iter_future_events(self, batch_size: int = 1000) -> AsyncIterator[Event]:
+        """Iterate over future events in date order without loading them all at once"""
+        self.unit.round_trips += 1
+        return self.inner.iter_future_events(batch_size)
+
+
+class ScopedRegistrationRepository(RegistrationRepository):
+    """Registration repository of a ``UnitOfWork``
+    
+    Commands run immediately and are not part of the unit's commit. A user's registration list is read at most
+    once per unit, until a command for that user changes it.
+    """
+    
+    def __init__(self, unit: UnitOfWork, inner: RegistrationRepository):
+        self.unit = unit
+        self.inner = inner
+        self._by_user: Dict[Tuple[str, bool], List[Registration]] = {}
+    
+    def _changed(self, user_id: str) -> None:
+        """Forget the registration lists read for ``user_id``"""
+        self._by_user.pop((user_id, False), None)
+        self._by_user.pop((user_id, True), None)
+    
+    async def register_user(self, registration: Registration) -> Registration:
+        """Register a user for an event"""
+        self._changed(registration.user_id)
+        return await self.unit.call(self.inner.register_user(registration))
+    
+    async def try_register(self, user_id: str, event_id: str, now: datetime) -> RegistrationResult:
+        """Atomically register a user for a future event"""
+        self._changed(user_id)
+        return await self.unit.call(self.inner.try_register(user_id, event_id, now))
+    
+    async def try_unregister(self, user_id: str, event_id: str) -> RegistrationResult:
+        """Atomically unregister a user from an event"""
+        self._changed(user_id)
+        return await self.unit.call(self.inner.try_unregister(user_id, event_id))
+    
+    async def unregister_user(self, user_id: str, event_id: str) -> bool:
+        """Unregister a user from an event"""
+        self._changed(user_id)
+        return await self.unit.call(self.inner.unregister_user(user_id, event_id))
+    
+    async def is_registered(self, user_id: str, event_id: str) -> bool:
+        """Check if a user is registered for an event"""
+        return await self.unit.call(self.inner.is_registered(user_id, event_id))
+    
+    async def get_user_registrations(self, user_id: str, include_archive: bool = False) -> List[Registration]:
+        """Get all registrations for a user"""
+        key = (user_id, include_archive)
+        if key in self._by_user:
+            self.unit.hits += 1
+            return self._by_user[key]
+        registrations = await self.unit.call(self.inner.get_user_registrations(user_id, include_archive))
+        self._by_user[key] = registrations
+        return registrations
+    
+    async def count_event_registrations(self, event_id: str) -> int:
+        """Count the registrations for an event"""
+        return await self.unit.call(self.inner.count_event_registrations(event_id))
+    
+    async def get_event_registrations(self, event_id: str, include_archive: bool = False) -> List[Registration]:
+        """Get all registrations for an event"""
+        return await self.unit.call(self.inner.get_event_registrations(event_id, include_archive))
+    
+    async def get_user_upcoming_events(
+        self, user_id: str, now: datetime, limit: Optional[int] = None
+    ) -> List[Event]:
+        """Get events after ``now`` the user is registered for, in registration order"""
+        return await self.unit.call(self.inner.get_user_upcoming_events(user_id, now, limit))
+    
+    async def import_registrations(self, registrations: Iterable[Registration]) -> int:
+        """Insert many registrations, skipping existing ones; return how many were added"""
+        return await self.unit.call(self.inner.import_registrations(registrations))
+    
+    def iter_all_registrations(self, batch_size: int = 1000, include_archive: bool = False) -> AsyncIterator[Registration]:
+        """Iterate over all registrations without loading them all at once"""
+        self.unit.round_trips += 1
+        return self.inner.iter_all_registrations(batch_size, include_archive)
+    
+    def iter_user_registrations(self, user_id: str, batch_size: int = 1000) -> AsyncIterator[Registration]:
+        """Iterate over a user's registrations without loading them all at once"""
+        self.unit.round_trips += 1
+        return self.inner.iter_user_registrations(user_id, batch_size)
+    
+    def iter_event_registrations(self, event_id: str, batch_size: int = 1000) -> AsyncIterator[Registration]:
+        """Iterate over an event's registrations without loading them all at once"""
+        self.unit.round_trips += 1
+        return self.inner.iter_event_registrations(event_id, batch_size)
@@ -0,0 +1,134 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+from src.domain.entities.slotted import raw_value
+from src.domain.entities.user_state import UserState
+from src.domain.repositories.user_state_repository import UserStateRepository
+from src.infrastructure.repositories.sqlite_user_state_repository import SqliteUserStateRepository
+
+
+class WriteBehindUserStateRepository(UserStateRepository):
+    """In-memory user state store that flushes to SQLite in the background
+    
+    Reads and writes are served from memory. Changed states are collected
+    and written to SQLite in one batched transaction every
+    ``flush_interval`` seconds and on ``stop``. A crash loses at most the
+    states changed since the last flush. Up to ``max_size`` states are kept;
+    beyond that the least recently used clean states are dropped and
+    reloaded from SQLite when needed. States being flushed stay pinned in
+    memory until their batch commits, so a read during a flush never falls
+    through to the older row in SQLite.
+    """
+    
+    def __init__(
+        self,
+        inner: SqliteUserStateRepository,
+        flush_interval: float = 1.0,
+        max_size: int = 100000
+    ):
+        self.inner = inner
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._states: "OrderedDict[str, Optional[UserState]]" = OrderedDict()
+        self._dirty: Dict[str, UserState] = {}
+        self._flushing: Dict[str, UserState] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_states = 0
+    
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Store counters for monitoring"""
+        return {
+            "size": len(self._states),
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "flushed_states": self.flushed_states
+        }
+    
+    async def start(self) -> None:
+        """Start the periodic background flush"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+    
+    async def stop(self) -> None:
+        """Stop the background flush and write out everything still pending"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+    
+    async def get_user_state(self, user_id: str) -> Optional[UserState]:
+        """Get user state by ID"""
+        if user_id in self._states:
+            self._states.move_to_end(user_id)
+            return self._states[user_id]
+        state = await self.inner.get_user_state(user_id)
+        # A save may have landed while we were reading
+        if user_id not in self._states:
+            self._remember(user_id, state)
+        return self._states[user_id]
+    
+    async def save_user_state(self, user_state: UserState) -> None:
+        """Save user state; it reaches SQLite with the next flush"""
+        # States are immutable; stamp a copy without re-validating it, and
+        # without decoding a context that is still in its stored form
+        user_state = UserState.from_row(
+            user_state.user_id, user_state.current_step, raw_value(user_state, "context"), datetime.now()
+        )
+        self._dirty[user_state.user_id] = user_state
+        self._remember(user_state.user_id, user_state)
+    
+    async def update_user_state(self, user_state: UserState) -> None:
+        """Update existing user state"""
+        await self.save_user_state(user_state)
+    
+    async def flush(self) -> None:
+        """Write all pending states to SQLite in one transaction"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            pending, self._dirty = self._dirty, {}
+            self._flushing = pending
+            try:
+                await self.inner.save_user_states(list(pending.values()))
+            except Exception:
+                # Keep them pending, unless they were overwritten meanwhile
+                for user_id, state in pending.items():
+                    self._dirty.setdefault(user_id, state)
+                raise
+            finally:
+                self._flushing = {}
+            self.flushes += 1
+            self.flushed_states += len(pending)
+    
+    async def _flush_periodically(self) -> None:
+        """Flush every ``flush_interval`` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing user states: {e}")
+    
+    def _remember(self, user_id: str, state: Optional[UserState]) -> None:
+        """Cache a state and evict least recently used clean ones over the limit
+        
+        States waiting for a flush or in a flush that has not committed yet
+        are never evicted, nor is the state just cached.
+        """
+        self._states[user_id] = state
+        self._states.move_to_end(user_id)
+        if len(self._states) <= self.max_size:
+            return
+        for candidate in list(self._states):
+            if len(self._states) <= self.max_size:
+                break
+            if candidate != user_id and candidate not in self._dirty and candidate not in self._flushing:
+                del self._states[candidate]
@@ -0,0 +1,177 @@
+import csv
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, TextIO, Union
+from src.domain.entities.event import Event
+from src.domain.entities.registration import Registration
+from src.domain.entities.timestamps import epoch_of
+from src.domain.repositories.event_repository import EventRepository
+from src.domain.repositories.registration_repository import RegistrationRepository
+
+
+FORMATS = ("ndjson", "csv")
+EVENT_FIELDS = ("event_id", "name", "date", "created_by", "created_at", "capacity")
+REGISTRATION_FIELDS = ("user_id", "event_id", "created_at")
+
+# Reused across records; json.dumps builds a new encoder on every call
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def detect_format(path: str, requested: Optional[str] = None) -> str:
+    """Use the requested format, else guess from the file extension"""
+    if requested:
+        return requested
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def _format_timestamp(epoch: Optional[int]) -> Optional[str]:
+    """Render epoch seconds as ISO 8601 UTC with an explicit offset
+    
+    The offset keeps the instant intact when the file is imported on a
+    host in another timezone.
+    """
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds")
+
+
+def _parse_timestamp(value: Any) -> Union[datetime, int, None]:
+    """Accept ISO 8601 strings or epoch seconds; empty means missing
+    
+    Strings with an offset are converted to epoch seconds; strings without
+    one are taken as local time, as older exports wrote them.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        return int(parsed.timestamp())
+    return parsed
+
+
+def _parse_capacity(value: Any) -> Optional[int]:
+    """Seat limit of an imported event; empty means unlimited"""
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def read_records(file: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per NDJSON line or CSV row"""
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+async def write_records(
+    records: AsyncIterator[Dict[str, Any]], file: TextIO, fmt: str, fields: Sequence[str]
+) -> int:
+    """Write records as NDJSON lines or CSV rows and return how many were written"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        async for record in records:
+            writer.writerow(record)
+            count += 1
+        return count
+    async for record in records:
+        file.write(_encode_json(record) + "\n")
+        count += 1
+    return count
+
+
+def event_from_record(record: Dict[str, Any]) -> Event:
+    """Build an Event from an imported record"""
+    return Event(
+        event_id=record["event_id"],
+        name=record["name"],
+        date=_parse_timestamp(record["date"]),
+        created_by=record["created_by"],
+        created_at=_parse_timestamp(record.get("created_at")),
+        capacity=_parse_capacity(record.get("capacity"))
+    )
+
+
+def event_to_record(event: Event) -> Dict[str, Any]:
+    """Turn an Event into an exportable record"""
+    return {
+        "event_id": event.event_id,
+        "name": event.name,
+        "date": _format_timestamp(epoch_of(event, "date")),
+        "created_by": event.created_by,
+        "created_at": _format_timestamp(epoch_of(event, "created_at")),
+        "capacity": event.capacity
+    }
+
+
+def registration_from_record(record: Dict[str, Any]) -> Registration:
+    """Build a Registration from an imported record"""
+    return Registration(
+        user_id=str(record["user_id"]),
+        event_id=record["event_id"],
+        created_at=_parse_timestamp(record.get("created_at"))
+    )
+
+
+def registration_to_record(registration: Registration) -> Dict[str, Any]:
+    """Turn a Registration into an exportable record"""
+    return {
+        "user_id": registration.user_id,
+        "event_id": registration.event_id,
+        "created_at": _format_timestamp(epoch_of(registration, "created_at"))
+    }
+
+
+async def import_events(repository: EventRepository, file: TextIO, fmt: str) -> int:
+    """Import events from a file; returns the number of new events"""
+    return await repository.import_events(
+        event_from_record(record) for record in read_records(file, fmt)
+    )
+
+
+async def import_registrations(repository: RegistrationRepository, file: TextIO, fmt: str) -> int:
+    """Import registrations from a file; returns the number of new registrations"""
+    return await repository.import_registrations(
+        registration_from_record(record) for record in read_records(file, fmt)
+    )
+
+
+async def export_events(
+    repository: EventRepository, file: TextIO, fmt: str, include_archive: bool = False
+) -> int:
+    """Stream all events, optionally with archived ones, into a file; returns the number written"""
+    async def records() -> AsyncIterator[Dict[str, Any]]:
+        async for event in repository.iter_all_events(include_archive=include_archive):
+            yield event_to_record(event)
+    
+    return await write_records(records(), file, fmt, EVENT_FIELDS)
+
+
+async def export_registrations(
+    repository: RegistrationRepository,
+    file: TextIO,
+    fmt: str,
+    event_id: Optional[str] = None,
+    include_archive: bool = False
+) -> int:
+    """Stream all registrations, or one event's attendee list, into a file; returns the number written"""
+    async def records() -> AsyncIterator[Dict[str, Any]]:
+        if event_id is None:
+            registrations = repository.iter_all_registrations(include_archive=include_archive)
+        elif include_archive:
+            # An archived event's attendee list is final and read in one go
+            for registration in await repository.get_event_registrations(event_id, include_archive=True):
+                yield registration_to_record(registration)
+            return
+        else:
+            registrations = repository.iter_event_registrations(event_id)
+        async for registration in registrations:
+            yield registration_to_record(registration)
+    
+    return await write_records(records(), file, fmt, REGISTRATION_FIELDS)
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Optional
 from src.application.use_cases.user_onboarding import UserOnboardingUseCase
 from src.application.use_cases.get_main_menu import GetMainMenuUseCase
 from src.application.use_cases.create_event import CreateEventUseCase
@@ -6,9 +6,218 @@ from src.application.use_cases.get_events import GetEventsUseCase
 from src.application.use_cases.register_for_event import RegisterForEventUseCase
 from src.application.use_cases.get_my_events import GetMyEventsUseCase
 from src.application.use_cases.unregister_from_event import UnregisterFromEventUseCase
+from src.application.use_cases.search_events import SearchEventsUseCase
 from src.domain.repositories.user_state_repository import UserStateRepository
+from src.domain.entities.conversation import ConversationError, validate_input
+from src.domain.entities.conversation_context import ConversationContext
 from src.domain.entities.user_state import UserState
-import json
+from src.presentation.telegram.router import Router, Update
+
+
+class UseCases(NamedTuple):
+    """The use cases and repository the handlers of one update work with"""
+    user_onboarding: UserOnboardingUseCase
+    get_main_menu: GetMainMenuUseCase
+    create_event: CreateEventUseCase
+    get_events: GetEventsUseCase
+    register_for_event: RegisterForEventUseCase
+    get_my_events: GetMyEventsUseCase
+    unregister_from_event: UnregisterFromEventUseCase
+    user_state_repository: UserStateRepository
+    search_events: Optional[SearchEventsUseCase]
+
+
+router = Router()
+
+ADMIN_MENU_KEYBOARD = [
+    [{"text": "➕ Create Event", "callback_data": "create_event"}],
+    [{"text": "📊 All Events", "callback_data": "all_events"}],
+    [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
+]
+BACK_TO_MAIN_MENU_KEYBOARD = [[{"text": "Back to Main Menu", "callback_data": "main_menu"}]]
+
+HELP_TEXT = "❓ Help:\n\nThis bot helps you manage and register for events.\n\nCommands:\n/start - Start the bot\n\nMenu options:\n🎯 Browse Events - View upcoming events\n🔎 Search Events - Find events by name\n📋 My Events - View your registered events\n⚙️ Admin Menu - Create events (admin only)"
+
+
+def reply(user_id: str, text: str, keyboard: List[List[Dict[str, str]]]) -> Dict[str, Any]:
+    """Response message with an inline keyboard"""
+    return {
+        "chat_id": user_id,
+        "text": text,
+        "reply_markup": {"inline_keyboard": keyboard}
+    }
+
+
+async def save_step(
+    use_cases: UseCases, update: Update, step: str, context: Optional[ConversationContext] = None
+) -> None:
+    """Move the user to ``step``; a move the conversation does not allow raises before saving"""
+    await use_cases.user_state_repository.save_user_state(
+        UserState.transition(update.step, update.user_id, step, context)
+    )
+
+
+@router.callback('main_menu')
+@router.command('/start')
+@router.otherwise
+async def show_main_menu(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Main menu, also the answer to anything no other route takes"""
+    message_text, keyboard = await use_cases.get_main_menu.execute(update.user_id)
+    # Users without a profile were just moved into onboarding by the use case
+    if await use_cases.get_main_menu.user_repository.get_user(update.user_id) is not None:
+        await save_step(use_cases, update, 'main_menu')
+    return reply(update.user_id, message_text, keyboard)
+
+
+@router.callback('browse_events', 'events')
+@router.callback(f"{GetEventsUseCase.PAGE_CALLBACK_PREFIX}:", prefix=True)
+async def browse_events(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """A page of upcoming events"""
+    # Page buttons carry a (date, event_id) cursor after the prefix
+    after, before = GetEventsUseCase.parse_page_callback(update.callback.raw)
+    result = await use_cases.get_events.execute(update.user_id, after=after, before=before)
+    await save_step(use_cases, update, result['next_step'])
+    return reply(update.user_id, result['message'], result['keyboard'])
+
+
+@router.callback('search_events')
+async def start_search(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Ask for a search query"""
+    if use_cases.search_events is None:
+        return await show_main_menu(update, use_cases)
+    await save_step(use_cases, update, 'searching_events')
+    return reply(update.user_id, "🔎 Enter a word from the event name:", BACK_TO_MAIN_MENU_KEYBOARD)
+
+
+@router.callback('my_events')
+async def show_my_events(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """The events the user is registered for"""
+    result = await use_cases.get_my_events.execute(update.user_id)
+    await save_step(use_cases, update, result['next_step'])
+    return reply(update.user_id, result['message'], result['keyboard'])
+
+
+@router.callback('admin_menu', 'admin')
+async def show_admin_menu(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Admin menu, for admins only"""
+    user = await use_cases.get_main_menu.user_repository.get_user(update.user_id)
+    if not (user and user.is_admin):
+        return reply(update.user_id, "You don't have admin privileges.", BACK_TO_MAIN_MENU_KEYBOARD)
+    await save_step(use_cases, update, 'admin_menu')
+    return reply(update.user_id, "⚙️ Admin Menu:\n\nSelect an action:", ADMIN_MENU_KEYBOARD)
+
+
+@router.callback('create_event')
+async def start_event_creation(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Ask an admin for the name of a new event"""
+    user = await use_cases.get_main_menu.user_repository.get_user(update.user_id)
+    if not (user and user.is_admin):
+        return reply(update.user_id, "You don't have admin privileges to create events.", BACK_TO_MAIN_MENU_KEYBOARD)
+    await save_step(use_cases, update, 'creating_event_name')
+    return reply(update.user_id, "Enter the event name:", [[{"text": "Cancel", "callback_data": "admin_menu"}]])
+
+
+@router.callback('register_', prefix=True)
+async def register(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Register for the event in the callback data (``register_EVENTID``)"""
+    result = await use_cases.register_for_event.execute(update.user_id, update.callback.argument)
+    await save_step(use_cases, update, result.get('next_step', 'main_menu'))
+    return reply(update.user_id, result['message'], result.get('keyboard', []))
+
+
+@router.callback('unregister_', prefix=True)
+async def unregister(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Unregister from the event in the callback data (``unregister_EVENTID``)"""
+    result = await use_cases.unregister_from_event.execute(update.user_id, update.callback.argument)
+    await save_step(use_cases, update, result.get('next_step', 'my_events'))
+    return reply(update.user_id, result['message'], result.get('keyboard', []))
+
+
+@router.callback('help')
+async def show_help(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Help text"""
+    return reply(update.user_id, HELP_TEXT, BACK_TO_MAIN_MENU_KEYBOARD)
+
+
+@router.step('enter_first_name', 'enter_last_name', 'enter_birth_year')
+async def continue_onboarding(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Take the next onboarding answer"""
+    # The use case saves the next step together with the answers so far
+    message_text, next_step, keyboard = await use_cases.user_onboarding.execute(
+        update.user_id, update.step, update.text, update.state
+    )
+    return reply(update.user_id, message_text, keyboard)
+
+
+@router.step('creating_event_name')
+async def take_event_name(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Keep the event name in the context and ask for the date"""
+    error_message = validate_input(update.step, update.text)
+    if error_message is not None:
+        return reply(update.user_id, error_message, [[{"text": "Cancel", "callback_data": "admin_menu"}]])
+    await save_step(
+        use_cases, update, 'creating_event_date', ConversationContext(event_name=update.text)
+    )
+    return reply(
+        update.user_id,
+        "Enter the event date (YYYY-MM-DD HH:MM format):",
+        [[{"text": "Cancel", "callback_data": "admin_menu"}]]
+    )
+
+
+@router.step('creating_event_date')
+async def take_event_date(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Create the event from the stored name and the date just entered"""
+    try:
+        event_name = update.state.context.event_name if update.state.context else None
+    except ValueError:
+        event_name = None
+    
+    if not event_name:
+        return reply(
+            update.user_id,
+            "Error: Event name not found. Please start again.",
+            [[{"text": "Back to Admin Menu", "callback_data": "admin_menu"}]]
+        )
+    
+    result = await use_cases.create_event.execute(update.user_id, event_name, update.text)
+    if result['success']:
+        keyboard = [
+            [{"text": "All Events", "callback_data": "all_events"}],
+            [{"text": "Create Event", "callback_data": "create_event"}],
+            [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
+        ]
+        next_step = result.get('next_step', 'admin_menu')
+    else:
+        keyboard = [[{"text": "Try Again", "callback_data": "create_event"}], [{"text": "Back", "callback_data": "admin_menu"}]]
+        next_step = result.get('next_step', 'creating_event_date')
+    
+    # Staying on the date step keeps the name for the next attempt
+    await save_step(use_cases, update, next_step, update.state.context)
+    return reply(update.user_id, result['message'], keyboard)
+
+
+@router.step('searching_events')
+async def run_search(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Any text typed while searching is the query"""
+    if use_cases.search_events is None:
+        return await show_main_menu(update, use_cases)
+    result = await use_cases.search_events.execute(update.user_id, update.text)
+    await save_step(use_cases, update, result['next_step'])
+    return reply(update.user_id, result['message'], result['keyboard'])
+
+
+@router.step('main_menu')
+async def repeat_main_menu(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Show the main menu again without moving the user"""
+    message_text, keyboard = await use_cases.get_main_menu.execute(update.user_id)
+    return reply(update.user_id, message_text, keyboard)
+
+
+@router.step('admin_menu')
+async def repeat_admin_menu(update: Update, use_cases: UseCases) -> Dict[str, Any]:
+    """Show the admin menu again"""
+    return await show_admin_menu(update, use_cases)
 
 
 async def handle_message(
@@ -20,7 +229,8 @@ async def handle_message(
     register_for_event_use_case: RegisterForEventUseCase,
     get_my_events_use_case: GetMyEventsUseCase,
     unregister_from_event_use_case: UnregisterFromEventUseCase,
-    user_state_repository: UserStateRepository
+    user_state_repository: UserStateRepository,
+    search_events_use_case: Optional[SearchEventsUseCase] = None
 ) -> Dict[str, Any]:
     """
     Handle incoming message from Telegram
@@ -35,7 +245,8 @@ async def handle_message(
         get_my_events_use_case: Get my events use case
         unregister_from_event_use_case: Unregister from event use case
         user_state_repository: User state repository
-        
+        search_events_use_case: Search events use case
+    
     Returns:
         Response to send back to Telegram
     """
@@ -44,280 +255,35 @@ async def handle_message(
         callback_query = update_data['callback_query']
         user_id = str(callback_query['from']['id'])
         callback_data = callback_query['data']
-        message = callback_query.get('message', {})
+        text = ''
     # Check if this is a message update
     elif 'message' in update_data:
         message = update_data['message']
         user_id = str(message['from']['id'])
-        callback_data = message.get('text', '')
+        callback_data = None
+        text = message.get('text', '')
     else:
         return {"error": "No message or callback query in update"}
-
-    # Get current user state
-    current_state = await user_state_repository.get_user_state(user_id)
     
-    # Determine current step
-    if current_state:
-        current_step = current_state.current_step
-    else:
-        # New user, start with main menu which will trigger onboarding
-        current_step = 'main_menu'
-
-    # Handle callback commands
-    if callback_data.startswith('main_menu'):
-        message_text, keyboard = await get_main_menu_use_case.execute(user_id)
-        new_state = UserState(user_id=user_id, current_step='main_menu', context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif callback_data.startswith('browse_events'):
-        result = get_events_use_case.execute(user_id)
-        message_text = result['message']
-        keyboard = result['keyboard']
-        next_step = result['next_step']
-        
-        new_state = UserState(user_id=user_id, current_step=next_step, context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif callback_data.startswith('my_events'):
-        result = get_my_events_use_case.execute(user_id)
-        message_text = result['message']
-        keyboard = result['keyboard']
-        next_step = result['next_step']
-        
-        new_state = UserState(user_id=user_id, current_step=next_step, context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif callback_data.startswith('admin_menu'):
-        # Create a simple admin menu
-        user = get_main_menu_use_case.user_repository.get_user_by_id(user_id)
-        if user and user.is_admin:
-            message_text = "⚙️ Admin Menu:\n\nSelect an action:"
-            keyboard = [
-                [{"text": "➕ Create Event", "callback_data": "create_event"}],
-                [{"text": "📊 All Events", "callback_data": "all_events"}],
-                [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-            ]
-            new_state = UserState(user_id=user_id, current_step='admin_menu', context=None)
-            await user_state_repository.save_user_state(new_state)
-            
-            return {
-                "chat_id": user_id,
-                "text": message_text,
-                "reply_markup": {"inline_keyboard": keyboard}
-            }
-        else:
-            message_text = "You don't have admin privileges."
-            keyboard = [
-                [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-            ]
-            return {
-                "chat_id": user_id,
-                "text": message_text,
-                "reply_markup": {"inline_keyboard": keyboard}
-            }
-    elif callback_data.startswith('create_event'):
-        # Check if user is admin
-        user = get_main_menu_use_case.user_repository.get_user_by_id(user_id)
-        if not (user and user.is_admin):
-            message_text = "You don't have admin privileges to create events."
-            keyboard = [
-                [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-            ]
-            return {
-                "chat_id": user_id,
-                "text": message_text,
-                "reply_markup": {"inline_keyboard": keyboard}
-            }
-        
-        # Start event creation process
-        message_text = "Enter the event name:"
-        keyboard = [[{"text": "Cancel", "callback_data": "admin_menu"}]]
-        new_state = UserState(user_id=user_id, current_step='creating_event_name', context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif callback_data.startswith('register_'):
-        # Extract event_id from callback_data (format: register_EVENTID)
-        event_id = callback_data.split('_')[1]
-        result = register_for_event_use_case.execute(user_id, event_id)
-        message_text = result['message']
-        keyboard = result.get('keyboard', [])
-        
-        # Set the next step based on the result
-        next_step = result.get('next_step', 'main_menu')
-        new_state = UserState(user_id=user_id, current_step=next_step, context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif callback_data.startswith('unregister_'):
-        # Extract event_id from callback_data (format: unregister_EVENTID)
-        event_id = callback_data.split('_')[1]
-        result = unregister_from_event_use_case.execute(user_id, event_id)
-        message_text = result['message']
-        keyboard = result.get('keyboard', [])
-        
-        # Set the next step based on the result
-        next_step = result.get('next_step', 'my_events')
-        new_state = UserState(user_id=user_id, current_step=next_step, context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif callback_data.startswith('help'):
-        message_text = "❓ Help:\n\nThis bot helps you manage and register for events.\n\nCommands:\n/start - Start the bot\n\nMenu options:\n🎯 Browse Events - View upcoming events\n📋 My Events - View your registered events\n⚙️ Admin Menu - Create events (admin only)"
-        keyboard = [
-            [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-        ]
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-
-    # Handle text input based on current step
-    user_input = message.get('text', '')
-
-    # Handle special commands
-    if user_input == '/start':
-        # For /start command, go to main menu
-        message_text, keyboard = await get_main_menu_use_case.execute(user_id)
-        new_state = UserState(user_id=user_id, current_step='main_menu', context=None)
-        await user_state_repository.save_user_state(new_state)
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-
-    # Handle onboarding flow based on current step
-    if current_step in ['enter_first_name', 'enter_last_name', 'enter_birth_year']:
-        # Process onboarding step
-        message_text, next_step, keyboard = await user_onboarding_use_case.execute(
-            user_id, current_step, user_input
-        )
-        
-        # Update user state with new step, preserving context if available
-        new_state = UserState(user_id=user_id, current_step=next_step, context=current_state.context if current_state else None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    # Handle event creation steps
-    elif current_step == 'creating_event_name':
-        # Store the event name temporarily in context and ask for date
-        context = {"event_name": user_input}
-        message_text = "Enter the event date (YYYY-MM-DD HH:MM format):"
-        keyboard = [[{"text": "Cancel", "callback_data": "admin_menu"}]]
-        new_state = UserState(user_id=user_id, current_step='creating_event_date', context=str(context))
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif current_step == 'creating_event_date':
-        # Get the stored event name from context
-        try:
-            context = json.loads(current_state.context) if current_state.context else {}
-            event_name = context.get("event_name", "")
-        except:
-            event_name = ""
-        
-        if not event_name:
-            message_text = "Error: Event name not found. Please start again."
-            keyboard = [[{"text": "Back to Admin Menu", "callback_data": "admin_menu"}]]
-            return {
-                "chat_id": user_id,
-                "text": message_text,
-                "reply_markup": {"inline_keyboard": keyboard}
-            }
-        
-        # Create the event
-        result = create_event_use_case.execute(user_id, event_name, user_input)
-        message_text = result['message']
-        
-        if result['success']:
-            keyboard = [
-                [{"text": "All Events", "callback_data": "all_events"}],
-                [{"text": "Create Event", "callback_data": "create_event"}],
-                [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-            ]
-            next_step = result.get('next_step', 'admin_menu')
-        else:
-            keyboard = [[{"text": "Try Again", "callback_data": "create_event"}], [{"text": "Back", "callback_data": "admin_menu"}]]
-            next_step = result.get('next_step', 'creating_event_date')
-        
-        new_state = UserState(user_id=user_id, current_step=next_step, context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif current_step == 'main_menu':
-        # Handle main menu interactions
-        message_text, keyboard = await get_main_menu_use_case.execute(user_id)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
-    elif current_step == 'admin_menu':
-        # Handle admin menu interactions
-        user = get_main_menu_use_case.user_repository.get_user_by_id(user_id)
-        if user and user.is_admin:
-            message_text = "⚙️ Admin Menu:\n\nSelect an action:"
-            keyboard = [
-                [{"text": "➕ Create Event", "callback_data": "create_event"}],
-                [{"text": "📊 All Events", "callback_data": "all_events"}],
-                [{"text": "Back to Main Menu", "callback_data": "main_menu"}]
-            ]
-            return {
-                "chat_id": user_id,
-                "text": message_text,
-                "reply_markup": {"inline_keyboard": keyboard}
-            }
+    update = Update(user_id, text, None, await user_state_repository.get_user_state(user_id))
+    handler, callback = router.route(callback_data, text, update.step)
     
-    else:
-        # Default response for unknown states
-        message_text, keyboard = await get_main_menu_use_case.execute(user_id)
-        new_state = UserState(user_id=user_id, current_step='main_menu', context=None)
-        await user_state_repository.save_user_state(new_state)
-        
-        return {
-            "chat_id": user_id,
-            "text": message_text,
-            "reply_markup": {"inline_keyboard": keyboard}
-        }
\ No newline at end of file
+    use_cases = UseCases(
+        user_onboarding_use_case,
+        get_main_menu_use_case,
+        create_event_use_case,
+        get_events_use_case,
+        register_for_event_use_case,
+        get_my_events_use_case,
+        unregister_from_event_use_case,
+        user_state_repository,
+        search_events_use_case
+    )
+    try:
+        return await handler(update._replace(callback=callback), use_cases)
+    except ConversationError as e:
+        # The state cannot go on, e.g. answers it needs were lost; start over
+        print(f"Error in conversation of user {user_id}, back to the main menu: {e}")
+        response = await show_main_menu(update, use_cases)
+        response["text"] = f"Что-то пошло не так, начнём сначала.\n\n{response['text']}"
+        return response
@@ -0,0 +1,99 @@
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from src.domain.entities.user_state import UserState
+
+
+class CallbackData(NamedTuple):
+    """Callback data split into the registered token and what follows it"""
+    token: str
+    argument: str
+    raw: str
+
+
+class Update(NamedTuple):
+    """What handlers need from one Telegram update"""
+    user_id: str
+    text: str
+    callback: Optional[CallbackData]
+    state: Optional[UserState]
+    
+    @property
+    def step(self) -> str:
+        """The user's conversation step; new users start at the main menu"""
+        return self.state.current_step if self.state else 'main_menu'
+
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class Router:
+    """Dispatch table from callback data, commands and conversation steps to handlers
+    
+    Handlers are registered once, at import, with the ``callback``,
+    ``command``, ``step`` and ``otherwise`` decorators. Callback data is
+    looked up as an exact token first and then by prefix, checking one dict
+    entry per distinct prefix length, so dispatch costs the same however
+    many routes there are. Text messages go to the command handler for
+    their text, then to the handler of the user's current step, then to
+    ``fallback``.
+    """
+    
+    def __init__(self):
+        self._exact: Dict[str, Handler] = {}
+        self._prefixes: Dict[str, Handler] = {}
+        self._prefix_lengths: List[int] = []
+        self._commands: Dict[str, Handler] = {}
+        self._steps: Dict[str, Handler] = {}
+        self.fallback: Optional[Handler] = None
+    
+    def callback(self, *tokens: str, prefix: bool = False) -> Callable[[Handler], Handler]:
+        """Register a handler for callback data equal to, or starting with, each token"""
+        def register(handler: Handler) -> Handler:
+            for token in tokens:
+                if prefix:
+                    self._prefixes[token] = handler
+                    self._prefix_lengths = sorted({len(p) for p in self._prefixes}, reverse=True)
+                else:
+                    self._exact[token] = handler
+            return handler
+        return register
+    
+    def command(self, *commands: str) -> Callable[[Handler], Handler]:
+        """Register a handler for text messages equal to each command"""
+        def register(handler: Handler) -> Handler:
+            for command in commands:
+                self._commands[command] = handler
+            return handler
+        return register
+    
+    def step(self, *steps: str) -> Callable[[Handler], Handler]:
+        """Register a handler for text messages sent while in each step"""
+        def register(handler: Handler) -> Handler:
+            for step in steps:
+                self._steps[step] = handler
+            return handler
+        return register
+    
+    def otherwise(self, handler: Handler) -> Handler:
+        """Register the handler for updates no other route takes"""
+        self.fallback = handler
+        return handler
+    
+    def match_callback(self, data: str) -> Optional[Tuple[Handler, CallbackData]]:
+        """The handler for callback data and the data split at its token, if any"""
+        handler = self._exact.get(data)
+        if handler is not None:
+            return handler, CallbackData(data, "", data)
+        # Longest first, so a token wins over a shorter one it starts with
+        for length in self._prefix_lengths:
+            handler = self._prefixes.get(data[:length])
+            if handler is not None:
+                return handler, CallbackData(data[:length], data[length:], data)
+        return None
+    
+    def route(self, callback_data: Optional[str], text: str, step: str) -> Tuple[Handler, Optional[CallbackData]]:
+        """The handler for a button press or a text message, and the parsed callback data"""
+        if callback_data is not None:
+            matched = self.match_callback(callback_data)
+            # Buttons without a route lead back to the fallback
+            return matched if matched is not None else (self.fallback, None)
+        return self._commands.get(text) or self._steps.get(step) or self.fallback, None
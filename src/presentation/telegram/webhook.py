@@ -1,5 +1,6 @@
 from fastapi import FastAPI, Request
 import json
+from config import Config
 from src.application.use_cases.user_onboarding import UserOnboardingUseCase
 from src.application.use_cases.get_main_menu import GetMainMenuUseCase
 from src.application.use_cases.create_event import CreateEventUseCase
@@ -7,31 +8,87 @@ from src.application.use_cases.get_events import GetEventsUseCase
 from src.application.use_cases.register_for_event import RegisterForEventUseCase
 from src.application.use_cases.get_my_events import GetMyEventsUseCase
 from src.application.use_cases.unregister_from_event import UnregisterFromEventUseCase
-from src.infrastructure.database.connection import DatabaseConnection
+from src.application.use_cases.search_events import SearchEventsUseCase
+from src.infrastructure.database.archiver import EventArchiver
+from src.infrastructure.database.backup import BackupManager
+from src.infrastructure.database.factory import open_databases
 from src.infrastructure.repositories.sqlite_user_repository import SqliteUserRepository
 from src.infrastructure.repositories.sqlite_user_state_repository import SqliteUserStateRepository
 from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
 from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+from src.infrastructure.repositories.registration_index import RegistrationIndex
+from src.infrastructure.repositories.cached_event_repository import CachedEventRepository
+from src.infrastructure.repositories.cached_user_repository import CachedUserRepository
+from src.infrastructure.repositories.write_behind_user_state_repository import WriteBehindUserStateRepository
+from src.infrastructure.repositories.log_structured_user_state_repository import LogStructuredUserStateRepository
+from src.infrastructure.repositories.unit_of_work import UnitOfWork
 from src.presentation.telegram.handlers.message_handlers import handle_message
 
 
 app = FastAPI()
 
 # Initialize database and repositories
-db_connection = DatabaseConnection()
-user_repository = SqliteUserRepository(db_connection)
-user_state_repository = SqliteUserStateRepository(db_connection)
-event_repository = SqliteEventRepository(db_connection)
-registration_repository = SqliteRegistrationRepository(db_connection)
-
-# Initialize use cases
-user_onboarding_use_case = UserOnboardingUseCase(user_repository, user_state_repository)
-get_main_menu_use_case = GetMainMenuUseCase(user_repository, user_state_repository)
-create_event_use_case = CreateEventUseCase(event_repository, user_repository)
-get_events_use_case = GetEventsUseCase(event_repository)
-register_for_event_use_case = RegisterForEventUseCase(event_repository, registration_repository)
-get_my_events_use_case = GetMyEventsUseCase(event_repository, registration_repository)
-unregister_from_event_use_case = UnregisterFromEventUseCase(event_repository, registration_repository)
+db_connection, user_db = open_databases(Config)
+user_repository = CachedUserRepository(
+    SqliteUserRepository(user_db),
+    max_size=Config.USER_CACHE_SIZE,
+    ttl=Config.USER_CACHE_TTL
+)
+if Config.USER_STATE_BACKEND == "log":
+    user_state_repository = LogStructuredUserStateRepository(
+        Config.USER_STATE_LOG_DIR,
+        fsync=Config.USER_STATE_LOG_FSYNC,
+        compact_bytes=Config.USER_STATE_LOG_COMPACT_BYTES
+    )
+else:
+    user_state_repository = WriteBehindUserStateRepository(
+        SqliteUserStateRepository(user_db),
+        flush_interval=Config.USER_STATE_FLUSH_INTERVAL,
+        max_size=Config.USER_STATE_CACHE_SIZE
+    )
+backup_manager = None
+if Config.BACKUP_DIR:
+    backup_manager = BackupManager(
+        [db_connection] + ([] if user_db is db_connection else user_db.shards),
+        Config.BACKUP_DIR,
+        keep=Config.BACKUP_KEEP,
+        interval=Config.BACKUP_INTERVAL,
+        standby_dir=Config.BACKUP_STANDBY_DIR or None,
+        standby_interval=Config.BACKUP_STANDBY_INTERVAL,
+        pages_per_step=Config.BACKUP_PAGES_PER_STEP,
+        step_pause=Config.BACKUP_STEP_PAUSE_MS / 1000
+    )
+event_repository = CachedEventRepository(SqliteEventRepository(db_connection))
+registration_index = (
+    RegistrationIndex(Config.REGISTRATION_INDEX_MAX_MEMBERS) if Config.REGISTRATION_INDEX_MAX_MEMBERS > 0 else None
+)
+registration_repository = SqliteRegistrationRepository(user_db, registration_index)
+archiver = None
+if Config.ARCHIVE_HORIZON_DAYS > 0:
+    archiver = EventArchiver(
+        db_connection,
+        user_db,
+        horizon_days=Config.ARCHIVE_HORIZON_DAYS,
+        batch_size=Config.ARCHIVE_BATCH_SIZE,
+        interval=Config.ARCHIVE_INTERVAL,
+        on_archive=registration_repository.forget_events
+    )
+
+
+async def handle_update(update_data: dict, unit: UnitOfWork) -> dict:
+    """Handle one update with use cases built over its unit of work"""
+    return await handle_message(
+        update_data,
+        UserOnboardingUseCase(unit.users, unit.user_states),
+        GetMainMenuUseCase(unit.users, unit.user_states),
+        CreateEventUseCase(unit.events, unit.users),
+        GetEventsUseCase(unit.events, page_size=Config.EVENTS_PAGE_SIZE),
+        RegisterForEventUseCase(unit.events, unit.registrations),
+        GetMyEventsUseCase(unit.events, unit.registrations),
+        UnregisterFromEventUseCase(unit.events, unit.registrations),
+        unit.user_states,
+        SearchEventsUseCase(unit.events, limit=Config.SEARCH_RESULTS_LIMIT)
+    )
 
 
 @app.post("/webhook")
@@ -41,18 +98,9 @@ async def webhook_handler(request: Request):
         # Get JSON data from request
         json_data = await request.json()
         
-        # Process the update
-        response = await handle_message(
-            json_data,
-            user_onboarding_use_case,
-            get_main_menu_use_case,
-            create_event_use_case,
-            get_events_use_case,
-            register_for_event_use_case,
-            get_my_events_use_case,
-            unregister_from_event_use_case,
-            user_state_repository
-        )
+        # Process the update; its state and user writes are committed together at the end
+        async with UnitOfWork(user_repository, user_state_repository, event_repository, registration_repository) as unit:
+            response = await handle_update(json_data, unit)
         
         return {"status": "ok", "response": response}
     except Exception as e:
@@ -60,7 +108,59 @@ async def webhook_handler(request: Request):
         return {"status": "error", "message": str(e)}
 
 
+@app.on_event("startup")
+async def startup():
+    """Start the user state store, recount seats, warm the registration index and start the maintenance schedules"""
+    await user_state_repository.start()
+    await registration_repository.recount_seats()
+    await registration_repository.warm_index()
+    await registration_repository.start(Config.REGISTRATION_EXTERNAL_WRITE_CHECK_INTERVAL)
+    if archiver is not None:
+        await archiver.start()
+    if backup_manager is not None:
+        await backup_manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Drain pending database work and close the connection"""
+    if backup_manager is not None:
+        await backup_manager.stop()
+    if archiver is not None:
+        await archiver.stop()
+    await user_state_repository.stop()
+    await registration_repository.stop()
+    if user_db is not db_connection:
+        user_db.close()
+    db_connection.close()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {"status": "running", "message": "Telegram Bot Webhook is active"}
\ No newline at end of file
+    return {"status": "running", "message": "Telegram Bot Webhook is active"}
+
+
+@app.get("/metrics/registrations")
+async def registration_metrics():
+    """Registration index hit rate and size, and seat admission decisions"""
+    admission = registration_repository.admission.stats
+    if registration_index is None:
+        return {"enabled": False, "admission": admission}
+    return {"enabled": True, **registration_index.stats, "admission": admission}
+
+
+@app.get("/metrics/archive")
+async def archive_metrics():
+    """Events and registrations moved to the archive tables"""
+    if archiver is None:
+        return {"enabled": False}
+    return {"enabled": True, **archiver.stats}
+
+
+@app.get("/metrics/backup")
+async def backup_metrics():
+    """Backup duration and throughput of the last snapshot and standby refresh"""
+    if backup_manager is None:
+        return {"enabled": False}
+    return {"enabled": True, **backup_manager.stats}
\ No newline at end of file
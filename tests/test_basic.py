@@ -63,19 +63,111 @@ async def test_user_state_entity():
     """Test user state entity"""
     user_state = UserState(
         user_id="123456789",
-        current_step="enter_first_name",
-        context='{"temp": "data"}'
+        current_step="enter_last_name",
+        context='{"first_name": "Иван"}'
     )
     
     assert user_state.user_id == "123456789"
-    assert user_state.current_step == "enter_first_name"
-    assert user_state.context_data == {"temp": "data"}
+    assert user_state.current_step == "enter_last_name"
+    assert user_state.context_data == {"first_name": "Иван"}
     
     # Test updating context
-    new_state = user_state.update_context({"new": "value"})
-    assert new_state.context_data == {"temp": "data", "new": "value"}
+    new_state = user_state.update_context({"last_name": "Иванов"})
+    assert new_state.context_data == {"first_name": "Иван", "last_name": "Иванов"}
 
 
+@pytest.mark.asyncio
+async def test_slotted_entities_decode_lazily():
+    """Test slotted entities and the trusted row constructor"""
+    from dataclasses import FrozenInstanceError
+    from datetime import datetime
+    from src.domain.entities.registration import Registration
+    from src.domain.entities.timestamps import epoch_of, to_epoch
+    
+    registration = Registration.from_row("123456789", "event-1", 1700000000)
+    assert not hasattr(registration, "__dict__")
+    assert epoch_of(registration, "created_at") == 1700000000
+    assert registration.created_at == datetime.fromtimestamp(1700000000)
+    assert epoch_of(registration, "created_at") == 1700000000
+    with pytest.raises(FrozenInstanceError):
+        registration.event_id = "event-2"
+    
+    # Stored rows are trusted: from_row skips the __post_init__ validation
+    user = User.from_row("123456789", "", "", 1800, False)
+    assert user.birth_year == 1800
+    
+    state = UserState.from_row("123456789", "main_menu", '{"first_name": "Иван"}', to_epoch(datetime(2024, 1, 1)))
+    assert state.context is state.context
+    assert state.updated_at == datetime(2024, 1, 1)
+    assert state == UserState("123456789", "main_menu", '{"first_name": "Иван"}', datetime(2024, 1, 1))
+
+
+@pytest.mark.asyncio
+async def test_conversation_context_encoding():
+    """Test the typed context: versioned encoding, legacy forms and per-step schema"""
+    from src.domain.entities.conversation_context import ConversationContext
+    from src.domain.entities.user_state import stored_context
+    
+    context = ConversationContext(first_name="Иван")
+    assert context.encode() == '[1,"Иван"]'
+    assert ConversationContext.decode(context.encode()) == context
+    assert ConversationContext.decode("{'event_name': 'Meetup'}").event_name == "Meetup"
+    # Unreadable contexts start the conversation over instead of failing it
+    assert ConversationContext.decode('[99,"Иван"]') == ConversationContext()
+    assert ConversationContext.decode("{'event_name': ") == ConversationContext()
+    assert ConversationContext.decode("42") == ConversationContext()
+    
+    # Each step declares the answers it relies on
+    with pytest.raises(ValueError):
+        UserState(user_id="1", current_step="enter_birth_year", context=context)
+    state = UserState(user_id="1", current_step="enter_birth_year", context=context.update(last_name="Иванов"))
+    assert stored_context(state) == '[1,"Иван","Иванов"]'
+    
+    # A stored context that is never read is saved back without re-encoding
+    legacy = UserState.from_row("1", "enter_last_name", '{"first_name": "Иван"}', None)
+    assert stored_context(legacy) == '{"first_name": "Иван"}'
+    assert legacy.context.first_name == "Иван"
+    assert stored_context(legacy) == '[1,"Иван"]'
+
+
+@pytest.mark.asyncio
+async def test_conversation_state_machine():
+    """Test the declared steps, transitions, validators and context schemas"""
+    from src.domain.entities.conversation import STEPS, check_transition, validate_input
+    from src.domain.entities.conversation_context import ConversationContext
+    
+    # Every declared step is a valid state with the context it requires,
+    # and no context counts as an empty one
+    for step in STEPS:
+        context = ConversationContext(**{name: "x" for name in step.requires})
+        UserState(user_id="1", current_step=step.name, context=context)
+        if step.requires:
+            with pytest.raises(ValueError):
+                UserState(user_id="1", current_step=step.name)
+        else:
+            UserState(user_id="1", current_step=step.name)
+    with pytest.raises(ValueError):
+        UserState(user_id="1", current_step="no_such_step")
+    
+    # Flows move one step at a time; menus are reachable from anywhere
+    check_transition("enter_first_name", "enter_last_name")
+    check_transition("creating_event_date", "browse_events")
+    check_transition("no_longer_declared", "main_menu")
+    with pytest.raises(ValueError):
+        check_transition("enter_first_name", "enter_birth_year")
+    with pytest.raises(ValueError):
+        UserState.transition("admin_menu", "1", "creating_event_date", ConversationContext(event_name="Meetup"))
+    state = UserState.transition("creating_event_name", "1", "creating_event_date", ConversationContext(event_name="Meetup"))
+    assert state.context.event_name == "Meetup"
+    with pytest.raises(ValueError):
+        UserState.transition("creating_event_name", "1", "creating_event_date", ConversationContext())
+    
+    assert validate_input("enter_first_name", "  ") == "Пожалуйста, введите значение."
+    assert validate_input("enter_first_name", "Иван1") == "Имя должно содержать только буквы."
+    assert validate_input("enter_birth_year", "1800") == "Год рождения должен быть между 1900 и 2024."
+    assert validate_input("enter_birth_year", "1990") is None
+    assert validate_input("creating_event_name", "x" * 101) is not None
+
 @pytest.mark.asyncio
 async def test_user_onboarding_use_case_execute():
     """Test user onboarding use case execute method with mocked repositories"""
@@ -135,5 +227,284 @@ async def test_database_connection():
     assert result is not None
 
 
+@pytest.mark.asyncio
+async def test_database_connection_runs_off_event_loop():
+    """Test that async queries run on the database thread, not the event loop"""
+    import threading
+    db = DatabaseConnection(":memory:")
+    
+    thread_name = await db.run(lambda conn: threading.current_thread().name)
+    assert thread_name != threading.current_thread().name
+    
+    rowcount = await db.execute(
+        "INSERT INTO users (user_id, first_name, last_name, birth_year) VALUES (?, ?, ?, ?)",
+        ("1", "Иван", "Иванов", 1990)
+    )
+    assert rowcount == 1
+    
+    row = await db.fetch_one("SELECT first_name FROM users WHERE user_id = ?", ("1",))
+    assert row["first_name"] == "Иван"
+    
+    rows = await db.fetch_all("SELECT * FROM users")
+    assert len(rows) == 1
+    
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_file_database_uses_wal_and_reader_pool(tmp_path):
+    """Test that file databases use WAL and readers see committed writes"""
+    db = DatabaseConnection(str(tmp_path / "bot.db"), read_pool_size=2, busy_timeout=2000)
+    
+    journal_mode = db.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "wal"
+    assert db.uses_read_pool is True
+    
+    await db.execute(
+        "INSERT INTO users (user_id, first_name, last_name, birth_year) VALUES (?, ?, ?, ?)",
+        ("1", "Иван", "Иванов", 1990)
+    )
+    row = await db.fetch_one("SELECT first_name FROM users WHERE user_id = ?", ("1",))
+    assert row["first_name"] == "Иван"
+    
+    # Reader connections are read-only and carry the configured busy timeout
+    timeout = await db.run_read(lambda conn: conn.execute("PRAGMA busy_timeout").fetchone()[0])
+    assert timeout == 2000
+    with pytest.raises(Exception):
+        await db.run_read(lambda conn: conn.execute("DELETE FROM users"))
+    
+    db.close()
+
+
+def test_database_connection_rejects_unknown_pragma_values():
+    """Test that journal and synchronous modes are checked before reaching a PRAGMA"""
+    assert DatabaseConnection(":memory:", journal_mode="wal", synchronous="full").synchronous == "FULL"
+    with pytest.raises(ValueError):
+        DatabaseConnection(":memory:", journal_mode="WAL; DROP TABLE users")
+    with pytest.raises(ValueError):
+        DatabaseConnection(":memory:", synchronous="SOMETIMES")
+
+
+@pytest.mark.asyncio
+async def test_group_commit_coalesces_writes():
+    """Test that concurrent grouped writes share commits and fail independently"""
+    import sqlite3
+    db = DatabaseConnection(":memory:", group_commit_window_ms=20, group_commit_max_batch=100)
+    insert = "INSERT INTO registrations (user_id, event_id, created_at) VALUES (?, ?, ?)"
+    
+    results = await asyncio.gather(
+        *(db.execute_grouped(insert, (str(i), "event", "2030-01-01T00:00:00")) for i in range(50)),
+        db.execute_grouped(insert, ("0", "event", "2030-01-01T00:00:00")),
+        return_exceptions=True
+    )
+    
+    assert results[:50] == [1] * 50
+    assert isinstance(results[50], sqlite3.IntegrityError)
+    assert db.group_commit.writes == 51
+    assert db.group_commit.batches < 51
+    
+    rows = await db.fetch_all("SELECT * FROM registrations")
+    assert len(rows) == 50
+    # Grouped callers are promised durability, so commits must be synced
+    assert db.get_connection().execute("PRAGMA synchronous").fetchone()[0] == 2
+    
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_group_commit_window_does_not_hold_the_writer_thread():
+    """Test that other writes run while a grouped batch is still being collected"""
+    db = DatabaseConnection(":memory:", group_commit_window_ms=500)
+    insert = "INSERT INTO registrations (user_id, event_id, created_at) VALUES (?, ?, ?)"
+    
+    grouped = asyncio.ensure_future(db.execute_grouped(insert, ("1", "event", 0)))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(db.execute(insert, ("2", "event", 0)), timeout=0.2)
+    assert not grouped.done()
+    assert await grouped == 1
+    
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_schema_migrations(tmp_path):
+    """Test that migrations are versioned, idempotent and add the indexes"""
+    from src.infrastructure.database.migrations import MIGRATIONS, apply_migrations, get_schema_version
+    db_path = str(tmp_path / "bot.db")
+    db = DatabaseConnection(db_path)
+    conn = db.get_connection()
+    
+    assert get_schema_version(conn) == MIGRATIONS[-1].version
+    assert apply_migrations(conn) == []  # Nothing left to apply
+    
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM registrations WHERE event_id = ?", ("e",)
+    ).fetchall()
+    assert "idx_registrations_event_id" in " ".join(row[3] for row in plan)
+    
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM events WHERE date > ? ORDER BY date", ("2030",)
+    ).fetchall()
+    assert "idx_events_date_event_id" in " ".join(row[3] for row in plan)
+    
+    db.close()
+    
+    # Reopening an up-to-date database applies nothing
+    db = DatabaseConnection(db_path)
+    versions = db.get_connection().execute("SELECT version FROM schema_version").fetchall()
+    assert [row[0] for row in versions] == [m.version for m in MIGRATIONS]
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_epoch_migration_converts_iso_rows(tmp_path):
+    """Test that ISO timestamps from older databases become epoch integers"""
+    import sqlite3
+    from datetime import datetime
+    from src.infrastructure.database.migrations import MIGRATIONS, apply_migrations
+    db_path = str(tmp_path / "bot.db")
+    
+    # Build a database at the schema version before epoch timestamps
+    conn = sqlite3.connect(db_path)
+    epoch_version = next(m.version for m in MIGRATIONS if m.name == "epoch_timestamps")
+    apply_migrations(conn, [m for m in MIGRATIONS if m.version < epoch_version])
+    event_date = datetime(2030, 5, 1, 18, 30)
+    conn.execute(
+        "INSERT INTO events (event_id, name, date, created_by, created_at) VALUES (?, ?, ?, ?, ?)",
+        ("e1", "Concert", event_date.isoformat(), "1", datetime(2030, 1, 1).isoformat())
+    )
+    conn.commit()
+    conn.close()
+    
+    db = DatabaseConnection(db_path)
+    row = db.get_connection().execute("SELECT date, created_at FROM events").fetchone()
+    assert row["date"] == int(event_date.timestamp())
+    
+    from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+    event = await SqliteEventRepository(db).get_event_by_id("e1")
+    assert event.date == event_date
+    assert event.created_at == datetime(2030, 1, 1)
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_sharded_database_routes_by_user(tmp_path):
+    """Test that user data is spread over shards while events stay in the catalog"""
+    from datetime import datetime, timedelta
+    from src.domain.entities.event import Event
+    from src.domain.entities.registration import RegistrationOutcome
+    from src.infrastructure.database.sharding import ShardedDatabase
+    from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+    from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+    catalog = DatabaseConnection(str(tmp_path / "bot.db"))
+    user_db = ShardedDatabase.open(str(tmp_path / "bot.db"), 4, catalog=catalog)
+    user_repo = SqliteUserRepository(user_db)
+    state_repo = SqliteUserStateRepository(user_db)
+    registration_repo = SqliteRegistrationRepository(user_db)
+    
+    event = Event.create("Концерт", datetime.now() + timedelta(days=1), "admin")
+    await SqliteEventRepository(catalog).create_event(event)
+    
+    user_ids = [str(i) for i in range(20)]
+    for user_id in user_ids:
+        await user_repo.save_user(User(user_id=user_id, first_name="Иван", last_name="Иванов", birth_year=1990))
+        result = await registration_repo.try_register(user_id, event.event_id, datetime.now())
+        assert result.outcome == RegistrationOutcome.REGISTERED
+    await state_repo.save_user_states([UserState(user_id=user_id, current_step="main_menu") for user_id in user_ids])
+    
+    # Every user is found through routing, and the rows really are spread out
+    assert (await user_repo.get_user("7")).first_name == "Иван"
+    assert (await state_repo.get_user_state("7")).current_step == "main_menu"
+    counts = [
+        shard.get_connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        for shard in user_db.shards
+    ]
+    assert sum(counts) == 20 and all(counts)
+    
+    # Cross-shard reads are gathered from every shard; joins see catalog events
+    assert len(await registration_repo.get_event_registrations(event.event_id)) == 20
+    assert [e.event_id for e in await registration_repo.get_user_upcoming_events("7", datetime.now())] == [event.event_id]
+    result = await registration_repo.try_register("7", "missing", datetime.now())
+    assert result.outcome == RegistrationOutcome.EVENT_NOT_FOUND
+    
+    user_db.close()
+    catalog.close()
+
+
+@pytest.mark.asyncio
+async def test_shard_count_cannot_change_under_existing_data(tmp_path):
+    """Test that reopening with another shard count is refused instead of hiding users"""
+    from src.infrastructure.database.sharding import ShardedDatabase, check_shard_count
+    db_path = str(tmp_path / "bot.db")
+    catalog = DatabaseConnection(db_path)
+    ShardedDatabase.open(db_path, 4, catalog=catalog).close()
+    ShardedDatabase.open(db_path, 4, catalog=catalog).close()
+    with pytest.raises(ValueError, match="DATABASE_SHARDS=4"):
+        ShardedDatabase.open(db_path, 2, catalog=catalog)
+    with pytest.raises(ValueError):
+        check_shard_count(catalog, 1)
+    catalog.close()
+    
+    # An unsharded database from before the count was recorded
+    legacy = DatabaseConnection(str(tmp_path / "legacy.db"))
+    await SqliteUserRepository(legacy).save_user(User(user_id="1", first_name="Иван", last_name="Иванов", birth_year=1990))
+    with pytest.raises(ValueError, match="DATABASE_SHARDS=1"):
+        ShardedDatabase.open(str(tmp_path / "legacy.db"), 4, catalog=legacy)
+    legacy.close()
+
+
+@pytest.mark.asyncio
+async def test_online_backup_while_writing(tmp_path):
+    """Test that snapshots are consistent, rotated and taken while writes continue"""
+    import sqlite3
+    from src.infrastructure.database.backup import BackupManager
+    db = DatabaseConnection(str(tmp_path / "bot.db"))
+    await db.run_in_transaction(lambda conn: conn.executemany(
+        "INSERT INTO users (user_id, first_name, last_name, birth_year) VALUES (?, ?, ?, ?)",
+        [(str(i), "Иван" * 20, "Иванов" * 20, 1990) for i in range(5000)]
+    ))
+    backups = BackupManager(
+        [db], str(tmp_path / "backups"), keep=2,
+        standby_dir=str(tmp_path / "standby"), pages_per_step=8, step_pause=0
+    )
+    
+    async def write_more():
+        for i in range(5000, 5050):
+            await db.execute(
+                "INSERT INTO users (user_id, first_name, last_name, birth_year) VALUES (?, ?, ?, ?)",
+                (str(i), "Пётр", "Петров", 1990)
+            )
+    
+    (copy,), _ = await asyncio.gather(backups.snapshot(), write_more())
+    assert copy.pages > 8 and copy.pages_per_second > 0
+    snapshot = sqlite3.connect(copy.path)
+    assert snapshot.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert 5000 <= snapshot.execute("SELECT COUNT(*) FROM users").fetchone()[0] <= 5050
+    snapshot.close()
+    
+    (standby,) = await backups.refresh_standby()
+    standby_db = sqlite3.connect(standby.path)
+    assert standby_db.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 5050
+    standby_db.close()
+    
+    # Only the newest snapshots are kept
+    for name in ("bot-20000101-000000.db", "bot-20000102-000000.db"):
+        (tmp_path / "backups" / name).write_bytes(b"")
+    await backups.snapshot()
+    assert len(list((tmp_path / "backups").iterdir())) == 2
+    assert backups.stats["snapshots"] == 2
+    
+    # The copy pauses between steps
+    steps = -(-copy.pages // 8)
+    paced = BackupManager([db], str(tmp_path / "paced"), pages_per_step=8, step_pause=0.002)
+    (paced_copy,) = await paced.snapshot()
+    assert paced_copy.duration >= (steps - 1) * 0.002
+    
+    with pytest.raises(ValueError):
+        BackupManager([db], str(tmp_path / "backups"), keep=0)
+    
+    db.close()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -2,8 +2,8 @@ import pytest
 import asyncio
 from datetime import datetime, timedelta
 from src.domain.entities.event import Event
-from src.domain.entities.registration import Registration
-from src.domain.repositories.event_repository import EventRepository
+from src.domain.entities.registration import Registration, RegistrationOutcome
+from src.domain.repositories.event_repository import EventCursor, EventRepository
 from src.domain.repositories.registration_repository import RegistrationRepository
 from src.domain.repositories.user_repository import UserRepository
 from src.application.use_cases.create_event import CreateEventUseCase
@@ -64,7 +64,7 @@ class TestEventManagementPhase3:
         
         # Create event
         future_date = datetime.now() + timedelta(days=1)
-        result = use_cases["create_event"].execute(
+        result = await use_cases["create_event"].execute(
             user_id="12345",
             event_name="Test Event",
             event_date_str=future_date.isoformat()
@@ -75,7 +75,7 @@ class TestEventManagementPhase3:
         assert result["event_id"] is not None
         
         # Verify event was created in DB
-        event = repositories["event_repo"].get_event_by_id(result["event_id"])
+        event = await repositories["event_repo"].get_event_by_id(result["event_id"])
         assert event is not None
         assert event.name == "Test Event"
         assert event.created_by == "12345"
@@ -88,7 +88,7 @@ class TestEventManagementPhase3:
         
         # Try to create event as non-admin
         future_date = datetime.now() + timedelta(days=1)
-        result = use_cases["create_event"].execute(
+        result = await use_cases["create_event"].execute(
             user_id="54321",
             event_name="Test Event",
             event_date_str=future_date.isoformat()
@@ -106,10 +106,10 @@ class TestEventManagementPhase3:
         future_date = datetime.now() + timedelta(days=1)
         event = Event.create("Test Event", future_date, "12345")
         event_repo = repositories["event_repo"]
-        created_event = event_repo.create_event(event)
+        created_event = await event_repo.create_event(event)
         
         # Register user for event
-        result = use_cases["register_for_event"].execute(
+        result = await use_cases["register_for_event"].execute(
             user_id="11111",
             event_id=created_event.event_id
         )
@@ -119,7 +119,7 @@ class TestEventManagementPhase3:
         
         # Verify registration in DB
         registration_repo = repositories["registration_repo"]
-        assert registration_repo.is_registered("11111", created_event.event_id) is True
+        assert await registration_repo.is_registered("11111", created_event.event_id) is True
     
     async def test_duplicate_registration(self, repositories, use_cases):
         """Phase 3 test: Cannot register twice for same event"""
@@ -130,17 +130,17 @@ class TestEventManagementPhase3:
         future_date = datetime.now() + timedelta(days=1)
         event = Event.create("Test Event", future_date, "12345")
         event_repo = repositories["event_repo"]
-        created_event = event_repo.create_event(event)
+        created_event = await event_repo.create_event(event)
         
         # First registration - should succeed
-        result1 = use_cases["register_for_event"].execute(
+        result1 = await use_cases["register_for_event"].execute(
             user_id="22222",
             event_id=created_event.event_id
         )
         assert result1["success"] is True
         
         # Second registration - should fail
-        result2 = use_cases["register_for_event"].execute(
+        result2 = await use_cases["register_for_event"].execute(
             user_id="22222",
             event_id=created_event.event_id
         )
@@ -153,19 +153,87 @@ class TestEventManagementPhase3:
         future_date = datetime.now() + timedelta(days=1)
         event = Event.create("Future Event", future_date, "12345")
         event_repo = repositories["event_repo"]
-        event_repo.create_event(event)
+        await event_repo.create_event(event)
         
         # Create a past event (should not appear)
         past_date = datetime.now() - timedelta(days=1)
         past_event = Event.create("Past Event", past_date, "12345")
-        event_repo.create_event(past_event)
+        await event_repo.create_event(past_event)
         
         # Get events
-        result = use_cases["get_events"].execute(user_id="99999")
+        result = await use_cases["get_events"].execute(user_id="99999")
         
         # Should only contain the future event
         assert len(result["events"]) == 1
         assert result["events"][0].name == "Future Event"
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_double_tap_registers_once(self, repositories, use_cases):
+        """Phase 3 test: Racing register taps yield one registration and no error"""
+        event_repo = repositories["event_repo"]
+        created_event = await event_repo.create_event(
+            Event.create("Hot Event", datetime.now() + timedelta(days=1), "12345")
+        )
+        
+        results = await asyncio.gather(*(
+            use_cases["register_for_event"].execute(user_id="66666", event_id=created_event.event_id)
+            for _ in range(5)
+        ))
+        
+        assert sum(result["success"] for result in results) == 1
+        assert sum("already registered" in result["message"] for result in results) == 4
+        registrations = await repositories["registration_repo"].get_event_registrations(created_event.event_id)
+        assert len(registrations) == 1
+    
+    @pytest.mark.asyncio
+    async def test_try_register_outcomes(self, repositories):
+        """Phase 3 test: Atomic register/unregister report typed outcomes"""
+        from src.domain.entities.registration import RegistrationOutcome
+        event_repo = repositories["event_repo"]
+        registration_repo = repositories["registration_repo"]
+        past_event = await event_repo.create_event(
+            Event.create("Past Event", datetime.now() - timedelta(days=1), "12345")
+        )
+        
+        result = await registration_repo.try_register("77777", past_event.event_id, datetime.now())
+        assert result.outcome == RegistrationOutcome.EVENT_IN_PAST
+        result = await registration_repo.try_register("77777", "missing", datetime.now())
+        assert result.outcome == RegistrationOutcome.EVENT_NOT_FOUND
+        result = await registration_repo.try_unregister("77777", past_event.event_id)
+        assert result.outcome == RegistrationOutcome.NOT_REGISTERED
+        assert result.event_name == "Past Event"
+    
+    @pytest.mark.asyncio
+    async def test_get_events_keyset_pagination(self, repositories):
+        """Browsing pages through events with (date, event_id) cursors"""
+        event_repo = repositories["event_repo"]
+        base_date = datetime.now() + timedelta(days=1)
+        for i in range(7):
+            await event_repo.create_event(
+                Event.create(f"Event {i}", base_date + timedelta(hours=i), "12345")
+            )
+        use_case = GetEventsUseCase(event_repo, page_size=3)
+        
+        first = await use_case.execute(user_id="99999")
+        assert [e.name for e in first["events"]] == ["Event 0", "Event 1", "Event 2"]
+        navigation = [button["callback_data"] for button in first["keyboard"][-2]]
+        assert len(navigation) == 1 and ":n:" in navigation[0]
+        assert all(len(data.encode()) <= 64 for data in navigation)
+        
+        after, before = GetEventsUseCase.parse_page_callback(navigation[0])
+        second = await use_case.execute(user_id="99999", after=after, before=before)
+        assert [e.name for e in second["events"]] == ["Event 3", "Event 4", "Event 5"]
+        prev_data, next_data = [button["callback_data"] for button in second["keyboard"][-2]]
+        
+        after, before = GetEventsUseCase.parse_page_callback(next_data)
+        last = await use_case.execute(user_id="99999", after=after, before=before)
+        assert [e.name for e in last["events"]] == ["Event 6"]
+        
+        after, before = GetEventsUseCase.parse_page_callback(prev_data)
+        back = await use_case.execute(user_id="99999", after=after, before=before)
+        assert [e.name for e in back["events"]] == ["Event 0", "Event 1", "Event 2"]
+        
+        assert GetEventsUseCase.parse_page_callback("browse_events") == (None, None)
 
 
 class TestEventManagementPhase4:
@@ -227,21 +295,21 @@ class TestEventManagementPhase4:
         event1 = Event.create("Event 1", future_date, "12345")
         event2 = Event.create("Event 2", future_date, "12345")
         event_repo = repositories["event_repo"]
-        created_event1 = event_repo.create_event(event1)
-        created_event2 = event_repo.create_event(event2)
+        created_event1 = await event_repo.create_event(event1)
+        created_event2 = await event_repo.create_event(event2)
         
         # Register user for both events
-        use_cases["register_for_event"].execute(
+        await use_cases["register_for_event"].execute(
             user_id="33333",
             event_id=created_event1.event_id
         )
-        use_cases["register_for_event"].execute(
+        await use_cases["register_for_event"].execute(
             user_id="33333",
             event_id=created_event2.event_id
         )
         
         # Get user's events
-        result = use_cases["get_my_events"].execute(user_id="33333")
+        result = await use_cases["get_my_events"].execute(user_id="33333")
         
         assert len(result["events"]) == 2
         event_names = [event.name for event in result["events"]]
@@ -257,20 +325,20 @@ class TestEventManagementPhase4:
         future_date = datetime.now() + timedelta(days=1)
         event = Event.create("Test Event", future_date, "12345")
         event_repo = repositories["event_repo"]
-        created_event = event_repo.create_event(event)
+        created_event = await event_repo.create_event(event)
         
         # Register user for event
-        use_cases["register_for_event"].execute(
+        await use_cases["register_for_event"].execute(
             user_id="44444",
             event_id=created_event.event_id
         )
         
         # Verify registration exists
         registration_repo = repositories["registration_repo"]
-        assert registration_repo.is_registered("44444", created_event.event_id) is True
+        assert await registration_repo.is_registered("44444", created_event.event_id) is True
         
         # Unregister from event
-        result = use_cases["unregister_from_event"].execute(
+        result = await use_cases["unregister_from_event"].execute(
             user_id="44444",
             event_id=created_event.event_id
         )
@@ -279,11 +347,381 @@ class TestEventManagementPhase4:
         assert "unregistered from event" in result["message"]
         
         # Verify registration is removed
-        assert registration_repo.is_registered("44444", created_event.event_id) is False
+        assert await registration_repo.is_registered("44444", created_event.event_id) is False
         
         # Try to get user's events - should be empty
-        my_events_result = use_cases["get_my_events"].execute(user_id="44444")
+        my_events_result = await use_cases["get_my_events"].execute(user_id="44444")
         assert len(my_events_result["events"]) == 0
+    
+    
+    @pytest.mark.asyncio
+    async def test_upcoming_events_use_one_query(self, repositories, use_cases):
+        """My Events reads upcoming events with a single joined query"""
+        event_repo = repositories["event_repo"]
+        registration_repo = repositories["registration_repo"]
+        
+        future_event = await event_repo.create_event(
+            Event.create("Future", datetime.now() + timedelta(days=1), "12345")
+        )
+        past_event = await event_repo.create_event(
+            Event.create("Past", datetime.now() - timedelta(days=1), "12345")
+        )
+        for event in (future_event, past_event):
+            await registration_repo.register_user(Registration.create("55555", event.event_id))
+        
+        upcoming = await registration_repo.get_user_upcoming_events("55555", datetime.now())
+        assert [event.name for event in upcoming] == ["Future"]
+        assert await registration_repo.get_user_upcoming_events("55555", datetime.now(), limit=0) == []
+        
+        batch = await event_repo.get_events_by_ids([past_event.event_id, future_event.event_id, "missing"])
+        assert [event.name for event in batch] == ["Past", "Future"]
+        
+        result = await use_cases["get_my_events"].execute(user_id="55555")
+        assert [event.name for event in result["events"]] == ["Future"]
+    
+    @pytest.mark.asyncio
+    async def test_events_by_ids_are_in_date_order_across_chunks(self, repositories):
+        """More IDs than fit in one query still come back in date order"""
+        event_repo = repositories["event_repo"]
+        start = datetime.now() + timedelta(days=1)
+        events = [Event.create(f"Event {i}", start + timedelta(minutes=i), "12345") for i in range(1200)]
+        await event_repo.import_events(events)
+        
+        # Latest first, so every 500-ID chunk holds later events than the next
+        batch = await event_repo.get_events_by_ids([event.event_id for event in reversed(events)])
+        assert [event.name for event in batch] == [event.name for event in events]
+
+
+
+class TestEventCatalogCache:
+    """Future-event catalog cache around the event repository"""
+    
+    @pytest.fixture
+    def db_connection(self):
+        connection = DatabaseConnection(":memory:")
+        yield connection
+        connection.close()
+    
+    @pytest.mark.asyncio
+    async def test_browse_reads_hit_cache_and_writes_update_it(self, db_connection):
+        """Browse reads are served from memory and writes keep them exact"""
+        from src.infrastructure.repositories.cached_event_repository import CachedEventRepository
+        event_repo = CachedEventRepository(SqliteEventRepository(db_connection))
+        first = await event_repo.create_event(
+            Event.create("First", datetime.now() + timedelta(days=2), "12345")
+        )
+        
+        assert [e.name for e in await event_repo.get_future_events()] == ["First"]
+        assert [e.name for e in await event_repo.get_future_events()] == ["First"]
+        assert event_repo.stats["misses"] == 1  # Only the initial load
+        
+        second = await event_repo.create_event(
+            Event.create("Second", datetime.now() + timedelta(days=1), "12345")
+        )
+        assert [e.name for e in await event_repo.get_future_events()] == ["Second", "First"]
+        
+        page = await event_repo.get_future_events_page(1, after=EventCursor.of(second))
+        assert [e.name for e in page] == ["First"]
+        
+        await event_repo.delete_event(second.event_id)
+        assert [e.name for e in await event_repo.get_future_events()] == ["First"]
+        assert (await event_repo.get_event_by_id(first.event_id)).name == "First"
+        assert event_repo.stats["hits"] >= 4
+    
+    @pytest.mark.asyncio
+    async def test_events_expire_when_they_start(self, db_connection):
+        """Events leave the cached catalog exactly when their start time passes"""
+        from src.infrastructure.repositories.cached_event_repository import CachedEventRepository
+        now = [datetime.now().timestamp()]
+        event_repo = CachedEventRepository(SqliteEventRepository(db_connection), clock=lambda: now[0])
+        soon = await event_repo.create_event(
+            Event.create("Soon", datetime.now() + timedelta(minutes=5), "12345")
+        )
+        await event_repo.create_event(
+            Event.create("Later", datetime.now() + timedelta(days=1), "12345")
+        )
+        assert len(await event_repo.get_future_events()) == 2
+        
+        now[0] = soon.date.timestamp() + 1
+        assert [e.name for e in await event_repo.get_future_events()] == ["Later"]
+
+
+class TestStreamingIterators:
+    """Iterator variants that read large result sets in fetchmany batches"""
+    
+    @pytest.mark.asyncio
+    async def test_iterators_stream_in_order_across_shards(self, tmp_path):
+        """Registrations stream in registration order even when spread over shards"""
+        from src.infrastructure.database.sharding import ShardedDatabase
+        catalog = DatabaseConnection(str(tmp_path / "bot.db"))
+        user_db = ShardedDatabase.open(str(tmp_path / "bot.db"), 3, catalog=catalog)
+        event_repo = SqliteEventRepository(catalog)
+        registration_repo = SqliteRegistrationRepository(user_db)
+        
+        now = datetime.now()
+        events = [Event.create(f"Event {i}", now + timedelta(days=i - 2), "12345") for i in range(5)]
+        await event_repo.import_events(events)
+        start = now - timedelta(days=1)
+        await registration_repo.import_registrations(
+            Registration(user_id=str(i), event_id=events[3].event_id, created_at=start + timedelta(seconds=i))
+            for i in range(250)
+        )
+        
+        future = [event.name async for event in event_repo.iter_future_events(batch_size=2)]
+        assert future == ["Event 3", "Event 4"]
+        
+        attendees = [r.user_id async for r in registration_repo.iter_event_registrations(events[3].event_id, batch_size=7)]
+        assert attendees == [str(i) for i in range(250)]
+        assert [r.event_id async for r in registration_repo.iter_user_registrations("42")] == [events[3].event_id]
+        assert len([r async for r in registration_repo.iter_all_registrations(batch_size=10)]) == 250
+        
+        user_db.close()
+        catalog.close()
+
+
+class TestRegistrationIndex:
+    """Membership checks and counts served from the in-memory index"""
+    
+    @pytest.mark.asyncio
+    async def test_index_tracks_writes_across_shards(self, tmp_path):
+        """The index is warmed at startup, kept in sync by writes and agrees with the database"""
+        from src.infrastructure.database.sharding import ShardedDatabase
+        from src.infrastructure.repositories.registration_index import RegistrationIndex
+        catalog = DatabaseConnection(str(tmp_path / "bot.db"))
+        user_db = ShardedDatabase.open(str(tmp_path / "bot.db"), 2, catalog=catalog)
+        event_repo = SqliteEventRepository(catalog)
+        index = RegistrationIndex()
+        registration_repo = SqliteRegistrationRepository(user_db, index)
+        plain_repo = SqliteRegistrationRepository(user_db)
+        
+        now = datetime.now()
+        past = Event.create("Past", now - timedelta(days=1), "12345")
+        future = Event.create("Future", now + timedelta(days=1), "12345")
+        await event_repo.import_events([past, future])
+        await plain_repo.import_registrations(
+            Registration(user_id=str(i), event_id=event.event_id, created_at=now)
+            for event in (past, future) for i in range(10)
+        )
+        
+        assert await registration_repo.warm_index() == 1
+        assert await registration_repo.count_event_registrations(future.event_id) == 10
+        assert await registration_repo.is_registered("3", future.event_id)
+        
+        result = await registration_repo.try_register("3", future.event_id, now)
+        assert result.outcome == RegistrationOutcome.ALREADY_REGISTERED
+        result = await registration_repo.try_register("user-x", future.event_id, now)
+        assert result.outcome == RegistrationOutcome.REGISTERED
+        await registration_repo.try_unregister("4", future.event_id)
+        
+        assert await registration_repo.is_registered("user-x", future.event_id)
+        assert not await registration_repo.is_registered("4", future.event_id)
+        assert await registration_repo.count_event_registrations(future.event_id) == 10
+        assert await plain_repo.count_event_registrations(future.event_id) == 10
+        
+        # Past events are loaded on first use
+        assert await registration_repo.count_event_registrations(past.event_id) == 10
+        assert index.stats["events"] == 2
+        assert not await registration_repo.is_registered("1", "missing-event")
+        
+        # Nothing is remembered per event once no load is running
+        assert len(index._writes) == 0 and len(registration_repo.admission._writes) == 0
+        
+        # Writes from another process, e.g. manage.py, are noticed and clear the index
+        assert not await registration_repo.check_external_writes()
+        other_catalog = DatabaseConnection(str(tmp_path / "bot.db"))
+        other_db = ShardedDatabase.open(str(tmp_path / "bot.db"), 2, catalog=other_catalog)
+        await SqliteRegistrationRepository(other_db).import_registrations(
+            Registration(user_id=str(i), event_id=future.event_id, created_at=now) for i in range(100, 105)
+        )
+        other_db.close()
+        other_catalog.close()
+        assert await registration_repo.count_event_registrations(future.event_id) == 10
+        assert await registration_repo.check_external_writes()
+        assert await registration_repo.count_event_registrations(future.event_id) == 15
+        assert await registration_repo.is_registered("102", future.event_id)
+        
+        user_db.close()
+        catalog.close()
+
+
+
+class TestEventCapacity:
+    """Seat limits decided atomically under concurrent registrations"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_taps_fill_exactly_the_capacity(self, tmp_path):
+        """Concurrent taps across shards admit exactly ``capacity`` users"""
+        from src.infrastructure.database.sharding import ShardedDatabase
+        catalog = DatabaseConnection(str(tmp_path / "bot.db"))
+        user_db = ShardedDatabase.open(str(tmp_path / "bot.db"), 2, catalog=catalog)
+        event_repo = SqliteEventRepository(catalog)
+        registration_repo = SqliteRegistrationRepository(user_db)
+        use_case = RegisterForEventUseCase(event_repo, registration_repo)
+        
+        now = datetime.now()
+        event = await event_repo.create_event(Event.create("Workshop", now + timedelta(days=1), "12345", capacity=5))
+        assert (await event_repo.get_event_by_id(event.event_id)).capacity == 5
+        
+        results = await asyncio.gather(
+            *(registration_repo.try_register(str(i), event.event_id, now) for i in range(40))
+        )
+        outcomes = [result.outcome for result in results]
+        assert outcomes.count(RegistrationOutcome.REGISTERED) == 5
+        assert outcomes.count(RegistrationOutcome.EVENT_FULL) == 35
+        assert await registration_repo.count_event_registrations(event.event_id) == 5
+        
+        admitted = next(str(i) for i, result in enumerate(results) if result.outcome == RegistrationOutcome.REGISTERED)
+        again = await registration_repo.try_register(admitted, event.event_id, now)
+        assert again.outcome == RegistrationOutcome.ALREADY_REGISTERED
+        result = await use_case.execute("late", event.event_id)
+        assert not result["success"] and "fully booked" in result["message"]
+        # The unconditional path is held to the same seats
+        with pytest.raises(ValueError):
+            await registration_repo.register_user(Registration.create("late", event.event_id))
+        assert not await registration_repo.is_registered("late", event.event_id)
+        
+        # A cancellation frees the seat for the next user
+        await registration_repo.try_unregister(admitted, event.event_id)
+        result = await use_case.execute("late", event.event_id)
+        assert result["success"]
+        assert await registration_repo.count_event_registrations(event.event_id) == 5
+        
+        user_db.close()
+        catalog.close()
+    
+    @pytest.mark.asyncio
+    async def test_processes_share_the_seats_across_shards(self, tmp_path):
+        """Two processes tapping on four shards never hand out more than ``capacity`` seats"""
+        from src.infrastructure.database.sharding import ShardedDatabase, fetch_all_shards
+        catalogs = [DatabaseConnection(str(tmp_path / "bot.db")) for _ in range(2)]
+        user_dbs = [ShardedDatabase.open(str(tmp_path / "bot.db"), 4, catalog=catalog) for catalog in catalogs]
+        # Separate repositories have separate in-memory seat counters, like two processes
+        repos = [SqliteRegistrationRepository(user_db) for user_db in user_dbs]
+        event_repo = SqliteEventRepository(catalogs[0])
+        
+        now = datetime.now()
+        event = await event_repo.create_event(Event.create("Workshop", now + timedelta(days=1), "12345", capacity=5))
+        # Each process serves its own users, as updates for a chat reach one process
+        taps = [(repo, f"{r}-{i}") for i in range(20) for r, repo in enumerate(repos)]
+        results = await asyncio.gather(*(repo.try_register(user_id, event.event_id, now) for repo, user_id in taps))
+        outcomes = [result.outcome for result in results]
+        assert outcomes.count(RegistrationOutcome.REGISTERED) == 5
+        rows = await fetch_all_shards(
+            user_dbs[0], "SELECT COUNT(*) FROM registrations WHERE event_id = ?", (event.event_id,)
+        )
+        assert sum(row[0] for row in rows) == 5
+        assert sum(1 for row in rows if row[0]) > 1
+        seats = await catalogs[0].fetch_one("SELECT seats_taken FROM events WHERE event_id = ?", (event.event_id,))
+        assert seats[0] == 5
+        
+        # A cancellation in one process frees a seat the other can hand out
+        # once it notices the write
+        owner, admitted = next(tap for tap, result in zip(taps, results) if result.outcome == RegistrationOutcome.REGISTERED)
+        other = repos[1] if owner is repos[0] else repos[0]
+        await other.check_external_writes()
+        await owner.try_unregister(admitted, event.event_id)
+        assert await other.check_external_writes()
+        assert (await other.try_register("late", event.event_id, now)).outcome == RegistrationOutcome.REGISTERED
+        assert (await other.try_register("later", event.event_id, now)).outcome == RegistrationOutcome.EVENT_FULL
+        
+        await repos[0].recount_seats()
+        seats = await catalogs[0].fetch_one("SELECT seats_taken FROM events WHERE event_id = ?", (event.event_id,))
+        assert seats[0] == 5
+        
+        for user_db, catalog in zip(user_dbs, catalogs):
+            user_db.close()
+            catalog.close()
+
+
+
+class TestEventArchive:
+    """Past events and their registrations moved out of the hot tables"""
+    
+    @pytest.mark.asyncio
+    async def test_archiver_moves_old_events_across_shards(self, tmp_path):
+        """Old events leave the hot tables and stay readable through the archive"""
+        from src.infrastructure.database.archiver import EventArchiver
+        from src.infrastructure.database.sharding import ShardedDatabase, fetch_all_shards
+        catalog = DatabaseConnection(str(tmp_path / "bot.db"))
+        user_db = ShardedDatabase.open(str(tmp_path / "bot.db"), 2, catalog=catalog)
+        event_repo = SqliteEventRepository(catalog)
+        registration_repo = SqliteRegistrationRepository(user_db)
+        
+        now = datetime.now()
+        old = [Event.create(f"Old {i}", now - timedelta(days=60 + i), "12345") for i in range(5)]
+        recent = Event.create("Recent", now - timedelta(days=1), "12345")
+        upcoming = Event.create("Upcoming", now + timedelta(days=1), "12345")
+        await event_repo.import_events(old + [recent, upcoming])
+        await registration_repo.import_registrations(
+            Registration(user_id=str(i), event_id=event.event_id, created_at=now - timedelta(days=90))
+            for event in old + [recent, upcoming] for i in range(4)
+        )
+        
+        archiver = EventArchiver(catalog, user_db, horizon_days=30, batch_size=2, batch_pause=0)
+        assert await archiver.archive() == 5
+        assert archiver.stats["archived_registrations"] == 20
+        assert await archiver.archive() == 0
+        
+        assert [event.name for event in await event_repo.get_all_events()] == ["Recent", "Upcoming"]
+        assert len(await event_repo.get_all_events(include_archive=True)) == 7
+        assert await event_repo.get_event_by_id(old[0].event_id) is None
+        assert (await event_repo.get_event_by_id(old[0].event_id, include_archive=True)).name == "Old 0"
+        hot = await fetch_all_shards(user_db, "SELECT COUNT(*) FROM registrations")
+        assert sum(row[0] for row in hot) == 8
+        
+        assert len(await registration_repo.get_user_registrations("1")) == 2
+        assert len(await registration_repo.get_user_registrations("1", include_archive=True)) == 7
+        assert len(await registration_repo.get_event_registrations(old[2].event_id, include_archive=True)) == 4
+        assert len([r async for r in registration_repo.iter_all_registrations(include_archive=True)]) == 28
+        
+        user_db.close()
+        catalog.close()
+
+
+
+class TestEventSearch:
+    """Full-text search over event names"""
+    
+    @pytest.mark.asyncio
+    async def test_search_tracks_repository_writes(self):
+        """Created, imported, deleted and archived events are reflected in search results"""
+        from src.application.use_cases.search_events import SearchEventsUseCase
+        from src.infrastructure.database.archiver import EventArchiver
+        db = DatabaseConnection(":memory:")
+        event_repo = SqliteEventRepository(db)
+        
+        now = datetime.now()
+        python_meetup = await event_repo.create_event(Event.create("Python Meetup", now + timedelta(days=2), "12345"))
+        await event_repo.create_event(Event.create("Café Python Workshop", now + timedelta(days=1), "12345"))
+        await event_repo.create_event(Event.create("Past Python Talk", now - timedelta(days=60), "12345"))
+        await event_repo.import_events([
+            Event.create(f"Jazz Night {i}", now + timedelta(days=i + 1), "12345") for i in range(3)
+        ])
+        
+        assert [e.name for e in await event_repo.search_events("python")] == ["Python Meetup", "Café Python Workshop"]
+        assert [e.name for e in await event_repo.search_events("cafe pyth")] == ["Café Python Workshop"]
+        assert len(await event_repo.search_events("jazz", limit=2)) == 2
+        # Imported rows were indexed in their own transaction, nothing is missing
+        await db.execute("INSERT INTO events_fts (events_fts) VALUES ('integrity-check')")
+        # User input is never parsed as FTS5 syntax
+        assert await event_repo.search_events('(python"*') != []
+        assert await event_repo.search_events("!!!") == []
+        
+        await event_repo.delete_event(python_meetup.event_id)
+        assert [e.name for e in await event_repo.search_events("meetup")] == []
+        # The index is keyed by the events' id, which VACUUM keeps
+        await db.run(lambda conn: conn.execute("VACUUM"))
+        assert [e.name for e in await event_repo.search_events("python")] == ["Café Python Workshop"]
+        await db.execute("INSERT INTO events_fts (events_fts) VALUES ('integrity-check')")
+        await EventArchiver(db, db, horizon_days=30, batch_pause=0).archive()
+        rows = await db.fetch_all("SELECT rowid FROM events_fts WHERE events_fts MATCH 'talk'")
+        assert rows == []
+        
+        result = await SearchEventsUseCase(event_repo).execute("12345", "workshop")
+        assert result["keyboard"][0][0]["callback_data"].startswith("register_")
+        assert "Café Python Workshop" in result["message"]
+        
+        db.close()
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ from src.infrastructure.repositories.sqlite_user_state_repository import SqliteU
 from src.application.use_cases.user_onboarding import UserOnboardingUseCase
 from src.application.use_cases.get_main_menu import GetMainMenuUseCase
 from src.domain.entities.user import User
+from src.domain.entities.conversation_context import ConversationContext
 from src.domain.entities.user_state import UserState
 
 
@@ -70,6 +71,30 @@ async def test_full_onboarding_flow():
     assert current_state.current_step == "main_menu"
 
 
+@pytest.mark.asyncio
+async def test_onboarding_restarts_after_unreadable_context():
+    """Test that lost answers send the user back to the first question instead of failing"""
+    db = DatabaseConnection(":memory:")
+    user_repo = SqliteUserRepository(db)
+    user_state_repo = SqliteUserStateRepository(db)
+    onboarding_use_case = UserOnboardingUseCase(user_repo, user_state_repo)
+    await db.execute(
+        "INSERT INTO user_states (user_id, current_step, context) VALUES (?, ?, ?)",
+        ("1", "enter_birth_year", "{'first_name': ")
+    )
+    
+    message, next_step, _ = await onboarding_use_case.execute("1", "enter_birth_year", "1990")
+    assert next_step == "enter_first_name" and "имя" in message
+    assert (await user_state_repo.get_user_state("1")).current_step == "enter_first_name"
+    assert await user_repo.get_user("1") is None
+    
+    for step, answer in (("enter_first_name", "Иван"), ("enter_last_name", "Иванов"), ("enter_birth_year", "1990")):
+        _, next_step, _ = await onboarding_use_case.execute("1", step, answer)
+    assert next_step == "main_menu"
+    assert (await user_repo.get_user("1")).first_name == "Иван"
+    db.close()
+
+
 @pytest.mark.asyncio
 async def test_main_menu_use_case():
     """Test main menu use case"""
@@ -101,5 +126,284 @@ async def test_main_menu_use_case():
     assert len(keyboard) == 4  # Should have 4 menu buttons
 
 
+
+@pytest.mark.asyncio
+async def test_cached_user_repository():
+    """Test the write-through LRU user cache over the real database"""
+    from src.infrastructure.repositories.cached_user_repository import CachedUserRepository
+    db = DatabaseConnection(":memory:")
+    now = [0.0]
+    user_repo = CachedUserRepository(
+        SqliteUserRepository(db), max_size=2, ttl=60, clock=lambda: now[0]
+    )
+    
+    # Unknown users are cached as well
+    assert await user_repo.get_user("1") is None
+    assert await user_repo.get_user("1") is None
+    assert user_repo.stats["misses"] == 1
+    
+    # Write-through replaces the cached miss
+    await user_repo.save_user(User(user_id="1", first_name="Иван", last_name="Иванов", birth_year=1990))
+    assert (await user_repo.get_user("1")).first_name == "Иван"
+    assert user_repo.stats["misses"] == 1
+    
+    await user_repo.update_user(User(user_id="1", first_name="Пётр", last_name="Иванов", birth_year=1990))
+    assert (await user_repo.get_user("1")).first_name == "Пётр"
+    
+    # Least recently used entries are evicted beyond max_size
+    await user_repo.get_user("2")
+    await user_repo.get_user("3")
+    assert user_repo.stats["size"] == 2
+    assert user_repo.stats["evictions"] == 1
+    
+    # Entries expire after the TTL
+    now[0] = 61.0
+    await user_repo.get_user("3")
+    assert user_repo.stats["misses"] == 4
+    
+    # A save that lands while a miss is being read is not overwritten by it
+    inner = user_repo.inner
+    read_done = asyncio.Event()
+    
+    async def slow_get_user(user_id):
+        user = await SqliteUserRepository.get_user(inner, user_id)
+        await read_done.wait()
+        return user
+    
+    inner.get_user = slow_get_user
+    lookup = asyncio.ensure_future(user_repo.get_user("4"))
+    await asyncio.sleep(0.01)
+    await user_repo.save_user(User(user_id="4", first_name="Анна", last_name="Иванова", birth_year=1995))
+    read_done.set()
+    assert (await lookup).first_name == "Анна"
+    assert (await user_repo.get_user("4")).first_name == "Анна"
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_user_state_repository():
+    """Test that conversation states are served from memory and flushed in batches"""
+    from src.infrastructure.repositories.write_behind_user_state_repository import WriteBehindUserStateRepository
+    db = DatabaseConnection(":memory:")
+    durable = SqliteUserStateRepository(db)
+    state_repo = WriteBehindUserStateRepository(durable, flush_interval=60)
+    
+    assert await state_repo.get_user_state("1") is None
+    await state_repo.save_user_state(UserState(user_id="1", current_step="main_menu"))
+    await state_repo.save_user_state(UserState(user_id="2", current_step="enter_first_name"))
+    await state_repo.update_user_state(UserState(user_id="2", current_step="enter_last_name", context=ConversationContext(first_name="Пётр")))
+    
+    # Visible immediately, but not yet written
+    assert (await state_repo.get_user_state("2")).current_step == "enter_last_name"
+    assert await durable.get_user_state("1") is None
+    assert state_repo.stats["dirty"] == 2
+    
+    await state_repo.flush()
+    assert (await durable.get_user_state("1")).current_step == "main_menu"
+    assert (await durable.get_user_state("2")).current_step == "enter_last_name"
+    assert state_repo.stats["dirty"] == 0
+    assert state_repo.stats["flushes"] == 1
+    
+    # Stopping flushes whatever is still pending
+    await state_repo.start()
+    await state_repo.save_user_state(UserState(user_id="1", current_step="enter_birth_year", context=ConversationContext(first_name="Иван", last_name="Иванов")))
+    await state_repo.stop()
+    assert (await durable.get_user_state("1")).current_step == "enter_birth_year"
+
+
+@pytest.mark.asyncio
+async def test_write_behind_keeps_states_in_flight_until_committed():
+    """Test that a flush in progress pins its states and a failed flush keeps them pending"""
+    from src.infrastructure.repositories.write_behind_user_state_repository import WriteBehindUserStateRepository
+    db = DatabaseConnection(":memory:")
+    durable = SqliteUserStateRepository(db)
+    await durable.save_user_state(UserState(user_id="1", current_step="main_menu"))
+    state_repo = WriteBehindUserStateRepository(durable, flush_interval=60, max_size=1)
+    
+    release = asyncio.Event()
+    save_user_states = durable.save_user_states
+    
+    async def slow_save(states):
+        await release.wait()
+        await save_user_states(states)
+    
+    durable.save_user_states = slow_save
+    await state_repo.save_user_state(UserState(user_id="1", current_step="enter_first_name"))
+    flush = asyncio.create_task(state_repo.flush())
+    await asyncio.sleep(0)
+    
+    # Over the size limit, but user 1 is still being written
+    await state_repo.get_user_state("2")
+    assert (await state_repo.get_user_state("1")).current_step == "enter_first_name"
+    release.set()
+    await flush
+    assert (await durable.get_user_state("1")).current_step == "enter_first_name"
+    
+    async def failing_save(states):
+        raise RuntimeError("disk full")
+    
+    durable.save_user_states = failing_save
+    await state_repo.save_user_state(UserState(user_id="1", current_step="enter_last_name", context=ConversationContext(first_name="Иван")))
+    with pytest.raises(RuntimeError):
+        await state_repo.flush()
+    assert state_repo.stats["dirty"] == 1
+    durable.save_user_states = save_user_states
+    await state_repo.flush()
+    assert (await durable.get_user_state("1")).current_step == "enter_last_name"
+
+
+
+@pytest.mark.asyncio
+async def test_log_structured_user_state_repository(tmp_path):
+    """Test that the append-only state log replays, compacts and survives a torn write"""
+    from src.infrastructure.repositories.log_structured_user_state_repository import LogStructuredUserStateRepository
+    directory = str(tmp_path / "states")
+    state_repo = LogStructuredUserStateRepository(directory, compact_bytes=1 << 20)
+    await state_repo.save_user_state(UserState(user_id="1", current_step="enter_first_name"))
+    await state_repo.save_user_state(UserState(user_id="1", current_step="enter_last_name", context='{"first_name": "Иван"}'))
+    await state_repo.save_user_state(UserState(user_id="2", current_step="main_menu"))
+    await state_repo.stop()
+    
+    # A crash in the middle of an append leaves a partial record behind
+    with open(tmp_path / "states" / "log.1", "ab") as f:
+        f.write(b"\x01\x02\x03")
+    
+    state_repo = LogStructuredUserStateRepository(directory, compact_bytes=1 << 20)
+    state = await state_repo.get_user_state("1")
+    assert state.current_step == "enter_last_name"
+    assert state.context_data == {"first_name": "Иван"}
+    assert await state_repo.get_user_state("3") is None
+    
+    # Compaction replaces the logs with a snapshot of the latest states
+    await state_repo.compact()
+    await state_repo.save_user_state(UserState(user_id="2", current_step="enter_birth_year", context=ConversationContext(first_name="Пётр", last_name="Петров")))
+    await state_repo.stop()
+    assert sorted(p.name for p in (tmp_path / "states").iterdir()) == ["log.2", "snapshot.2"]
+    
+    state_repo = LogStructuredUserStateRepository(directory)
+    assert (await state_repo.get_user_state("1")).current_step == "enter_last_name"
+    assert (await state_repo.get_user_state("2")).current_step == "enter_birth_year"
+    assert state_repo.stats["size"] == 2
+    await state_repo.stop()
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_and_export_round_trip(tmp_path):
+    """Test bulk import from NDJSON/CSV and streaming export back out"""
+    import io
+    from datetime import datetime, timezone
+    from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+    from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+    from src.presentation.cli import bulk_transfer
+    db = DatabaseConnection(str(tmp_path / "bot.db"))
+    event_repo = SqliteEventRepository(db)
+    registration_repo = SqliteRegistrationRepository(db)
+    
+    events = io.StringIO(
+        '{"event_id": "e1", "name": "Концерт", "date": "2030-05-01T19:00:00", "created_by": "admin"}\n'
+        '{"event_id": "e2", "name": "Лекция", "date": 1910000000, "created_by": "admin"}\n'
+    )
+    assert await bulk_transfer.import_events(event_repo, events, "ndjson") == 2
+    
+    registrations = io.StringIO(
+        "user_id,event_id,created_at\n"
+        + "".join(f"{i},e{i % 2 + 1},2030-01-01T10:00:00\n" for i in range(2500))
+        + "0,e1,\n"  # duplicate, skipped
+    )
+    assert await bulk_transfer.import_registrations(registration_repo, registrations, "csv") == 2500
+    assert len(await registration_repo.get_event_registrations("e1")) == 1250
+    
+    out = io.StringIO()
+    assert await bulk_transfer.export_events(event_repo, out, "csv") == 2
+    out.seek(0)
+    exported = list(bulk_transfer.read_records(out, "csv"))
+    assert [e["event_id"] for e in exported] == ["e1", "e2"]
+    # Exported with an explicit UTC offset, so the instant survives a move between timezones
+    local_evening = datetime(2030, 5, 1, 19, 0)
+    assert (exported[0]["name"], exported[0]["date"]) == (
+        "Концерт", datetime.fromtimestamp(local_evening.timestamp(), timezone.utc).isoformat()
+    )
+    assert bulk_transfer.event_from_record(exported[0]).date == local_evening
+    
+    out = io.StringIO()
+    assert await bulk_transfer.export_registrations(registration_repo, out, "ndjson") == 2500
+    out.seek(0)
+    exported = list(bulk_transfer.read_records(out, "ndjson"))
+    assert exported[0] == {
+        "user_id": "0",
+        "event_id": "e1",
+        "created_at": datetime.fromtimestamp(datetime(2030, 1, 1, 10, 0).timestamp(), timezone.utc).isoformat()
+    }
+    
+    db.close()
+
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_round_trips_per_update():
+    """Test that one update loads each entity once and writes its changes back at the end"""
+    from src.application.use_cases.create_event import CreateEventUseCase
+    from src.application.use_cases.get_events import GetEventsUseCase
+    from src.application.use_cases.get_my_events import GetMyEventsUseCase
+    from src.application.use_cases.register_for_event import RegisterForEventUseCase
+    from src.application.use_cases.unregister_from_event import UnregisterFromEventUseCase
+    from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+    from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+    from src.infrastructure.repositories.unit_of_work import UnitOfWork
+    from src.presentation.telegram.handlers.message_handlers import handle_message
+    db = DatabaseConnection(":memory:")
+    user_repo = SqliteUserRepository(db)
+    state_repo = SqliteUserStateRepository(db)
+    event_repo = SqliteEventRepository(db)
+    registration_repo = SqliteRegistrationRepository(db)
+    await state_repo.save_user_state(UserState(user_id="1", current_step="enter_first_name"))
+    
+    async def send(text: str) -> UnitOfWork:
+        async with UnitOfWork(user_repo, state_repo, event_repo, registration_repo) as unit:
+            await handle_message(
+                {"message": {"from": {"id": 1}, "text": text}},
+                UserOnboardingUseCase(unit.users, unit.user_states),
+                GetMainMenuUseCase(unit.users, unit.user_states),
+                CreateEventUseCase(unit.events, unit.users),
+                GetEventsUseCase(unit.events),
+                RegisterForEventUseCase(unit.events, unit.registrations),
+                GetMyEventsUseCase(unit.events, unit.registrations),
+                UnregisterFromEventUseCase(unit.events, unit.registrations),
+                unit.user_states
+            )
+        return unit
+    
+    # One state read and one state write per answer
+    unit = await send("Иван")
+    assert unit.stats == {"round_trips": 2, "hits": 0, "pending": 0}
+    unit = await send("Иванов")
+    assert unit.stats["round_trips"] == 2
+    
+    # The last answer also writes the user, in the same transaction as the state
+    unit = await send("1990")
+    assert unit.stats["round_trips"] == 2
+    assert (await user_repo.get_user("1")).first_name == "Иван"
+    assert (await state_repo.get_user_state("1")).current_step == "main_menu"
+    
+    # Repeated reads are served by the identity map
+    unit = UnitOfWork(user_repo, state_repo, event_repo, registration_repo)
+    assert await unit.users.get_user("1") is await unit.users.get_user("1")
+    assert unit.stats["round_trips"] == 1 and unit.stats["hits"] == 1
+    
+    # Changes tracked by a failed update are never written
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(user_repo, state_repo, event_repo, registration_repo) as unit:
+            await unit.user_states.save_user_state(UserState(user_id="1", current_step="enter_first_name"))
+            raise RuntimeError("handler failed")
+    assert (await state_repo.get_user_state("1")).current_step == "main_menu"
+    
+    # A failing save rolls back the other saves of the unit
+    await db.execute("CREATE TRIGGER reject_users BEFORE INSERT ON users BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    with pytest.raises(Exception, match="disk full"):
+        async with UnitOfWork(user_repo, state_repo, event_repo, registration_repo) as unit:
+            await unit.user_states.save_user_state(UserState(user_id="2", current_step="main_menu"))
+            await unit.users.save_user(User(user_id="2", first_name="Пётр", last_name="Петров", birth_year=1990))
+    assert await state_repo.get_user_state("2") is None
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
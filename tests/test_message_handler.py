@@ -81,5 +81,144 @@ async def test_message_handler_onboarding_flow():
     assert "фамилию" in response["text"]  # Should ask for last name next
 
 
+
+@pytest.mark.asyncio
+async def test_router_dispatches_by_callback_token_and_step():
+    """Test that callback data is parsed once and routed by token, text by command and step"""
+    from src.presentation.telegram.handlers import message_handlers as handlers
+    router = handlers.router
+    
+    handler, callback = router.route("register_imported_event_7", "", "main_menu")
+    assert handler is handlers.register
+    assert callback.argument == "imported_event_7"
+    handler, callback = router.route("unregister_abc", "", "main_menu")
+    assert handler is handlers.unregister and callback.argument == "abc"
+    handler, callback = router.route("browse_events:n:1900000000:abc", "", "main_menu")
+    assert handler is handlers.browse_events and callback.argument == "n:1900000000:abc"
+    assert router.route("events", "", "main_menu")[0] is handlers.browse_events
+    
+    # Text goes by command, then by step; typed text never presses a button
+    assert router.route(None, "/start", "enter_last_name")[0] is handlers.show_main_menu
+    assert router.route(None, "help", "enter_last_name")[0] is handlers.continue_onboarding
+    assert router.route(None, "Go", "creating_event_name")[0] is handlers.take_event_name
+    assert router.route(None, "Go", "no_such_step")[0] is handlers.show_main_menu
+    assert router.route("no_such_button", "", "creating_event_name") == (handlers.show_main_menu, None)
+
+
+@pytest.mark.asyncio
+async def test_event_creation_flow_through_handler():
+    """Test that the admin event creation flow moves through the declared steps"""
+    from datetime import datetime, timedelta
+    from src.application.use_cases.create_event import CreateEventUseCase
+    from src.application.use_cases.get_events import GetEventsUseCase
+    from src.application.use_cases.get_my_events import GetMyEventsUseCase
+    from src.application.use_cases.register_for_event import RegisterForEventUseCase
+    from src.application.use_cases.unregister_from_event import UnregisterFromEventUseCase
+    from src.domain.entities.user import User
+    from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+    from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+    db = DatabaseConnection(":memory:")
+    user_repo = SqliteUserRepository(db)
+    user_state_repo = SqliteUserStateRepository(db)
+    event_repo = SqliteEventRepository(db)
+    registration_repo = SqliteRegistrationRepository(db)
+    await user_repo.save_user(User(user_id="1", first_name="Иван", last_name="Иванов", birth_year=1990, is_admin=True))
+    
+    async def send(update: dict) -> dict:
+        return await handle_message(
+            update,
+            UserOnboardingUseCase(user_repo, user_state_repo),
+            GetMainMenuUseCase(user_repo, user_state_repo),
+            CreateEventUseCase(event_repo, user_repo),
+            GetEventsUseCase(event_repo),
+            RegisterForEventUseCase(event_repo, registration_repo),
+            GetMyEventsUseCase(event_repo, registration_repo),
+            UnregisterFromEventUseCase(event_repo, registration_repo),
+            user_state_repo
+        )
+    
+    await send({"callback_query": {"from": {"id": 1}, "data": "admin_menu"}})
+    assert (await user_state_repo.get_user_state("1")).current_step == "admin_menu"
+    await send({"callback_query": {"from": {"id": 1}, "data": "create_event"}})
+    await send({"message": {"from": {"id": 1}, "text": "Python Meetup"}})
+    state = await user_state_repo.get_user_state("1")
+    assert state.current_step == "creating_event_date"
+    assert state.context.event_name == "Python Meetup"
+    
+    date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d %H:%M")
+    response = await send({"message": {"from": {"id": 1}, "text": date}})
+    assert "created successfully" in response["text"]
+    assert (await user_state_repo.get_user_state("1")).current_step == "admin_menu"
+    assert [event.name for event in await event_repo.get_future_events()] == ["Python Meetup"]
+    
+    # A new user opening the menu is moved into onboarding, not back to the menu
+    await send({"message": {"from": {"id": 2}, "text": "/start"}})
+    assert (await user_state_repo.get_user_state("2")).current_step == "enter_first_name"
+
+
+@pytest.mark.asyncio
+async def test_event_date_can_be_retried_after_invalid_input():
+    """Test that a rejected date leaves the admin on the date step with the name kept"""
+    from src.application.use_cases.create_event import CreateEventUseCase
+    from src.application.use_cases.get_events import GetEventsUseCase
+    from src.application.use_cases.get_my_events import GetMyEventsUseCase
+    from src.application.use_cases.register_for_event import RegisterForEventUseCase
+    from src.application.use_cases.unregister_from_event import UnregisterFromEventUseCase
+    from src.domain.entities.user import User
+    from src.infrastructure.repositories.sqlite_event_repository import SqliteEventRepository
+    from src.infrastructure.repositories.sqlite_registration_repository import SqliteRegistrationRepository
+    db = DatabaseConnection(":memory:")
+    user_repo = SqliteUserRepository(db)
+    user_state_repo = SqliteUserStateRepository(db)
+    event_repo = SqliteEventRepository(db)
+    registration_repo = SqliteRegistrationRepository(db)
+    await user_repo.save_user(User(user_id="1", first_name="Иван", last_name="Иванов", birth_year=1990, is_admin=True))
+    
+    async def send(update: dict) -> dict:
+        return await handle_message(
+            update,
+            UserOnboardingUseCase(user_repo, user_state_repo),
+            GetMainMenuUseCase(user_repo, user_state_repo),
+            CreateEventUseCase(event_repo, user_repo),
+            GetEventsUseCase(event_repo),
+            RegisterForEventUseCase(event_repo, registration_repo),
+            GetMyEventsUseCase(event_repo, registration_repo),
+            UnregisterFromEventUseCase(event_repo, registration_repo),
+            user_state_repo
+        )
+    
+    await send({"callback_query": {"from": {"id": 1}, "data": "create_event"}})
+    await send({"message": {"from": {"id": 1}, "text": "Party"}})
+    response = await send({"message": {"from": {"id": 1}, "text": "not a date"}})
+    assert "created successfully" not in response["text"]
+    state = await user_state_repo.get_user_state("1")
+    assert state.current_step == "creating_event_date"
+    assert state.context.event_name == "Party"
+    response = await send({"message": {"from": {"id": 1}, "text": "2031-01-01 10:00"}})
+    assert "created successfully" in response["text"]
+    assert [event.name for event in await event_repo.get_future_events()] == ["Party"]
+    
+    # A move the conversation rejects starts over at the main menu instead of failing the update
+    class MisroutingCreateEvent(CreateEventUseCase):
+        async def execute(self, *args, **kwargs):
+            return {"success": False, "message": "Nope", "next_step": "enter_birth_year"}
+    
+    await send({"callback_query": {"from": {"id": 1}, "data": "create_event"}})
+    await send({"message": {"from": {"id": 1}, "text": "Party 2"}})
+    response = await handle_message(
+        {"message": {"from": {"id": 1}, "text": "2031-01-02 10:00"}},
+        UserOnboardingUseCase(user_repo, user_state_repo),
+        GetMainMenuUseCase(user_repo, user_state_repo),
+        MisroutingCreateEvent(event_repo, user_repo),
+        GetEventsUseCase(event_repo),
+        RegisterForEventUseCase(event_repo, registration_repo),
+        GetMyEventsUseCase(event_repo, registration_repo),
+        UnregisterFromEventUseCase(event_repo, registration_repo),
+        user_state_repo
+    )
+    assert response["text"].startswith("Что-то пошло не так")
+    assert (await user_state_repo.get_user_state("1")).current_step == "main_menu"
+    db.close()
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file